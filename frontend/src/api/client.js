@@ -42,6 +42,16 @@ export const deleteReference = async (refId) => lifecycleApi.delete(`/references
 export const updateSlidePlan = async (courseId, slidePlan) => lifecycleApi.put(`/courses/${courseId}/slide-plan`, { slide_plan: slidePlan });
 export const generateOutline = async (courseId, deckMode = "QUICK_DECK") => lifecycleApi.post('/ppt/outline', { course_id: courseId, deck_mode: deckMode });
 
+// RAG ingest jobs (/ingest and /reference/ingest return a job_id)
+export const getIngestJob = async (jobId) => ragApi.get(`/ingest/jobs/${jobId}`);
+export const waitForIngestJob = async (jobId, intervalMs = 1000) => {
+    for (;;) {
+        const res = await getIngestJob(jobId);
+        if (res.data.status === 'COMPLETED' || res.data.status === 'FAILED') return res.data;
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+};
+
 // Exports
 export const getExportUrl = (courseId, type) => `${LIFECYCLE_URL}/courses/${courseId}/export/${type}`;
 
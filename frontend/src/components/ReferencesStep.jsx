@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { ragApi } from '../api/client';
+import { ragApi, waitForIngestJob } from '../api/client';
 import { Database, Upload, FileText, CheckCircle, ArrowRight } from 'lucide-react';
 
 export default function ReferencesStep({ data, update, next, back }) {
@@ -19,7 +19,8 @@ export default function ReferencesStep({ data, update, next, back }) {
             formData.append('use_packaged', 'true');
 
             const res = await ragApi.post('/reference/ingest', formData);
-            setIngestCount(res.data.ingested_count);
+            const job = await waitForIngestJob(res.data.job_id);
+            setIngestCount(job.files_ingested);
         } catch (e) {
             if (e.response && e.response.status === 404) {
                 alert(`No standard pack found for course ${courseCode}. Please use Custom Upload or select a different course.`);
@@ -37,15 +38,16 @@ export default function ReferencesStep({ data, update, next, back }) {
 
         setUploading(true);
         try {
-            for (const file of files) {
-                const formData = new FormData();
-                formData.append('file', file);
-                formData.append('course_id', data.id);
-                formData.append('course_code', courseCode);
+            // One request for all files; the indexer processes them concurrently
+            const formData = new FormData();
+            files.forEach(file => formData.append('files', file));
+            formData.append('course_id', data.id);
+            formData.append('course_code', courseCode);
 
-                await ragApi.post('/reference/ingest', formData);
-                setUploadedFiles(prev => [...prev, file.name]);
-            }
+            const res = await ragApi.post('/reference/ingest', formData);
+            const job = await waitForIngestJob(res.data.job_id);
+            setUploadedFiles(prev => [...prev, ...files.map(f => f.name).filter(name => !(name in job.errors))]);
+            if (job.files_failed) alert(`Upload failed for: ${Object.keys(job.errors).join(', ')}`);
         } catch (e) {
             alert("Upload failed: " + e.message);
         } finally {
@@ -3,6 +3,23 @@ set -x
 
 HOST="http://localhost:8002"
 
+wait_for_ingest() {
+  # Usage: wait_for_ingest <base url> <POST /ingest response>
+  # /ingest only queues the job: poll it until it finishes
+  local job_id
+  job_id=$(echo "$2" | python3 -c "import json, sys; print(json.load(sys.stdin)['job_id'])") || return 1
+  for _ in $(seq 1 120); do
+    STATUS=$(curl -s "$1/ingest/jobs/$job_id" | python3 -c "import json, sys; print(json.load(sys.stdin)['status'])")
+    case "$STATUS" in
+      COMPLETED) return 0 ;;
+      FAILED) echo "Ingest job $job_id failed"; return 1 ;;
+    esac
+    sleep 1
+  done
+  echo "Ingest job $job_id did not finish in time"
+  return 1
+}
+
 echo "--- 1. Starting RAG Indexer (Background) ---"
 pkill -f "rag-indexer" || true
 sleep 1
@@ -18,9 +35,15 @@ echo "--- 2. Create Dummy Text File ---"
 echo "Hybrid search is a method that combines vector search and keyword search." > hybrid_doc.txt
 
 echo "--- 3. Ingest File ---"
-curl -X POST "$HOST/ingest" \
+INGEST_RESPONSE=$(curl -s -X POST "$HOST/ingest" \
   -F "course_id=1000" \
-  -F "file=@hybrid_doc.txt"
+  -F "file=@hybrid_doc.txt")
+echo "$INGEST_RESPONSE"
+if ! wait_for_ingest "$HOST" "$INGEST_RESPONSE"; then
+    cat server_hybrid.log
+    kill $SERVER_PID
+    exit 1
+fi
 
 echo "--- 4. Search (Retrieve) ---"
 # We expect hybrid_retrieve to be called.
@@ -19,6 +19,7 @@ sys.modules['shared'] = MagicMock()
 sys.modules['shared.clients'] = MagicMock()
 sys.modules['shared.clients.embedding_client'] = MagicMock()
 sys.modules['shared.clients.vector_store_client'] = MagicMock()
+sys.modules['shared.clients.embedding_cache'] = MagicMock()
 
 # Now import the actual app modules
 # We need to hack the import because 'services/rag-indexer' is not a valid python package name with hyphen usually, 
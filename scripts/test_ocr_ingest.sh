@@ -8,6 +8,23 @@ HOST="http://localhost:8001"
 # main.py usually uses port defined in args. 
 # We'll try to run rag-indexer on port 8002 to avoid conflict with lifecycle(8000).
 
+wait_for_ingest() {
+  # Usage: wait_for_ingest <base url> <POST /ingest response>
+  # /ingest only queues the job: poll it until it finishes
+  local job_id
+  job_id=$(echo "$2" | python3 -c "import json, sys; print(json.load(sys.stdin)['job_id'])") || return 1
+  for _ in $(seq 1 120); do
+    STATUS=$(curl -s "$1/ingest/jobs/$job_id" | python3 -c "import json, sys; print(json.load(sys.stdin)['status'])")
+    case "$STATUS" in
+      COMPLETED) return 0 ;;
+      FAILED) echo "Ingest job $job_id failed"; return 1 ;;
+    esac
+    sleep 1
+  done
+  echo "Ingest job $job_id did not finish in time"
+  return 1
+}
+
 echo "--- 1. Starting RAG Indexer (Background) ---"
 pkill -f "rag-indexer" || true
 sleep 1
@@ -26,13 +43,15 @@ echo "--- 2. Create Mock Scanned PDF ---"
 python3 -c "from pypdf import PdfWriter; w = PdfWriter(); w.add_blank_page(width=100, height=100); w.write('scanned_doc.pdf')"
 
 echo "--- 3. Ingest File ---"
-curl -X POST "http://localhost:8002/ingest" \
+INGEST_RESPONSE=$(curl -s -X POST "http://localhost:8002/ingest" \
   -F "course_id=999" \
-  -F "file=@scanned_doc.pdf"
+  -F "file=@scanned_doc.pdf")
+echo "$INGEST_RESPONSE"
+INGEST_OK=true
+wait_for_ingest "http://localhost:8002" "$INGEST_RESPONSE" || INGEST_OK=false
 
 echo "--- 4. Verify OCR Log ---"
-sleep 2
-if grep -q "OCR successfully added text content" server_ocr.log; then
+if $INGEST_OK && grep -q "OCR successfully added text content" server_ocr.log; then
     echo "✅ OCR Fallback triggered and success."
 else
     echo "❌ OCR Not triggered or failed. Check logs."
@@ -0,0 +1,70 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class IncrementalSlideParser:
+    """
+    Incremental parser for streamed SlidePlan JSON.
+
+    Feed it text chunks as they arrive from the LLM; it returns each slide object
+    as soon as its closing brace is seen. Slides are the objects directly inside
+    either a top-level array (`[{...}, ...]`) or an array that is a value of the
+    top-level object (`{"slides": [{...}, ...]}`). Markdown code fences and other
+    text outside JSON values are ignored.
+    """
+    def __init__(self):
+        self._buffer = []       # Raw text of the slide object currently being read
+        self._stack = []        # Open containers: '{' or '['
+        self._in_string = False
+        self._escape = False
+        self._capturing = False # True while inside a slide object
+        self._slide_depth = 0   # Stack depth of the slide object being captured
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        slides = []
+        for ch in chunk:
+            if self._capturing:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch in "{[":
+                # A slide starts when an object opens inside an array at depth <= 2
+                if (
+                    ch == "{"
+                    and not self._capturing
+                    and self._stack
+                    and self._stack[-1] == "["
+                    and len(self._stack) <= 2
+                ):
+                    self._capturing = True
+                    self._buffer = [ch]
+                    self._slide_depth = len(self._stack) + 1
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._capturing and ch == "}" and len(self._stack) == self._slide_depth - 1:
+                    self._capturing = False
+                    raw = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        slide = json.loads(raw)
+                        if isinstance(slide, dict):
+                            slides.append(slide)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed streamed slide: {e}")
+        return slides
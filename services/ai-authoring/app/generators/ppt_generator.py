@@ -3,6 +3,9 @@ import os
 import logging
 from pptx import Presentation
 from pptx.util import Inches, Pt
+from typing import AsyncIterator
+
+from .json_stream import IncrementalSlideParser
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +17,7 @@ class PptGenerator:
         self.output_dir = f"{base_dir}/generated_ppts"
         os.makedirs(self.output_dir, exist_ok=True)
 
-    async def generate_slide_plan(self, prompt_text: str, blueprint: dict) -> dict:
-        """
-        Generate a JSON SlidePlan using the LLM.
-        """
+    def _build_slide_prompt(self, prompt_text: str) -> str:
         # Augment prompt with JSON enforcement if not present (the upstream prompt builder should do this, but safe to add)
         system_instruction = """
         IMPORTANT: Output ONLY valid JSON.
@@ -39,31 +39,52 @@ class PptGenerator:
           ]
         }
         """
-        full_prompt = f"{prompt_text}\n\n{system_instruction}"
+        return f"{prompt_text}\n\n{system_instruction}"
+
+    @staticmethod
+    def _normalize_slide(s: dict) -> dict:
+        # Normalize Keys (Legacy Support -> Canonical)
+        return {
+            "subtopic": s.get("subtopic", "General"),
+            "title": s.get("title") or s.get("slide_title") or "Untitled",
+            "bullets": s.get("bullets", []),
+            "speaker_notes": s.get("speaker_notes") or s.get("notes") or "",
+            "illustration_prompt": s.get("illustration_prompt") or s.get("illustration") or "Visual description placeholder"
+        }
+
+    async def generate_slide_plan(self, prompt_text: str, blueprint: dict, bypass_cache: bool = False) -> dict:
+        """
+        Generate a JSON SlidePlan using the LLM.
+        bypass_cache forces a fresh generation even if this prompt was seen before.
+        """
+        full_prompt = self._build_slide_prompt(prompt_text)
         
         logger.info("Generating SlidePlan JSON...")
-        slide_plan = await self.gemini_client.generate_json(full_prompt)
+        slide_plan = await self.gemini_client.generate_json(full_prompt, bypass_cache=bypass_cache)
         
-        # Normalize Keys (Legacy Support -> Canonical)
-        normalized_slides = []
-        raw_slides = slide_plan.get("slides", [])
+        raw_slides = slide_plan.get("slides", []) if isinstance(slide_plan, dict) else []
         if not raw_slides:
              # Handle flat list input if LLM messes up structure
-             if isinstance(slide_plan, list): raw_slides = slide_plan
+             if isinstance(slide_plan, list):
+                 raw_slides = slide_plan
+                 slide_plan = {}
              
-        for s in raw_slides:
-            norm = {
-                "subtopic": s.get("subtopic", "General"),
-                "title": s.get("title") or s.get("slide_title") or "Untitled",
-                "bullets": s.get("bullets", []),
-                "speaker_notes": s.get("speaker_notes") or s.get("notes") or "",
-                "illustration_prompt": s.get("illustration_prompt") or s.get("illustration") or "Visual description placeholder"
-            }
-            normalized_slides.append(norm)
-            
-        slide_plan["slides"] = normalized_slides
+        slide_plan["slides"] = [self._normalize_slide(s) for s in raw_slides]
         return slide_plan
 
+    async def stream_slide_plan(self, prompt_text: str, blueprint: dict, bypass_cache: bool = False) -> AsyncIterator[dict]:
+        """
+        Stream the SlidePlan: yields each normalized slide as soon as the LLM
+        has finished emitting its JSON object.
+        """
+        full_prompt = self._build_slide_prompt(prompt_text)
+        parser = IncrementalSlideParser()
+        
+        logger.info("Streaming SlidePlan JSON...")
+        async for chunk in self.gemini_client.stream_content(full_prompt, bypass_cache=bypass_cache):
+            for slide in parser.feed(chunk):
+                yield self._normalize_slide(slide)
+
     async def render_pptx(self, slide_plan: dict, course_id: int) -> str:
         """
         Request Node.js ppt-renderer to create PPTX.
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from shared.clients.llm_cache import ResponseCache
+from shared.mcp_router import MCPRouter
+from rag.gemini_client import GeminiClient
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientRegistry:
+    """
+    Process-wide owner of the ai-authoring LLM clients.
+
+    - The GeminiClient and MCPRouter are built once at startup and shared by all paths.
+    - reload() re-reads settings and hot-swaps the clients if the API key or any
+      model name changed. The GeminiClient is reconfigured in place, so holders
+      such as PptGenerator keep working. The router is replaced.
+    - health_check() verifies each configured model is reachable.
+    """
+
+    def __init__(self, settings_factory: Callable[[], Any], cache: Optional[ResponseCache] = None):
+        self.settings_factory = settings_factory
+        self.cache = cache
+        self.router: Optional[MCPRouter] = None
+        self.health: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+        settings = settings_factory()
+        self._config = self._config_key(settings)
+        self.gemini_client = GeminiClient(
+            api_key=settings.GEMINI_API_KEY or "",
+            primary_model=settings.PRIMARY_LLM_MODEL,
+            fallback_model=settings.FALLBACK_LLM_MODEL,
+            enable_fallback=settings.ENABLE_LLM_FALLBACK,
+            cache=cache,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY_PER_MODEL,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_quota_retries=settings.LLM_MAX_QUOTA_RETRIES
+        )
+        self.router = self._build_router(settings)
+
+    @staticmethod
+    def _config_key(settings) -> Tuple:
+        return (
+            settings.GEMINI_API_KEY,
+            settings.PRIMARY_LLM_MODEL,
+            settings.FALLBACK_LLM_MODEL,
+            settings.ADVANCED_LLM_MODEL,
+            settings.ENABLE_LLM_FALLBACK
+        )
+
+    @staticmethod
+    def _build_router(settings) -> Optional[MCPRouter]:
+        if not settings.GEMINI_API_KEY:
+            return None
+        return MCPRouter(
+            api_key=settings.GEMINI_API_KEY,
+            hedge_enabled=settings.MCP_HEDGE_ENABLED,
+            hedge_default_delay=settings.MCP_HEDGE_DEFAULT_DELAY_SECONDS,
+            hedge_min_delay=settings.MCP_HEDGE_MIN_DELAY_SECONDS,
+            error_rate_threshold=settings.MCP_ERROR_RATE_THRESHOLD,
+            pro_model=settings.ADVANCED_LLM_MODEL,
+            flash_model=settings.FALLBACK_LLM_MODEL
+        )
+
+    def model_names(self) -> list:
+        names = [self.gemini_client.primary_model_name]
+        if self.router:
+            names += [self.router.pro_client.model_name, self.router.flash_client.model_name]
+        return list(dict.fromkeys(names))
+
+    async def reload(self) -> bool:
+        """Re-read settings; swap clients if the LLM configuration changed"""
+        async with self._lock:
+            settings = self.settings_factory()
+            config = self._config_key(settings)
+            if config == self._config:
+                return False
+
+            logger.info("🔄 LLM configuration changed. Hot-swapping clients...")
+            router = self._build_router(settings)
+            self.gemini_client.reconfigure(
+                api_key=settings.GEMINI_API_KEY or "",
+                primary_model=settings.PRIMARY_LLM_MODEL,
+                fallback_model=settings.FALLBACK_LLM_MODEL,
+                enable_fallback=settings.ENABLE_LLM_FALLBACK
+            )
+            self.router = router
+            self._config = config
+            return True
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Check that each configured model is reachable with the current key"""
+        results = {}
+        if not self.gemini_client.api_key:
+            self.health = {"status": "unconfigured", "models": {}, "checked_at": datetime.utcnow().isoformat() + "Z"}
+            return self.health
+
+        for name in self.model_names():
+            try:
+                # Metadata lookup only; no tokens are spent
+                await asyncio.to_thread(genai.get_model, name)
+                results[name] = {"ok": True}
+            except Exception as e:
+                logger.warning(f"LLM health check failed for {name}: {e}")
+                results[name] = {"ok": False, "error": str(e)}
+
+        self.health = {
+            "status": "ok" if all(r["ok"] for r in results.values()) else "degraded",
+            "models": results,
+            "checked_at": datetime.utcnow().isoformat() + "Z"
+        }
+        return self.health
+
+    async def run_maintenance(self, interval_seconds: float):
+        """Background loop: pick up config changes and refresh health"""
+        while True:
+            try:
+                await self.reload()
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"LLM registry maintenance failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "primary_model": self.gemini_client.primary_model_name,
+            "fallback_model": self.gemini_client.fallback_model_name,
+            "router": self.router.get_stats() if self.router else None,
+            "health": self.health
+        }
@@ -2,15 +2,19 @@ import asyncio
 import os
 import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from shared.core.settings import BaseAppSettings
 from shared.core.logging import setup_logging
 from shared.clients.kafka_client import KafkaClient
 from shared.core.event_schemas import ContentGeneratedPayload, PPTGeneratedPayload, ContentReadyForIndexingPayload
-from rag.gemini_client import GeminiClient
+from shared.clients.llm_cache import create_response_cache
+from shared.clients.rate_limiter import Priority, llm_priority
+from shared.mcp_router import ModelType
 from pydantic import BaseModel
 from .generators.ppt_generator import PptGenerator
 from .generators.content_expander import ContentExpander
 from .prompt_builder import PromptBuilder
+from .llm_registry import LLMClientRegistry
 
 
 
@@ -30,13 +34,19 @@ else:
 # Kafka Setup
 kafka_client = KafkaClient(settings.KAFKA_BOOTSTRAP_SERVERS, settings.APP_NAME)
 
-# Initialize Gemini client with configured models
-gemini_client = GeminiClient(
-    api_key=settings.GEMINI_API_KEY or "",
-    primary_model=settings.PRIMARY_LLM_MODEL,
-    fallback_model=settings.FALLBACK_LLM_MODEL,
-    enable_fallback=settings.ENABLE_LLM_FALLBACK
-)
+# LLM response cache (memory LRU, plus SQLite tier when LLM_CACHE_PATH is set)
+llm_cache = None
+if settings.LLM_CACHE_ENABLED:
+    llm_cache = create_response_cache(
+        memory_max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES,
+        disk_path=settings.LLM_CACHE_PATH,
+        disk_max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+    )
+
+# Shared LLM clients (GeminiClient + MCPRouter), built once and hot-swapped on config change
+llm_registry = LLMClientRegistry(Settings, cache=llm_cache)
+gemini_client = llm_registry.gemini_client
 
 ppt_generator = PptGenerator(gemini_client)
 content_expander = ContentExpander()
@@ -84,6 +94,77 @@ class TopicSlideGenRequest(BaseModel):
     prompt_text: str | None = None
     key_concepts: list[str] = []
     prerequisites: list[str] = []
+    bypass_cache: bool = False # Force a fresh LLM call for this topic
+
+def _mock_topic_slides(topic_title: str) -> list:
+    return [
+        {
+            "title": f"Mock Slide {i+1} for {topic_title}",
+            "bullets": ["Mock bullet 1", "Mock bullet 2"],
+            "speaker_notes": "Mock notes...",
+            "illustration_prompt": "A placeholder image",
+            "order": i+1
+        }
+        for i in range(8)
+    ]
+
+def _build_topic_prompt(req: TopicSlideGenRequest) -> str:
+    # Determine effective blueprint or use kg_outline
+    # PromptBuilder expects a blueprint dict, we can pass empty if using outline,
+    # OR we can pass the outline AS blueprint if schema matches?
+    # NO, schema is different. We should pass kg_outline as 'outline' arg.
+    builder = PromptBuilder(
+        spec=req.generation_spec,
+        blueprint=req.blueprint or {},
+        outline=req.kg_outline,
+        topic_context={
+            "module_id": req.module_id,
+            "topic_id": req.topic_id,
+            "module_title": req.module_title,
+            "topic_title": req.topic_title
+        },
+        key_concepts=req.key_concepts,
+        prerequisites=req.prerequisites,
+        global_instructions=req.prompt_text
+    )
+    bundle = builder.build_bundle()
+    return bundle["rendered_prompt"]
+
+def _finalize_topic_slides(start_slides: list) -> list:
+    # If LLM returned fewer/more, maybe we just accept or trim/pad?
+    # Requirement: "Exactly 8 slides per topic enforced"
+    # If < 8, we can duplicate or just pass. 
+    # If > 8, trim.
+    
+    final_slides = start_slides[:8]
+    if len(final_slides) < 8:
+        # Pad with summary/Q&A if needed
+        while len(final_slides) < 8:
+            idx = len(final_slides) + 1
+            final_slides.append({
+                "title": "Extra Context / Reserve Slide",
+                "bullets": ["Additional notes", "Review key concepts"],
+                "speaker_notes": "Reserve slide for pacing.",
+                "illustration_prompt": "Abstract educational background",
+                "order": idx
+            })
+    
+    # Normalize keys (illustration vs illustration_prompt)
+    for i, s in enumerate(final_slides):
+        s["order"] = i + 1
+        # Normalize keys
+        if "slide_title" in s and "title" not in s:
+            s["title"] = s["slide_title"]
+        if "slide_title" in s: s.pop("slide_title")
+            
+        if "illustration" in s and "illustration_prompt" not in s:
+            s["illustration_prompt"] = s["illustration"]
+        if "illustration" in s: s.pop("illustration")
+        
+        if "notes" in s and "speaker_notes" not in s:
+            s["speaker_notes"] = s["notes"]
+        if "notes" in s: s.pop("notes")
+    return final_slides
 
 @app.post("/topics/slides/generate")
 async def generate_topic_slides(req: TopicSlideGenRequest):
@@ -96,84 +177,21 @@ async def generate_topic_slides(req: TopicSlideGenRequest):
         logger.warning("No GEMINI_API_KEY. Returning mock data.")
         return {
             "title": req.topic_title,
-            "slides": [
-                {
-                    "title": f"Mock Slide {i+1} for {req.topic_title}",
-                    "bullets": ["Mock bullet 1", "Mock bullet 2"],
-                    "speaker_notes": "Mock notes...",
-                    "illustration_prompt": "A placeholder image",
-                    "order": i+1
-                }
-                for i in range(8)
-            ]
+            "slides": _mock_topic_slides(req.topic_title)
         }
 
     try:
         # 1. Build Scoped Prompt
-        # Determine effective blueprint or use kg_outline
-        # PromptBuilder expects a blueprint dict, we can pass empty if using outline,
-        # OR we can pass the outline AS blueprint if schema matches?
-        # NO, schema is different. We should pass kg_outline as 'outline' arg.
-        
-        effective_blueprint = req.blueprint or {}
-        
-        builder = PromptBuilder(
-            spec=req.generation_spec,
-            blueprint=effective_blueprint,
-            outline=req.kg_outline,
-            topic_context={
-                "module_id": req.module_id,
-                "topic_id": req.topic_id,
-                "module_title": req.module_title,
-                "topic_title": req.topic_title
-            },
-            key_concepts=req.key_concepts,
-            prerequisites=req.prerequisites,
-            global_instructions=req.prompt_text
-        )
-        bundle = builder.build_bundle()
-        prompt_text = bundle["rendered_prompt"]
+        prompt_text = _build_topic_prompt(req)
 
         # 2. Call Generator
         # PptGenerator.generate_slide_plan returns {"slides": [...]} structure
-        slide_plan = await ppt_generator.generate_slide_plan(prompt_text, effective_blueprint)
+        # Interactive: admitted ahead of queued bulk (Kafka) generations
+        with llm_priority(Priority.INTERACTIVE):
+            slide_plan = await ppt_generator.generate_slide_plan(prompt_text, req.blueprint or {}, bypass_cache=req.bypass_cache)
         
         # 3. Validation / Enforce 8 slides (Best effort)
-        start_slides = slide_plan.get("slides", [])
-        
-        # If LLM returned fewer/more, maybe we just accept or trim/pad?
-        # Requirement: "Exactly 8 slides per topic enforced"
-        # If < 8, we can duplicate or just pass. 
-        # If > 8, trim.
-        
-        final_slides = start_slides[:8]
-        if len(final_slides) < 8:
-            # Pad with summary/Q&A if needed
-            while len(final_slides) < 8:
-                idx = len(final_slides) + 1
-                final_slides.append({
-                    "title": "Extra Context / Reserve Slide",
-                    "bullets": ["Additional notes", "Review key concepts"],
-                    "speaker_notes": "Reserve slide for pacing.",
-                    "illustration_prompt": "Abstract educational background",
-                    "order": idx
-                })
-        
-        # Normalize keys (illustration vs illustration_prompt)
-        for i, s in enumerate(final_slides):
-            s["order"] = i + 1
-            # Normalize keys
-            if "slide_title" in s and "title" not in s:
-                s["title"] = s["slide_title"]
-            if "slide_title" in s: s.pop("slide_title")
-                
-            if "illustration" in s and "illustration_prompt" not in s:
-                s["illustration_prompt"] = s["illustration"]
-            if "illustration" in s: s.pop("illustration")
-            
-            if "notes" in s and "speaker_notes" not in s:
-                s["speaker_notes"] = s["notes"]
-            if "notes" in s: s.pop("notes")
+        final_slides = _finalize_topic_slides(slide_plan.get("slides", []))
         
         return {
             "title": req.topic_title,
@@ -184,8 +202,58 @@ async def generate_topic_slides(req: TopicSlideGenRequest):
         logger.error(f"Topic generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/topics/slides/generate/stream")
+async def stream_topic_slides(req: TopicSlideGenRequest):
+    """
+    Streaming variant of /topics/slides/generate (NDJSON).
+
+    Emits one line per slide as soon as the LLM has finished it:
+        {"type": "slide", "index": 0, "slide": {...}}
+    followed by the final, validated 8-slide deck:
+        {"type": "done", "title": "...", "slides": [...]}
+    or, on failure, {"type": "error", "detail": "..."}.
+    """
+    async def event_stream():
+        if not settings.GEMINI_API_KEY:
+            logger.warning("No GEMINI_API_KEY. Streaming mock data.")
+            slides = _mock_topic_slides(req.topic_title)
+            for i, slide in enumerate(slides):
+                yield json.dumps({"type": "slide", "index": i, "slide": slide}) + "\n"
+            yield json.dumps({"type": "done", "title": req.topic_title, "slides": slides}) + "\n"
+            return
+
+        try:
+            prompt_text = _build_topic_prompt(req)
+            slides = []
+            with llm_priority(Priority.INTERACTIVE):
+                async for slide in ppt_generator.stream_slide_plan(prompt_text, req.blueprint or {}, bypass_cache=req.bypass_cache):
+                    if len(slides) >= 8:
+                        continue
+                    slide["order"] = len(slides) + 1
+                    yield json.dumps({"type": "slide", "index": len(slides), "slide": slide}) + "\n"
+                    slides.append(slide)
+
+            yield json.dumps({
+                "type": "done",
+                "title": req.topic_title,
+                "slides": _finalize_topic_slides(slides)
+            }) + "\n"
+        except Exception as e:
+            logger.error(f"Topic streaming generation failed: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        # Disable proxy buffering so slides reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+llm_maintenance_task = None
+
 @app.on_event("startup")
 async def startup_event():
+    global llm_maintenance_task
     await kafka_client.start_producer()
     # Start consumer in background
     asyncio.create_task(kafka_client.start_consumer(
@@ -193,9 +261,15 @@ async def startup_event():
         callback=process_event,
         group_id="ai-authoring-group"
     ))
+    # Periodic LLM health check + config hot-swap
+    llm_maintenance_task = asyncio.create_task(
+        llm_registry.run_maintenance(settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if llm_maintenance_task:
+        llm_maintenance_task.cancel()
     await kafka_client.stop()
 
 async def process_event(topic: str, message: dict):
@@ -222,10 +296,12 @@ async def process_event(topic: str, message: dict):
 async def handle_ppt_request(event_data: dict):
     course_id = event_data['course_id']
     try:
-        slide_plan = await ppt_generator.generate_slide_plan(
-            event_data['prompt_text'],
-            event_data['blueprint']
-        )
+        # Bulk: yields to interactive requests when the model is rate limited
+        with llm_priority(Priority.BULK):
+            slide_plan = await ppt_generator.generate_slide_plan(
+                event_data['prompt_text'],
+                event_data['blueprint']
+            )
         
         # Render PPTX
         # In Docker, we might need Xvfb for some ppt libs but python-pptx is pure python.
@@ -724,17 +800,13 @@ async def generate_content(request: dict):
         "mode": "design" | "tutoring"
     }
     """
-    from shared.mcp_router import MCPRouter, ModelType
-    
-    if not settings.GEMINI_API_KEY:
+    router = llm_registry.router
+    if router is None:
          # Use dict return for this endpoint structure? Or HTTP 400?
          # Existing error returns {"status": "error"}.
          # But User requested 400.
          raise HTTPException(status_code=400, detail="GEMINI_API_KEY not configured.")
          
-    # Initialize Router
-    router = MCPRouter(api_key=settings.GEMINI_API_KEY)
-    
     prompt = request.get("prompt")
     mode = request.get("mode", "design")
     course_id = request.get("course_id")
@@ -774,6 +846,18 @@ async def generate_content(request: dict):
 async def health_check():
     return {"status": "ok", "service": settings.APP_NAME}
 
+@app.get("/llm/status")
+async def llm_status():
+    """Configured models, router latency stats and last LLM health check"""
+    return llm_registry.status()
+
+@app.post("/llm/reload")
+async def llm_reload():
+    """Re-read LLM settings and hot-swap clients if models/key changed"""
+    swapped = await llm_registry.reload()
+    health = await llm_registry.health_check()
+    return {"swapped": swapped, "health": health}
+
 @app.get("/")
 async def root():
     return {"message": f"Welcome to {settings.APP_NAME}"}
@@ -2,41 +2,178 @@ import google.generativeai as genai
 import json
 import logging
 import asyncio
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from shared.clients.llm_cache import ResponseCache, compute_prompt_hash, make_cache_key
+from shared.clients.llm_client import get_model_semaphore
+from shared.clients.rate_limiter import (
+    backoff_delay,
+    estimate_tokens,
+    get_rate_limiter,
+    is_quota_error,
+    parse_retry_after,
+)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class GeminiClient:
-    def __init__(self, api_key: str, primary_model: str = "gemini-pro", fallback_model: str = "gemini-pro", enable_fallback: bool = False):
+    def __init__(self, api_key: str, primary_model: str = "gemini-pro", fallback_model: str = "gemini-pro", enable_fallback: bool = False, cache: Optional[ResponseCache] = None,
+                 max_concurrency: int = 64, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_quota_retries: int = 3):
         self.api_key = api_key
         self.primary_model_name = primary_model
         self.fallback_model_name = fallback_model
         self.enable_fallback = enable_fallback
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_quota_retries = max_quota_retries
+        self._models: Dict[str, genai.GenerativeModel] = {}
         
         if not api_key:
             logger.warning("Gemini API Key is missing")
         else:
             genai.configure(api_key=api_key)
 
-    async def generate_content(self, prompt: str) -> str:
-        return await self._generate(prompt, self.primary_model_name)
+    def reconfigure(self, api_key: str, primary_model: str, fallback_model: str, enable_fallback: bool):
+        """Swap credentials/models in place; cached model instances are rebuilt lazily"""
+        self.api_key = api_key
+        self.primary_model_name = primary_model
+        self.fallback_model_name = fallback_model
+        self.enable_fallback = enable_fallback
+        self._models = {}
+        if api_key:
+            genai.configure(api_key=api_key)
+        logger.info(f"GeminiClient reconfigured: primary={primary_model}, fallback={fallback_model}")
 
-    async def generate_json(self, prompt: str) -> Dict[str, Any]:
-        text = await self._generate(prompt, self.primary_model_name)
+    def _get_model(self, model_name: str) -> genai.GenerativeModel:
+        """Reuse one GenerativeModel per model name instead of building one per call"""
+        model = self._models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            self._models[model_name] = model
+        return model
+
+    async def generate_content(self, prompt: str, bypass_cache: bool = False) -> str:
+        return await self._cached_generate(prompt, self.primary_model_name, bypass_cache)
+
+    async def generate_json(self, prompt: str, bypass_cache: bool = False) -> Dict[str, Any]:
+        text = await self._cached_generate(prompt, self.primary_model_name, bypass_cache, cacheable=self._is_json)
         return self._parse_json(text)
 
+    async def _cached_generate(self, prompt: str, model_name: str, bypass_cache: bool = False, cacheable=None) -> str:
+        if self.cache is None:
+            return await self._generate(prompt, model_name)
+
+        # No explicit generation_config is sent, so key on the model's default temperature
+        cache_key = make_cache_key(model_name, None, compute_prompt_hash(prompt))
+        if not bypass_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for {model_name}")
+                return cached
+
+        text = await self._generate(prompt, model_name)
+        # Don't pin malformed output in the cache; the next call should retry the model
+        if cacheable is None or cacheable(text):
+            self.cache.set(cache_key, text)
+        return text
+
+    async def _with_quota_retries(self, model_name: str, prompt: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call() once the model's rate limiter admits it (priority order, within
+        RPM/TPM budgets). On a quota error the limiter is paused for the provider's
+        retry-after hint, or an exponential backoff with jitter, and the call is
+        retried up to max_quota_retries times.
+        """
+        limiter = get_rate_limiter(model_name, self.requests_per_minute, self.tokens_per_minute)
+        attempt = 0
+        while True:
+            await limiter.acquire(estimate_tokens(prompt))
+            try:
+                return await call()
+            except Exception as e:
+                if not is_quota_error(str(e)) or attempt >= self.max_quota_retries:
+                    raise
+                delay = parse_retry_after(str(e))
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                logger.warning(f"Gemini quota hit on {model_name}, retrying in {delay:.1f}s: {e}")
+                limiter.pause(delay)
+                attempt += 1
+
     async def _generate(self, prompt: str, model_name: str) -> str:
-        try:
-            model = genai.GenerativeModel(model_name)
-            loop = asyncio.get_running_loop()
-            # method is blocking, run in executor
-            response = await loop.run_in_executor(None, lambda: model.generate_content(prompt))
+        async def send() -> str:
+            model = self._get_model(model_name)
+            # Native async transport; the semaphore caps in-flight requests per model
+            async with get_model_semaphore(model_name, self.max_concurrency):
+                response = await model.generate_content_async(prompt)
             return response.text
+
+        try:
+            return await self._with_quota_retries(model_name, prompt, send)
         except Exception as e:
             logger.error(f"Gemini generation failed: {e}")
             # Simple fallback logic could go here
             raise e
 
+    async def stream_content(self, prompt: str, bypass_cache: bool = False) -> AsyncIterator[str]:
+        """
+        Stream response text from the primary model chunk by chunk.
+        A cached response is replayed as a single chunk.
+        """
+        model_name = self.primary_model_name
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(model_name, None, compute_prompt_hash(prompt))
+            if not bypass_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"LLM cache hit for {model_name}")
+                    yield cached
+                    return
+
+        semaphore = get_model_semaphore(model_name, self.max_concurrency)
+
+        async def open_stream():
+            # Held until the stream is drained; released here only if opening fails
+            await semaphore.acquire()
+            try:
+                # Quota errors surface when the stream is opened, before any chunk is yielded
+                return await self._get_model(model_name).generate_content_async(prompt, stream=True)
+            except BaseException:
+                semaphore.release()
+                raise
+
+        try:
+            response = await self._with_quota_retries(model_name, prompt, open_stream)
+        except Exception as e:
+            logger.error(f"Gemini streaming failed: {e}")
+            raise
+
+        parts = []
+        try:
+            async for chunk in response:
+                text = chunk.text
+                parts.append(text)
+                yield text
+        finally:
+            semaphore.release()
+
+        full_text = "".join(parts)
+        if cache_key and self._is_json(full_text):
+            self.cache.set(cache_key, full_text)
+
+    def _is_json(self, text: str) -> bool:
+        try:
+            json.loads(text.replace("```json", "").replace("```", "").strip())
+            return True
+        except json.JSONDecodeError:
+            return False
+
     def _parse_json(self, text: str) -> Dict[str, Any]:
         try:
             clean_text = text.replace("```json", "").replace("```", "").strip()
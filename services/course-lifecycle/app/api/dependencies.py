@@ -1,5 +1,5 @@
 from fastapi import Depends
-from ..database import SessionLocal
+from ..database import SessionLocal, get_async_session_factory
 
 def get_db():
     db = SessionLocal()
@@ -7,3 +7,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,14 +1,18 @@
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, ConfigDict
 import logging
-import requests
 import asyncio
 from datetime import datetime
 
-from ..dependencies import get_db
+from ..dependencies import get_async_db, get_db
+from ...database import get_async_session_factory
+from ...job_queue import JobQueue, JobQueueFull
+from ...settings import settings
 from ...models import Course, TopicGenerationJob, ReferenceAsset, GenerationSpec, PromptVersion, JobRun
 from ...contracts import ClientCourse, GenerationRequest
 from ...content_generator import create_course_content_bundle
@@ -59,7 +63,7 @@ class PPTRequest(BaseModel):
 class BlueprintUpdateRequest(BaseModel):
     blueprint: Dict[str, Any]
 @router.post("/courses")
-async def create_course(req: CreateCourseRequest, db: Session = Depends(get_db)):
+def create_course(req: CreateCourseRequest, db: Session = Depends(get_db)):
     """Create a new course (Draft)"""
     # Check if exists
     existing = db.query(Course).filter(Course.course_code == req.course_code).first()
@@ -106,14 +110,14 @@ async def create_course(req: CreateCourseRequest, db: Session = Depends(get_db))
     }
 
 @router.get("/courses/{course_id}")
-async def get_course(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(Course).filter(Course.id == course_id).first()
+async def get_course(course_id: int, db: AsyncSession = Depends(get_async_db)):
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
 @router.put("/courses/{course_id}/blueprint")
-async def update_blueprint(course_id: int, req: BlueprintUpdateRequest, db: Session = Depends(get_db)):
+def update_blueprint(course_id: int, req: BlueprintUpdateRequest, db: Session = Depends(get_db)):
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -132,7 +136,7 @@ async def update_blueprint(course_id: int, req: BlueprintUpdateRequest, db: Sess
     return {"status": "updated", "id": course.id}
 
 @router.put("/courses/{course_id}/canonical")
-async def update_canonical_data(course_id: int, client_data: ClientCourse, db: Session = Depends(get_db)):
+def update_canonical_data(course_id: int, client_data: ClientCourse, db: Session = Depends(get_db)):
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -149,7 +153,7 @@ async def update_canonical_data(course_id: int, client_data: ClientCourse, db: S
     return course
 
 @router.post("/courses/{course_id}/generate_v2")
-async def trigger_generation_v2(course_id: int, req: GenerationRequest, db: Session = Depends(get_db)):
+def trigger_generation_v2(course_id: int, req: GenerationRequest, db: Session = Depends(get_db)):
     """Phase-2 Generation Trigger"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
@@ -179,11 +183,11 @@ async def trigger_generation_v2(course_id: int, req: GenerationRequest, db: Sess
     return {"status": "queued"}
 
 @router.get("/courses/{course_id}/topics/{topic_id}", response_model=TopicJobResponse)
-async def get_topic_job(course_id: int, topic_id: str, db: Session = Depends(get_db)):
-    job = db.query(TopicGenerationJob).filter(
+async def get_topic_job(course_id: int, topic_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(TopicGenerationJob).filter(
         TopicGenerationJob.course_id == course_id,
         TopicGenerationJob.topic_id == topic_id
-    ).order_by(TopicGenerationJob.version.desc()).first()
+    ).order_by(TopicGenerationJob.version.desc()).limit(1))
     
     if not job:
         raise HTTPException(status_code=404, detail="Topic job not found")
@@ -194,15 +198,8 @@ async def get_topic_job(course_id: int, topic_id: str, db: Session = Depends(get
         
     return job
 
-@router.post("/courses/{course_id}/topics/{topic_id}/ppt/generate")
-async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[str] = None, auto_sync: bool = True, db: Session = Depends(get_db)):
-    """Trigger generation for a specific topic (REAL GEMINI CALL)"""
-
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Infer module_id/title and topic_title from KG (Primary) or Blueprint (Fallback)
+def _resolve_topic_context(course: Course, topic_id: str, module_id: Optional[str] = None) -> Dict[str, Any]:
+    """Infer module_id/title and topic_title from KG (Primary) or Blueprint (Fallback)"""
     final_module_id = module_id or "unknown"
     topic_title = topic_id
     module_title = "Unknown Module"
@@ -211,7 +208,6 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
     if course.course_graph and course.course_graph.get("children"):
         # 1. Derive Context from KG
         cg = course.course_graph
-        found = False
         
         # Build KG Outline on the fly
         kg_modules = []
@@ -235,7 +231,6 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
                     final_module_id = str(m.get("module_id"))
                     module_title = m.get("name")
                     topic_title = t.get("title")
-                    found = True
             
             kg_modules.append(m_payload)
             
@@ -255,22 +250,31 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
                     module_title = m.get("title") or m.get("name") or "Unknown Module"
                     topic_title = t.get("name") or t.get("title") or topic_id
                     break
-    
-    # Check if AI Authoring is reachable and call it
-    # We call internal service
-    from ...settings import settings
-    ai_auth_url = f"{settings.AI_AUTHORING_URL}/topics/slides/generate"
-    
-    # Merge restrictions into generation_spec
-    gen_spec = course.generation_spec or {}
-    # Ensure constraints dict exists
-    if "constraints" not in gen_spec: gen_spec["constraints"] = {}
-    if "ppt" not in gen_spec["constraints"]: gen_spec["constraints"]["ppt"] = {}
-    
-    # FORCE Production Constraints
-    gen_spec["constraints"]["ppt"]["max_slides"] = 8
-    
-    # 2b. Extract KG Concepts (Optional Feature)
+
+    return {
+        "module_id": final_module_id,
+        "module_title": module_title,
+        "topic_title": topic_title,
+        "kg_outline": kg_outline
+    }
+
+def _list_course_topic_ids(course: Course) -> List[str]:
+    """All topic IDs of a course, from KG (Primary) or Blueprint (Fallback)"""
+    topic_ids = []
+    if course.course_graph and course.course_graph.get("children"):
+        for m in course.course_graph.get("children", []):
+            for t in m.get("children", []):
+                if t.get("topic_id"):
+                    topic_ids.append(str(t.get("topic_id")))
+    elif course.blueprint:
+        for m in course.blueprint.get("modules", []):
+            for t in m.get("topics", []):
+                if isinstance(t, dict) and t.get("id"):
+                    topic_ids.append(str(t.get("id")))
+    return list(dict.fromkeys(topic_ids))
+
+def _extract_kg_concepts(course: Course, topic_id: str):
+    """KG Concepts linked to a topic (Optional Feature). Returns (key_concepts, prerequisites)"""
     key_concepts = []
     prerequisites = []
     
@@ -314,34 +318,67 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
         
         if key_concepts:
             logger.info(f"KG Context: Found {len(key_concepts)} concepts for topic {topic_id}")
+
+    return key_concepts, prerequisites
+
+async def _active_prompt_text(db: AsyncSession, course_id: int) -> Optional[str]:
+    """Text of the course's latest active PromptVersion, if any"""
+    active_pv = await db.scalar(select(PromptVersion).filter(
+        PromptVersion.course_id == course_id,
+        PromptVersion.is_active == 1
+    ).order_by(PromptVersion.version_num.desc()).limit(1))
+    return active_pv.prompt_text if active_pv else None
+
+def _build_topic_payload(course: Course, topic_id: str, module_id: Optional[str] = None, prompt_text: Optional[str] = None) -> Dict[str, Any]:
+    """Build the ai-authoring /topics/slides/generate request for a topic"""
+    ctx = _resolve_topic_context(course, topic_id, module_id)
+    
+    # Merge restrictions into generation_spec
+    gen_spec = course.generation_spec or {}
+    # Ensure constraints dict exists
+    if "constraints" not in gen_spec: gen_spec["constraints"] = {}
+    if "ppt" not in gen_spec["constraints"]: gen_spec["constraints"]["ppt"] = {}
+    
+    # FORCE Production Constraints
+    gen_spec["constraints"]["ppt"]["max_slides"] = 8
+    
+    # 2b. Extract KG Concepts (Optional Feature)
+    key_concepts, prerequisites = _extract_kg_concepts(course, topic_id)
             
     payload = {
-        "course_id": course_id,
-        "module_id": final_module_id,
-        "module_title": module_title,
+        "course_id": course.id,
+        "module_id": ctx["module_id"],
+        "module_title": ctx["module_title"],
         "topic_id": topic_id,
-        "topic_title": topic_title,
-        "kg_outline": kg_outline, # New Source of Truth
+        "topic_title": ctx["topic_title"],
+        "kg_outline": ctx["kg_outline"], # New Source of Truth
         "generation_spec": gen_spec,
         "key_concepts": key_concepts,
         "prerequisites": prerequisites
     }
     
     # 3. Add Active Prompt (if any)
-    active_pv = db.query(PromptVersion).filter(
-        PromptVersion.course_id == course_id,
-        PromptVersion.is_active == 1
-    ).order_by(PromptVersion.version_num.desc()).first()
-    
-    if active_pv:
-        payload["prompt_text"] = active_pv.prompt_text
+    if prompt_text:
+        payload["prompt_text"] = prompt_text
+
+    return payload
+
+async def _call_ai_authoring(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Call ai-authoring for one topic. Returns { title, slides: [] }.
+    Raises HTTPException (503 unreachable, 500 empty response).
+    """
+    # Check if AI Authoring is reachable and call it
+    # We call internal service
+    from ...http_client import service_http
+    ai_auth_url = f"{settings.AI_AUTHORING_URL}/topics/slides/generate"
     
     slides_data = None
     
     try:
-        # Use sync request for now inside async route (or use httpx but requests is simpler dependency if present)
+        # Shared async pool: does not block the event loop while the LLM works
         # Using 90s timeout as generation takes time
-        resp = requests.post(ai_auth_url, json=payload, timeout=90) 
+        resp = await service_http.post(ai_auth_url, json=payload, timeout=90)
         if resp.status_code == 200:
             slides_data = resp.json() # { title, slides: [] }
             # Ensure "slides" key wraps the list if the service returns flat or wrapped
@@ -364,16 +401,20 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
          # Should have raised above if error code
          raise HTTPException(status_code=500, detail="Empty response from AI Service")
 
-    existing = db.query(TopicGenerationJob).filter(
+    return slides_data
+
+async def _persist_topic_job(db: AsyncSession, course_id: int, module_id: str, topic_id: str, slides_data: Dict[str, Any]) -> TopicGenerationJob:
+    """Store generated slides as the next TopicGenerationJob version"""
+    existing = await db.scalar(select(TopicGenerationJob).filter(
         TopicGenerationJob.topic_id == topic_id,
         TopicGenerationJob.course_id == course_id
-    ).order_by(TopicGenerationJob.version.desc()).first()
+    ).order_by(TopicGenerationJob.version.desc()).limit(1))
     
     new_version = (existing.version + 1) if existing else 1
     
     job = TopicGenerationJob(
         course_id=course_id,
-        module_id=final_module_id,
+        module_id=module_id,
         topic_id=topic_id,
         status="GENERATED",
         version=new_version,
@@ -382,47 +423,194 @@ async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[
     )
     
     db.add(job)
-    db.commit() 
-    
-    # Telemetry: JobRun
-    from ...utils import create_db_job_run
-    create_db_job_run(db, course_id, "GENERATE", "COMPLETED", topic_id=topic_id, duration_ms=2000) # Dummy duration
-    
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def _sync_course_graph(db: AsyncSession, course: Course) -> int:
+    """Rebuild the course graph from all topic jobs. Returns the new graph version (0 on failure)"""
+    try:
+        # Import here to avoid circulars if any
+        from ...graph_builder import GraphBuilder
+        
+        # Fetch all jobs (required for GraphBuilder)
+        all_jobs = (await db.scalars(select(TopicGenerationJob).filter(TopicGenerationJob.course_id == course.id))).all()
+        
+        # Instantiate with Course object and Job List
+        logger.info(f"Auto-Sync: Found {len(all_jobs)} jobs for Course {course.id}")
+        builder = GraphBuilder(course, all_jobs)
+        
+        # Build new graph
+        rebuilt_graph, stats = builder.build()
+        logger.info(f"Auto-Sync Stats: {stats}")
+        
+        # Persist to DB
+        course.course_graph = rebuilt_graph.model_dump(mode='json')
+        course.course_graph_version = rebuilt_graph.version
+        await db.commit()
+        await db.refresh(course)
+        
+        return rebuilt_graph.version
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Auto-sync failed: {e}")
+        # Don't fail the request, just log
+        return 0
+
+async def _generate_topic(db: AsyncSession, course: Course, topic_id: str, module_id: Optional[str] = None, auto_sync: bool = True) -> Dict[str, Any]:
+    """Generate one topic end to end: ai-authoring call, TopicGenerationJob, optional graph sync"""
+    payload = _build_topic_payload(course, topic_id, module_id, await _active_prompt_text(db, course.id))
+    final_module_id = payload["module_id"]
+    slides_data = await _call_ai_authoring(payload)
+
+    job = await _persist_topic_job(db, course.id, final_module_id, topic_id, slides_data)
+    # Read before the sync: a failed sync rolls back, expiring `job`, and an
+    # AsyncSession can't lazy-load the attributes again
+    job_id, version = job.id, job.version
     
     # Auto-Sync Graph (Boss Requirement: Remove Friction)
     graph_version = 0
     if auto_sync:
-        try:
-            # Import here to avoid circulars if any
-            from ...graph_builder import GraphBuilder
-            
-            # Fetch all jobs (required for GraphBuilder)
-            all_jobs = db.query(TopicGenerationJob).filter(TopicGenerationJob.course_id == course_id).all()
-            
-            # Instantiate with Course object and Job List
-            logger.info(f"Auto-Sync: Found {len(all_jobs)} jobs for Course {course_id}")
-            builder = GraphBuilder(course, all_jobs)
-            
-            # Build new graph
-            rebuilt_graph, stats = builder.build()
-            logger.info(f"Auto-Sync Stats: {stats}")
-            
-            # Persist to DB
-            course.course_graph = rebuilt_graph.model_dump(mode='json')
-            course.course_graph_version = rebuilt_graph.version
-            db.commit()
-            db.refresh(course)
-            
-            graph_version = rebuilt_graph.version
-        except Exception as e:
-            logger.error(f"Auto-sync failed: {e}")
-            # Don't fail the request, just log
+        graph_version = await _sync_course_graph(db, course)
     
-    return {"status": "triggered", "job_id": job.id, "version": new_version, "module_id": final_module_id, "graph_synced": auto_sync, "graph_version": graph_version}
+    return {"status": "triggered", "job_id": job_id, "version": version, "module_id": final_module_id, "graph_synced": auto_sync, "graph_version": graph_version}
+
+@router.post("/courses/{course_id}/topics/{topic_id}/ppt/generate")
+async def generate_topic_ppt(course_id: int, topic_id: str, module_id: Optional[str] = None, auto_sync: bool = True, db: AsyncSession = Depends(get_async_db)):
+    """Trigger generation for a specific topic (REAL GEMINI CALL)"""
+
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    started = datetime.now()
+    result = await _generate_topic(db, course, topic_id, module_id, auto_sync)
+    
+    # Telemetry: JobRun
+    from ...utils import acreate_db_job_run
+    duration_ms = int((datetime.now() - started).total_seconds() * 1000)
+    await acreate_db_job_run(db, course_id, "GENERATE", "COMPLETED", topic_id=topic_id, duration_ms=duration_ms)
+    
+    return result
+
+async def _run_topic_generation_job(db: AsyncSession, params: Dict[str, Any]) -> Dict[str, Any]:
+    """JobQueue handler for queued topic generations"""
+    course = await db.get(Course, params["course_id"])
+    if not course:
+        raise ValueError(f"Course {params['course_id']} not found")
+    return await _generate_topic(db, course, params["topic_id"], params.get("module_id"), params.get("auto_sync", True))
+
+topic_job_queue = JobQueue(
+    job_type="GENERATE",
+    handler=_run_topic_generation_job,
+    session_factory=lambda: get_async_session_factory()(),
+    workers=settings.TOPIC_JOB_WORKERS,
+    max_size=settings.TOPIC_JOB_QUEUE_MAX_SIZE
+)
+
+@router.post("/courses/{course_id}/topics/{topic_id}/ppt/enqueue", status_code=202)
+async def enqueue_topic_ppt(course_id: int, topic_id: str, module_id: Optional[str] = None, auto_sync: bool = True, db: AsyncSession = Depends(get_async_db)):
+    """
+    Queue generation for a specific topic and return immediately.
+    Poll GET /jobs/{job_id} for status; on completion its result_json holds the
+    same payload /ppt/generate returns.
+    """
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    try:
+        run = await topic_job_queue.enqueue(
+            db,
+            course_id,
+            {"course_id": course_id, "topic_id": topic_id, "module_id": module_id, "auto_sync": auto_sync},
+            topic_id=topic_id
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"status": "queued", "job_id": run.id, "queue_depth": topic_job_queue.depth()}
+
+class BatchTopicGenRequest(BaseModel):
+    topic_ids: List[str] | None = None  # None = all topics in the course graph / blueprint
+    concurrency: int | None = None      # Defaults to TOPIC_BATCH_CONCURRENCY
+    auto_sync: bool = True
+
+@router.post("/courses/{course_id}/topics/generate_batch")
+async def generate_topics_batch(course_id: int, req: BatchTopicGenRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Generate many topics in one call.
+    Topics are sent to ai-authoring in parallel (bounded by `concurrency`), each
+    TopicGenerationJob is persisted as soon as its topic completes, and the
+    course graph is rebuilt once at the end instead of once per topic.
+    """
+    from ...utils import acreate_db_job_run
+
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    topic_ids = list(dict.fromkeys(req.topic_ids)) if req.topic_ids else _list_course_topic_ids(course)
+    if not topic_ids:
+        raise HTTPException(status_code=400, detail="No topics to generate")
+
+    concurrency = max(1, req.concurrency or settings.TOPIC_BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    # Only the prompt lookup touches the DB; payloads are built per topic below
+    prompt_text = await _active_prompt_text(db, course_id)
+    module_ids: Dict[str, str] = {}
+
+    async def generate_one(tid: str):
+        async with semaphore:
+            started = datetime.now()
+            try:
+                # Inside the try: an unknown topic fails on its own instead of the whole batch
+                payload = _build_topic_payload(course, tid, prompt_text=prompt_text)
+                module_ids[tid] = payload["module_id"]
+                slides_data = await _call_ai_authoring(payload)
+                return tid, slides_data, None, started
+            except HTTPException as e:
+                return tid, None, e.detail, started
+            except Exception as e:
+                return tid, None, str(e), started
+
+    logger.info(f"Batch generation: {len(topic_ids)} topics for Course {course_id} (concurrency={concurrency})")
+    results = []
+    
+    # Persist in completion order; all DB work stays on this coroutine
+    for next_done in asyncio.as_completed([generate_one(tid) for tid in topic_ids]):
+        tid, slides_data, error, started = await next_done
+        duration_ms = int((datetime.now() - started).total_seconds() * 1000)
+        if error is not None:
+            logger.error(f"Batch generation failed for topic {tid}: {error}")
+            await acreate_db_job_run(db, course_id, "GENERATE", "FAILED", topic_id=tid, duration_ms=duration_ms, error_details=str(error))
+            results.append({"topic_id": tid, "status": "failed", "error": error})
+            continue
+
+        job = await _persist_topic_job(db, course_id, module_ids[tid], tid, slides_data)
+        await acreate_db_job_run(db, course_id, "GENERATE", "COMPLETED", topic_id=tid, duration_ms=duration_ms)
+        results.append({"topic_id": tid, "status": "generated", "job_id": job.id, "version": job.version, "module_id": job.module_id})
+
+    succeeded = sum(1 for r in results if r["status"] == "generated")
+    
+    # Single graph rebuild for the whole batch
+    graph_version = 0
+    if req.auto_sync and succeeded:
+        graph_version = await _sync_course_graph(db, course)
+
+    return {
+        "status": "completed" if succeeded == len(topic_ids) else ("partial" if succeeded else "failed"),
+        "requested": len(topic_ids),
+        "succeeded": succeeded,
+        "failed": len(topic_ids) - succeeded,
+        "results": results,
+        "graph_synced": req.auto_sync and succeeded > 0,
+        "graph_version": graph_version
+    }
 
 @router.post("/courses/{course_id}/topics/{topic_id}/ppt/verify")
-async def verify_topic_ppt(course_id: int, topic_id: str, db: Session = Depends(get_db)):
+def verify_topic_ppt(course_id: int, topic_id: str, db: Session = Depends(get_db)):
     """Verify topic slides against strict constraints (Validator)"""
     job = db.query(TopicGenerationJob).filter(
         TopicGenerationJob.course_id == course_id,
@@ -480,7 +668,7 @@ async def verify_topic_ppt(course_id: int, topic_id: str, db: Session = Depends(
     return {"status": "VERIFIED"}
 
 @router.post("/courses/{course_id}/ppt/generate")
-async def generate_course_ppt(course_id: int, req: PPTRequest, db: Session = Depends(get_db)):
+def generate_course_ppt(course_id: int, req: PPTRequest, db: Session = Depends(get_db)):
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -490,7 +678,7 @@ async def generate_course_ppt(course_id: int, req: PPTRequest, db: Session = Dep
     return {"status": "queued", "message": "PPT generation started"}
 
 @router.post("/generation-spec")
-async def save_generation_spec(spec: Dict[str, Any], db: Session = Depends(get_db)):
+def save_generation_spec(spec: Dict[str, Any], db: Session = Depends(get_db)):
     """Save Generation Spec (Phase 2)"""
     # Assuming spec has course_id or we extract it. 
     # Frontend sends { course_id, hierarchy_scope, ... }
@@ -507,10 +695,11 @@ async def save_generation_spec(spec: Dict[str, Any], db: Session = Depends(get_d
     return {"status": "saved"}
 
 @router.post("/reference/upload")
-async def upload_reference(file: UploadFile = File(...), course_id: int = 1, db: Session = Depends(get_db)):
+def upload_reference(file: UploadFile = File(...), course_id: int = 1, db: Session = Depends(get_db)):
     """Upload Reference Asset with Text Extraction"""
     try:
-        contents = await file.read()
+        # Plain def: reading, extraction and the writes below block, so this runs in the threadpool
+        contents = file.file.read()
         
         # Extract Text (with optional OCR)
         from ...ocr_utils import extract_text_from_pdf
@@ -558,7 +747,7 @@ async def upload_reference(file: UploadFile = File(...), course_id: int = 1, db:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/prompt/build")
-async def build_prompt(data: Dict[str, Any], db: Session = Depends(get_db)):
+def build_prompt(data: Dict[str, Any], db: Session = Depends(get_db)):
     """Build Prompt"""
     """Build Prompt and Persist Version"""
     course_id = data.get("course_id")
@@ -603,7 +792,7 @@ async def build_prompt(data: Dict[str, Any], db: Session = Depends(get_db)):
     }
 
 @router.post("/prompt/draft")
-async def draft_prompt(data: Dict[str, Any], db: Session = Depends(get_db)):
+def draft_prompt(data: Dict[str, Any], db: Session = Depends(get_db)):
     """Draft Prompt (Pre-build)"""
     return _build_prompt_text(data)
 
@@ -1,28 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 from pathlib import Path
 import os
-import requests
+import httpx
 import logging
 
-from ..dependencies import get_db
+from ..dependencies import get_async_db, get_db
 from ...models import Course
 from ...graph.compiler import GraphCompiler
 from ...graph.validator import GraphValidator
 from ...pdf_builder import PDFBuilder
 from ...utils import log_telemetry # Assume exists
 from ...settings import settings
+from ...http_client import service_http
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/courses/{course_id}/export/ppt")
-async def export_course_ppt(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
+async def export_course_ppt(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """Export Full Course or Single Topic PPT from Graph"""
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.get(Course, course_id)
     if not course or not course.course_graph:
         raise HTTPException(status_code=404, detail="Course/Graph not found")
     
@@ -36,7 +38,7 @@ async def export_course_ppt(course_id: int, force: bool = False, topic_id: Optio
     # 2. Strict HITL Check (Task 2)
     # Enforce all included topics are APPROVED?
     from ...graph_schema import CourseGraph
-    from ...utils import create_db_job_run
+    from ...utils import acreate_db_job_run
     
     if not force:
         try:
@@ -51,7 +53,7 @@ async def export_course_ppt(course_id: int, force: bool = False, topic_id: Optio
                         unapproved.append(t.title)
             
             if unapproved:
-                create_db_job_run(db, course_id, "EXPORT_PPT", "BLOCKED", error_details=f"Unapproved: {unapproved}")
+                await acreate_db_job_run(db, course_id, "EXPORT_PPT", "BLOCKED", error_details=f"Unapproved: {unapproved}")
                 raise HTTPException(status_code=422, detail=f"Cannot export. Unapproved topics: {unapproved}. Use force=true to bypass.")
                 
         except HTTPException:
@@ -91,25 +93,27 @@ async def export_course_ppt(course_id: int, force: bool = False, topic_id: Optio
             "theme": "modern",
             "output_path": str(output_path)
         }
-        # Assuming internal service
-        resp = requests.post(f"http://ppt-renderer:3000/render", json=payload, timeout=120)
+        # Internal service, via the shared keep-alive pool
+        resp = await service_http.post(settings.PPT_RENDERER_URL, json=payload, timeout=120)
         if resp.status_code != 200:
-             create_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details=resp.text)
+             await acreate_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details=resp.text)
              raise HTTPException(status_code=500, detail=f"Renderer failed: {resp.text}")
              
-        create_db_job_run(db, course_id, "EXPORT_PPT", "COMPLETED")
+        await acreate_db_job_run(db, course_id, "EXPORT_PPT", "COMPLETED")
         return resp.json() 
-    except requests.exceptions.ConnectionError:
+    except HTTPException:
+        raise
+    except (httpx.ConnectError, httpx.ConnectTimeout):
         # Fallback Logic: Return error but suggest PDF
-        create_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details="Renderer ConnectionError")
+        await acreate_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details="Renderer ConnectionError")
         raise HTTPException(status_code=503, detail="PPT Service Unavailable. Try PDF Export.")
     except Exception as e:
-        create_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details=str(e))
+        await acreate_db_job_run(db, course_id, "EXPORT_PPT", "FAILED", error_details=str(e))
         logger.error(f"Full export failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/courses/{course_id}/export/ppt")
-async def get_course_ppt(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
+async def get_course_ppt(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """GET Endpoint for Browser Download of PPT"""
     # Reuse logic to generate/ensure existence
     try:
@@ -148,7 +152,7 @@ async def get_course_ppt(course_id: int, force: bool = False, topic_id: Optional
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/courses/{course_id}/export/pdf")
-async def export_course_pdf(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
+def export_course_pdf(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
     """Export Full Course or Single Topic Handout PDF (Determinisric & Local)"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course or not course.course_graph:
@@ -206,10 +210,10 @@ async def export_course_pdf(course_id: int, force: bool = False, topic_id: Optio
          raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/courses/{course_id}/export/pdf")
-async def get_course_pdf(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
+def get_course_pdf(course_id: int, force: bool = False, topic_id: Optional[str] = None, db: Session = Depends(get_db)):
     """GET Endpoint for Browser Download of PDF"""
     try:
-        resp = await export_course_pdf(course_id, force=force, topic_id=topic_id, db=db)
+        resp = export_course_pdf(course_id, force=force, topic_id=topic_id, db=db)
         path = resp.get("pdf_path")
         
         if path and os.path.exists(path):
@@ -223,7 +227,7 @@ async def get_course_pdf(course_id: int, force: bool = False, topic_id: Optional
          raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/courses/{course_id}/export/pdf/download")
-async def download_course_pdf(course_id: int, db: Session = Depends(get_db)):
+def download_course_pdf(course_id: int, db: Session = Depends(get_db)):
     """Download the PDF artifact"""
     # Download PDF artifact
     path = Path(settings.EXPORT_DIR) / str(course_id) / "course_handout.pdf"
@@ -28,7 +28,7 @@ class KGModel(BaseModel):
     version: Optional[int] = 1
 
 @router.get("/{course_id}/graph", response_model=CourseGraph)
-async def get_course_graph(course_id: int, db: Session = Depends(get_db)):
+def get_course_graph(course_id: int, db: Session = Depends(get_db)):
     """Get the Course Graph (Source of Truth)"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
@@ -40,7 +40,7 @@ async def get_course_graph(course_id: int, db: Session = Depends(get_db)):
     return course.course_graph
 
 @router.patch("/{course_id}/graph", response_model=CourseGraph)
-async def update_course_graph(course_id: int, graph_update: CourseGraph, db: Session = Depends(get_db)):
+def update_course_graph(course_id: int, graph_update: CourseGraph, db: Session = Depends(get_db)):
     """Update Course Graph (Full Replacement with Validation)"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
@@ -83,7 +83,7 @@ async def update_course_graph(course_id: int, graph_update: CourseGraph, db: Ses
     return course.course_graph
 
 @router.post("/{course_id}/graph/build")
-async def build_course_graph(course_id: int, db: Session = Depends(get_db)):
+def build_course_graph(course_id: int, db: Session = Depends(get_db)):
     """
     Deterministic Build of Course Graph from Blueprint & Jobs.
     """
@@ -122,7 +122,7 @@ async def build_course_graph(course_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{course_id}/graph/validate")
-async def validate_course_graph(course_id: int, db: Session = Depends(get_db)):
+def validate_course_graph(course_id: int, db: Session = Depends(get_db)):
     """Validate Graph Integrity"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course or not course.course_graph:
@@ -138,7 +138,7 @@ async def validate_course_graph(course_id: int, db: Session = Depends(get_db)):
     return report
 
 @router.post("/{course_id}/topics/{topic_id}/approve", response_model=CourseGraph)
-async def approve_topic_in_graph(
+def approve_topic_in_graph(
     course_id: int, 
     topic_id: str, 
     approval: ApprovalStatus, 
@@ -232,7 +232,7 @@ async def approve_topic_in_graph(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/{course_id}/topics/{topic_id}/slides/{slide_id}", response_model=CourseGraph)
-async def patch_slide_node(
+def patch_slide_node(
     course_id: int, 
     topic_id: str, 
     slide_id: str, 
@@ -322,7 +322,7 @@ async def patch_slide_node(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{course_id}/kg", response_model=KGModel)
-async def get_course_kg(course_id: int, db: Session = Depends(get_db)):
+def get_course_kg(course_id: int, db: Session = Depends(get_db)):
     """Get Graph Layer (Concepts & Relations)"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
@@ -335,7 +335,7 @@ async def get_course_kg(course_id: int, db: Session = Depends(get_db)):
     return KGModel(concepts=graph.concepts, relations=graph.relations, version=graph.version)
 
 @router.patch("/{course_id}/kg", response_model=CourseGraph)
-async def update_course_kg(
+def update_course_kg(
     course_id: int, 
     kg_update: KGModel, 
     client_version: Optional[int] = None,
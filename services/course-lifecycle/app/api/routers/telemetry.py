@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
 from typing import List, Optional
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
-from ..dependencies import get_db
+from shared.db.base import pool_metrics
+
+from ..dependencies import get_async_db
 from ...models import JobRun, AuditEvent, TopicGenerationJob
 
 router = APIRouter()
@@ -20,6 +22,7 @@ class JobRunResponse(BaseModel):
     ended_at: Optional[datetime] = None
     duration_ms: Optional[int] = 0
     error_details: Optional[str] = None
+    result_json: Optional[dict] = None
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -39,10 +42,10 @@ class TelemetryResponse(BaseModel):
     audit_events: List[AuditEventResponse]
 
 @router.get("/courses/{course_id}/telemetry", response_model=TelemetryResponse)
-async def get_course_telemetry(course_id: int, db: Session = Depends(get_db)):
+async def get_course_telemetry(course_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get Timeline of Jobs and Audits"""
-    jobs = db.query(JobRun).filter(JobRun.course_id == course_id).order_by(desc(JobRun.started_at)).limit(50).all()
-    audits = db.query(AuditEvent).filter(AuditEvent.course_id == course_id).order_by(desc(AuditEvent.timestamp)).limit(50).all()
+    jobs = (await db.scalars(select(JobRun).filter(JobRun.course_id == course_id).order_by(desc(JobRun.started_at)).limit(50))).all()
+    audits = (await db.scalars(select(AuditEvent).filter(AuditEvent.course_id == course_id).order_by(desc(AuditEvent.timestamp)).limit(50))).all()
     
     return {
         "jobs": jobs,
@@ -50,16 +53,29 @@ async def get_course_telemetry(course_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/courses/{course_id}/topics/{topic_id}/telemetry", response_model=TelemetryResponse)
-async def get_topic_telemetry(course_id: int, topic_id: str, db: Session = Depends(get_db)):
+async def get_topic_telemetry(course_id: int, topic_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get Telemetry for specific topic"""
-    jobs = db.query(JobRun).filter(JobRun.course_id == course_id, JobRun.topic_id == topic_id).order_by(desc(JobRun.started_at)).all()
-    audits = db.query(AuditEvent).filter(AuditEvent.course_id == course_id, AuditEvent.topic_id == topic_id).order_by(desc(AuditEvent.timestamp)).all()
+    jobs = (await db.scalars(select(JobRun).filter(JobRun.course_id == course_id, JobRun.topic_id == topic_id).order_by(desc(JobRun.started_at)))).all()
+    audits = (await db.scalars(select(AuditEvent).filter(AuditEvent.course_id == course_id, AuditEvent.topic_id == topic_id).order_by(desc(AuditEvent.timestamp)))).all()
     
     return {
         "jobs": jobs,
         "audit_events": audits
     }
 
+@router.get("/admin/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool stats (checked out, overflow, checkout wait) per engine"""
+    return pool_metrics()
+
+@router.get("/jobs/{job_id}", response_model=JobRunResponse)
+async def get_job_status(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Poll a background job (QUEUED -> RUNNING -> COMPLETED | FAILED)"""
+    job = await db.get(JobRun, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 class TimelineEvent(BaseModel):
     id: str
     type: str # AUDIT | EDIT | JOB
@@ -68,14 +84,14 @@ class TimelineEvent(BaseModel):
     details: Optional[dict] = None
 
 @router.get("/courses/{course_id}/audit", response_model=List[TimelineEvent])
-async def get_course_audit_timeline(course_id: int, db: Session = Depends(get_db)):
+async def get_course_audit_timeline(course_id: int, db: AsyncSession = Depends(get_async_db)):
     """Unified Audit Timeline (Approvals, Edits, Jobs)"""
     from ...models import GraphEditLog
     
     events = []
     
     # 1. Audit Events (Approvals)
-    audits = db.query(AuditEvent).filter(AuditEvent.course_id == course_id).all()
+    audits = (await db.scalars(select(AuditEvent).filter(AuditEvent.course_id == course_id))).all()
     for a in audits:
         events.append(TimelineEvent(
             id=f"audit_{a.id}",
@@ -86,7 +102,7 @@ async def get_course_audit_timeline(course_id: int, db: Session = Depends(get_db
         ))
         
     # 2. Graph Edit Logs
-    edits = db.query(GraphEditLog).filter(GraphEditLog.course_id == course_id).all()
+    edits = (await db.scalars(select(GraphEditLog).filter(GraphEditLog.course_id == course_id))).all()
     for e in edits:
         events.append(TimelineEvent(
             id=f"edit_{e.id}",
@@ -97,7 +113,7 @@ async def get_course_audit_timeline(course_id: int, db: Session = Depends(get_db
         ))
         
     # 3. Jobs (Significant ones)
-    jobs = db.query(JobRun).filter(JobRun.course_id == course_id).all()
+    jobs = (await db.scalars(select(JobRun).filter(JobRun.course_id == course_id))).all()
     for j in jobs:
         events.append(TimelineEvent(
             id=f"job_{j.id}",
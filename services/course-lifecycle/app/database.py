@@ -1,9 +1,33 @@
-from shared.db.base import get_db_engine, get_session_local
+from shared.db.base import engine_options, get_async_db_engine, get_async_session_local, get_db_engine, get_session_local
 from .settings import settings
 
-engine = get_db_engine(settings.DATABASE_URL)
+engine = get_db_engine(settings.DATABASE_URL, name="course-lifecycle", **engine_options(settings))
 SessionLocal = get_session_local(engine)
 
+# asyncpg engine for async routes. Created on first use, so scripts and tools
+# that only use SessionLocal never need the async driver.
+async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_session_factory():
+    global async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        async_engine = get_async_db_engine(
+            settings.DATABASE_URL,
+            name="course-lifecycle-async",
+            prepared_statement_cache_size=settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+            **engine_options(settings)
+        )
+        _AsyncSessionLocal = get_async_session_local(async_engine)
+    return _AsyncSessionLocal
+
+async def dispose_async_engine():
+    global async_engine, _AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    _AsyncSessionLocal = None
+
 def get_db():
     db = SessionLocal()
     try:
@@ -3,6 +3,7 @@ import httpx
 from typing import List, Dict, Any
 from .contracts import EvidenceItem, EvidenceSourceType
 from .settings import settings
+from .http_client import service_http
 
 logger = logging.getLogger(__name__)
 
@@ -18,21 +19,20 @@ async def retrieve_evidence(course_id: int, topic_ids: List[Dict[str, str]], k:
             "k": k
         }
         
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{settings.RAG_INDEXER_URL}/retrieve",
-                json=payload,
-                timeout=30.0
-            )
-            resp.raise_for_status()
-            results_map = resp.json()
-            
-            # Post-process if needed to ensure EvidenceItem compatibility
-            # API returns dicts that look like EvidenceItems, so we might pass them through
-            # or minimally validate.
-            
-            # Ensure return type matches Dict[str, List[Dict]]
-            return results_map
+        resp = await service_http.post(
+            f"{settings.RAG_INDEXER_URL}/retrieve",
+            json=payload,
+            timeout=30.0
+        )
+        resp.raise_for_status()
+        results_map = resp.json()
+        
+        # Post-process if needed to ensure EvidenceItem compatibility
+        # API returns dicts that look like EvidenceItems, so we might pass them through
+        # or minimally validate.
+        
+        # Ensure return type matches Dict[str, List[Dict]]
+        return results_map
 
     except Exception as e:
         logger.error(f"Error retrieving evidence from RAG service: {e}")
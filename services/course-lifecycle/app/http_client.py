@@ -0,0 +1,10 @@
+from shared.clients.http_client import ServiceHTTPClient
+from .settings import settings
+
+# Shared keep-alive pool for ai-authoring, ppt-renderer and rag-indexer calls (closed on shutdown)
+service_http = ServiceHTTPClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+    max_retries=settings.HTTP_MAX_RETRIES
+)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+
+from .models import JobRun
+
+if TYPE_CHECKING:
+    # sqlalchemy.ext.asyncio needs greenlet; keep this module importable without it
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# handler(db, params) -> result dict, stored on the JobRun
+JobHandler = Callable[["AsyncSession", Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    In-process background job queue.
+
+    enqueue() writes a QUEUED JobRun and returns it immediately; a pool of asyncio
+    worker tasks runs the handler, moving the JobRun to RUNNING and then COMPLETED
+    (with the handler's result) or FAILED (with the error), recording real start/end
+    timings. Clients poll the JobRun by id. All DB work uses AsyncSessions, so
+    workers never block the event loop.
+
+    Jobs live in process memory: runs left QUEUED/RUNNING by a restart are marked
+    FAILED on start().
+    """
+
+    def __init__(
+        self,
+        job_type: str,
+        handler: JobHandler,
+        session_factory: Callable[[], "AsyncSession"],
+        workers: int = 4,
+        max_size: int = 1000
+    ):
+        self.job_type = job_type
+        self.handler = handler
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._tasks: List[asyncio.Task] = []
+
+    async def enqueue(self, db: "AsyncSession", course_id: int, params: Dict[str, Any], topic_id: Optional[str] = None) -> JobRun:
+        """Record a QUEUED JobRun and hand it to the workers. Raises JobQueueFull."""
+        run = JobRun(
+            course_id=course_id,
+            topic_id=topic_id,
+            job_type=self.job_type,
+            status="QUEUED",
+            started_at=datetime.now()
+        )
+        db.add(run)
+        await db.commit()
+        await db.refresh(run)
+
+        try:
+            self._queue.put_nowait((run.id, params))
+        except asyncio.QueueFull:
+            run.status = "FAILED"
+            run.ended_at = datetime.now()
+            run.error_details = "Job queue full"
+            await db.commit()
+            raise JobQueueFull(f"{self.job_type} queue is full ({self._queue.maxsize} jobs)")
+
+        logger.info(f"Queued {self.job_type} job {run.id} (queue depth {self._queue.qsize()})")
+        return run
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        if self._tasks:
+            return
+        await self._fail_interrupted_runs()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} {self.job_type} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _fail_interrupted_runs(self):
+        try:
+            async with self.session_factory() as db:
+                stale = (await db.scalars(select(JobRun).filter(
+                    JobRun.job_type == self.job_type,
+                    JobRun.status.in_(["QUEUED", "RUNNING"])
+                ))).all()
+                for run in stale:
+                    run.status = "FAILED"
+                    run.ended_at = datetime.now()
+                    run.error_details = "Interrupted by service restart"
+                await db.commit()
+            if stale:
+                logger.warning(f"Marked {len(stale)} interrupted {self.job_type} jobs as FAILED")
+        except Exception as e:
+            logger.error(f"Failed to recover interrupted {self.job_type} jobs: {e}")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            run_id, params = await self._queue.get()
+            try:
+                await self._run(run_id, params)
+            except Exception as e:
+                logger.error(f"{self.job_type} worker {worker_id} crashed on job {run_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, run_id: int, params: Dict[str, Any]):
+        async with self.session_factory() as db:
+            run = await db.get(JobRun, run_id)
+            if not run:
+                logger.error(f"JobRun {run_id} vanished before execution")
+                return
+
+            run.status = "RUNNING"
+            run.started_at = datetime.now()
+            await db.commit()
+
+            start = time.monotonic()
+            try:
+                result = await self.handler(db, params)
+                run.status = "COMPLETED"
+                run.result_json = result
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"{self.job_type} job {run_id} failed: {e}")
+                # Reload: the rollback expired it, and async sessions can't lazy-load
+                run = await db.get(JobRun, run_id, populate_existing=True)
+                run.status = "FAILED"
+                run.error_details = str(e)
+
+            run.ended_at = datetime.now()
+            run.duration_ms = int((time.monotonic() - start) * 1000)
+            await db.commit()
@@ -10,7 +10,8 @@ from shared.core.logging import setup_logging
 from shared.clients.kafka_client import KafkaClient
 
 from .settings import settings
-from .database import engine, SessionLocal
+from .database import engine, SessionLocal, dispose_async_engine
+from .http_client import service_http
 from .api.routers import graph, courses, export, telemetry, syllabus
 from .models import Base
 
@@ -102,6 +103,10 @@ async def startup_event():
                     error_details TEXT
                 )
             """))
+            res = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='job_runs' AND column_name='result_json'"))
+            if not res.fetchone():
+                 logger.info("⚡ Migrating: Adding 'result_json' to job_runs...")
+                 conn.execute(text("ALTER TABLE job_runs ADD COLUMN result_json JSONB"))
             conn.execute(text("""
                 CREATE TABLE IF NOT EXISTS audit_events (
                     id SERIAL PRIMARY KEY,
@@ -119,7 +124,10 @@ async def startup_event():
         logger.error(f"DB Startup Logic Failed: {e}")
         # Continue? Yes, might be transient.
 
-    # 2. Kafka
+    # 2. Background topic generation workers
+    await courses.topic_job_queue.start()
+
+    # 3. Kafka
     await kafka_client.start_producer()
     asyncio.create_task(kafka_client.start_consumer(
         topics=["course.events"],
@@ -127,7 +135,7 @@ async def startup_event():
         group_id="course-lifecycle-group"
     ))
     
-    # 3. Seeding
+    # 4. Seeding
     if settings.COURSE_SEED_ENABLED:
         try:
             from .seed import seed_courses, seed_templates
@@ -140,6 +148,9 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await courses.topic_job_queue.stop()
+    await service_http.aclose()
+    await dispose_async_engine()
     await kafka_client.stop()
 
 # --- Kafka Consumer Callback (Moved from old main) ---
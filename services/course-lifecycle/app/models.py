@@ -178,11 +178,12 @@ class JobRun(Base):
     course_id = Column(Integer, index=True)
     topic_id = Column(String, nullable=True, index=True)
     job_type = Column(String) # GENERATE, BUILD, VALIDATE, EXPORT
-    status = Column(String) # RUNNING, COMPLETED, FAILED
+    status = Column(String) # QUEUED, RUNNING, COMPLETED, FAILED
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     ended_at = Column(DateTime(timezone=True), nullable=True)
     duration_ms = Column(Integer, nullable=True)
     error_details = Column(Text, nullable=True)
+    result_json = Column(JSON, nullable=True) # Output of background jobs (JobQueue)
 
 class AuditEvent(Base):
     __tablename__ = "audit_events"
@@ -7,6 +7,17 @@ class Settings(BaseAppSettings):
     DEEPSEEK_API_KEY: str | None = None
     EXPORT_DIR: str = "/app/generated_data/exports"
     AI_AUTHORING_URL: str = "http://ai-authoring:8000"
+    RAG_INDEXER_URL: str = "http://rag-indexer:8000"
+    PPT_RENDERER_URL: str = "http://ppt-renderer:3000/render"
+    TOPIC_BATCH_CONCURRENCY: int = 4
+    TOPIC_JOB_WORKERS: int = 4
+    TOPIC_JOB_QUEUE_MAX_SIZE: int = 1000
+    
+    # Inter-service HTTP pool (per target host)
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_MAX_RETRIES: int = 2
     ENABLE_OCR: bool = False
     OCR_SERVICE_URL: str | None = None
     VERSION: str = "0.1.0"
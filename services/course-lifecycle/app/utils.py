@@ -1,9 +1,14 @@
 import logging
 import json
 from datetime import datetime
+from typing import TYPE_CHECKING
 from sqlalchemy.orm import Session
 from .models import JobRun, AuditEvent
 
+if TYPE_CHECKING:
+    # sqlalchemy.ext.asyncio needs greenlet; keep this module importable without it
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 logger = logging.getLogger(__name__)
 
 def log_telemetry(event_name: str, course_code: str, details: dict = None):
@@ -23,24 +28,35 @@ def log_telemetry(event_name: str, course_code: str, details: dict = None):
     }
     logger.info(f"TELEMETRY: {json.dumps(payload)}")
 
+def _job_run(course_id: int, job_type: str, status: str, topic_id: str = None, duration_ms: int = 0, error_details: str = None) -> JobRun:
+    return JobRun(
+        course_id=course_id,
+        topic_id=topic_id,
+        job_type=job_type,
+        status=status,
+        duration_ms=duration_ms,
+        error_details=error_details,
+        started_at=datetime.now() if duration_ms == 0 else datetime.fromtimestamp(datetime.now().timestamp() - (duration_ms / 1000.0)),
+        ended_at=datetime.now()
+    )
+
 def create_db_job_run(db: Session, course_id: int, job_type: str, status: str, topic_id: str = None, duration_ms: int = 0, error_details: str = None):
     """Create a persistent JobRun in the DB"""
     try:
-        run = JobRun(
-            course_id=course_id,
-            topic_id=topic_id,
-            job_type=job_type,
-            status=status,
-            duration_ms=duration_ms,
-            error_details=error_details,
-            started_at=datetime.now() if duration_ms == 0 else datetime.fromtimestamp(datetime.now().timestamp() - (duration_ms / 1000.0)),
-            ended_at=datetime.now()
-        )
-        db.add(run)
+        db.add(_job_run(course_id, job_type, status, topic_id, duration_ms, error_details))
         db.commit()
     except Exception as e:
         logger.error(f"Failed to write JobRun: {e}")
 
+async def acreate_db_job_run(db: "AsyncSession", course_id: int, job_type: str, status: str, topic_id: str = None, duration_ms: int = 0, error_details: str = None):
+    """create_db_job_run for an AsyncSession"""
+    try:
+        db.add(_job_run(course_id, job_type, status, topic_id, duration_ms, error_details))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to write JobRun: {e}")
+
 def create_db_audit_event(db: Session, course_id: int, action: str, actor_id: str = "system", topic_id: str = None, comment: str = None):
     """Create a persistent AuditEvent in the DB"""
     try:
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+import pytest
+
+# AsyncSession needs greenlet; the in-memory database needs the aiosqlite driver
+pytest.importorskip("greenlet")
+pytest.importorskip("aiosqlite")
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.db.base import Base, get_async_session_local
+from app.api.routers import courses
+from app.graph_builder import GraphBuilder
+from app.job_queue import JobQueue
+from app.models import Course, JobRun, TopicGenerationJob
+
+BLUEPRINT = {"modules": [{"id": "M1", "title": "Module 1", "topics": [{"id": "T1", "name": "Topic 1"}]}]}
+
+def _run(coro):
+    return asyncio.run(coro)
+
+async def _session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = get_async_session_local(engine)
+    async with factory() as db:
+        db.add(Course(id=1, title="Course", blueprint=BLUEPRINT))
+        await db.commit()
+    return factory
+
+@pytest.fixture
+def failing_graph_sync(monkeypatch):
+    async def fake_ai_authoring(payload):
+        return {"title": payload["topic_title"], "slides": [{"title": "Slide 1"}]}
+
+    def broken_build(self):
+        raise RuntimeError("graph build failed")
+
+    monkeypatch.setattr(courses, "_call_ai_authoring", fake_ai_authoring)
+    monkeypatch.setattr(GraphBuilder, "build", broken_build)
+
+def test_graph_sync_failure_still_returns_generated_job(failing_graph_sync):
+    async def scenario():
+        factory = await _session_factory()
+        async with factory() as db:
+            course = await db.get(Course, 1)
+            result = await courses._generate_topic(db, course, "T1", auto_sync=True)
+            job = await db.get(TopicGenerationJob, result["job_id"])
+            return result, job
+
+    result, job = _run(scenario())
+
+    assert result["version"] == 1
+    assert result["module_id"] == "M1"
+    assert result["graph_version"] == 0
+    assert job is not None and job.status == "GENERATED"
+
+def test_queued_job_completes_when_graph_sync_fails(failing_graph_sync):
+    async def scenario():
+        factory = await _session_factory()
+        queue = JobQueue("GENERATE", courses._run_topic_generation_job, session_factory=factory)
+        async with factory() as db:
+            run = await queue.enqueue(db, 1, {"course_id": 1, "topic_id": "T1", "auto_sync": True}, topic_id="T1")
+        run_id, params = queue._queue.get_nowait()
+        await queue._run(run_id, params)
+        async with factory() as db:
+            return await db.get(JobRun, run.id)
+
+    run = _run(scenario())
+
+    assert run.status == "COMPLETED"
+    assert run.result_json["version"] == 1
@@ -2,12 +2,13 @@ import os
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 import logging
 
 from shared.core.settings import BaseAppSettings
 from shared.core.logging import setup_logging
+from shared.db.base import engine_options, get_db_engine, pool_metrics
 from .pdf_generator import PDFGenerator
 from .pptx_generator import PPTXGenerator
 
@@ -20,7 +21,7 @@ logger = setup_logging(settings.APP_NAME)
 app = FastAPI(title=settings.APP_NAME)
 
 # Database Setup (Read-only access to fetch course content)
-engine = create_engine(settings.DATABASE_URL)
+engine = get_db_engine(settings.DATABASE_URL, name="exporter", **engine_options(settings))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Generators
@@ -34,6 +35,11 @@ class ExportRequest(BaseModel):
 async def health_check():
     return {"status": "ok", "service": settings.APP_NAME}
 
+@app.get("/admin/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool stats (checked out, overflow, checkout wait) per engine"""
+    return pool_metrics()
+
 def get_course_data(course_id: int):
     with SessionLocal() as db:
         result = db.execute(
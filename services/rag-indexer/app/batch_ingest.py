@@ -1,41 +1,310 @@
-
+import asyncio
+import hashlib
+import json
 import os
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .extraction import SUPPORTED_EXTENSIONS, file_sha256
 from .indexer import Indexer
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class IngestProgress:
+    course_id: int
+    source_path: str
+    status: str = "RUNNING"  # RUNNING | COMPLETED | FAILED
+    files_total: int = 0
+    files_unchanged: int = 0 # Fingerprint matches the manifest
+    files_extracted: int = 0
+    files_ingested: int = 0
+    files_skipped: int = 0   # No extractable text
+    files_failed: int = 0
+    files_removed: int = 0   # In the manifest but gone from disk
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_written: int = 0
+    started_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["elapsed_seconds"] = round((self.ended_at or time.time()) - self.started_at, 2)
+        return data
+
 class BatchIngester:
-    def __init__(self, indexer: Indexer):
+    """
+    Pipelined directory ingestion:
+
+        extract  -- process pool, extract_workers files at a time
+          -> chunk queue (bounded: queue_max_chunks)
+        embed    -- embed_batch_size chunks per embedding call, embed_concurrency calls in flight
+          -> write queue (bounded)
+        write    -- write_batch_size rows per vector-store insert
+
+    Stages overlap, and the bounded queues push back on extraction when
+    embedding or writing fall behind, so memory stays flat on large packs.
+    Per-course progress is kept in self.progress.
+
+    Ingestion is incremental against the vector store's ingest_manifest: files
+    whose size/mtime (or, failing that, sha256) and ingest metadata are unchanged
+    are skipped, changed files have their chunks replaced atomically once all of
+    them are embedded, and files removed from the directory are purged.
+    """
+    # Flush a partial embedding batch after the chunk queue has been idle this long
+    EMBED_LINGER_SECONDS = 0.5
+
+    def __init__(
+        self,
+        indexer: Indexer,
+        extract_workers: int = 0,
+        queue_max_chunks: int = 2000,
+        embed_batch_size: int = 500,
+        embed_concurrency: int = 2,
+        write_batch_size: int = 1000
+    ):
         self.indexer = indexer
-        
-    async def ingest_directory(self, course_id: int, source_path: str, extra_metadata: dict = None):
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.queue_max_chunks = queue_max_chunks
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.write_batch_size = write_batch_size
+        self.progress: Dict[int, IngestProgress] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: this process runs an event loop and client threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def discover_files(source_path: str) -> List[str]:
+        paths = []
+        for root, _, files in os.walk(source_path):
+            for file in files:
+                if os.path.splitext(file)[1].lower() in SUPPORTED_EXTENSIONS:
+                    paths.append(os.path.join(root, file))
+        return sorted(paths)
+
+    def _metadata_sha256(self, extra_metadata: Optional[dict]) -> str:
+        # Chunker settings are part of the fingerprint: changing them re-chunks every file
+        fingerprint = {"metadata": extra_metadata or {}, "chunker": self.indexer.chunker.config}
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    async def ingest_directory(self, course_id: int, source_path: str, extra_metadata: dict = None, force: bool = False):
         """
-        Walk directory and ingest supported files.
+        Walk directory and ingest new or changed supported files.
         source_path: Absolute path inside container (e.g. /app/data1/catalog/courses/...)
+        force: Re-ingest every file, ignoring the manifest fingerprints.
+        Returns the number of files whose chunks were (re)stored.
         """
         if not os.path.exists(source_path):
             logger.error(f"Source path not found: {source_path}")
             raise FileNotFoundError(f"{source_path} does not exist")
-            
-        logger.info(f"Starting batch ingest for course {course_id} from {source_path}")
-        
-        count = 0
-        for root, _, files in os.walk(source_path):
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in ['.pdf', '.pptx', '.txt']:
-                    full_path = os.path.join(root, file)
-                    # Infer scope from directory structure if possible?
-                    # E.g. /module1/... 
-                    # For now, simplistic flat ingest or use parent dir name as topic?
-                    
-                    try:
-                        logger.info(f"Ingesting {file}...")
-                        await self.indexer.index_file(course_id, full_path, extra_metadata=extra_metadata)
-                        count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to ingest {file}: {e}")
-                        
-        logger.info(f"Batch ingest complete. Processed {count} files.")
-        return count
+        if not self.indexer.embedding_client:
+            raise ValueError("Embedding client not initialized (Missing API Key)")
+
+        source_path = os.path.abspath(source_path)
+        vector_store = self.indexer.vector_store
+        files = self.discover_files(source_path)
+        progress = IngestProgress(course_id=course_id, source_path=source_path, files_total=len(files))
+        self.progress[course_id] = progress
+        logger.info(f"Starting batch ingest for course {course_id} from {source_path} ({len(files)} files)")
+
+        manifest = await vector_store.aget_manifest(course_id, path_prefix=os.path.join(source_path, ""))
+        metadata_sha256 = self._metadata_sha256(extra_metadata)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_max_chunks)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        extract_slots = asyncio.Semaphore(self.extract_workers)
+        embed_slots = asyncio.Semaphore(self.embed_concurrency)
+        entries: Dict[str, Dict[str, Any]] = {} # file -> new manifest entry
+        buffered: Dict[str, List[tuple]] = {}   # file -> embedded (chunk, vector, metadata)
+        ready: List[str] = []                   # files fully embedded, awaiting write
+        touched: List[Dict[str, Any]] = []      # unchanged content, new mtime
+        failed: Set[str] = set()
+
+        def mark_failed(paths):
+            for path in paths:
+                if path not in failed:
+                    failed.add(path)
+                    buffered.pop(path, None)
+                    progress.files_failed += 1
+
+        async def extract_one(path: str):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logger.error(f"Failed to stat {path}: {e}")
+                mark_failed([path])
+                return
+            entry = {
+                "course_id": course_id,
+                "path": path,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "metadata_sha256": metadata_sha256
+            }
+            known = manifest.get(path)
+            same_metadata = known is not None and known["metadata_sha256"] == metadata_sha256
+            if not force and same_metadata and known["size"] == entry["size"] and known["mtime"] == entry["mtime"]:
+                progress.files_unchanged += 1
+                return
+
+            # The slot is held until the file's chunks are queued, so a full
+            # queue throttles extraction
+            async with extract_slots:
+                try:
+                    entry["sha256"] = await loop.run_in_executor(executor, file_sha256, path)
+                    if not force and same_metadata and known["sha256"] == entry["sha256"]:
+                        touched.append({**entry, "chunk_count": known["chunk_count"]})
+                        progress.files_unchanged += 1
+                        return
+                    sections = await self.indexer.extract_file_sections(path, executor=executor)
+                except Exception as e:
+                    logger.error(f"Failed to extract {os.path.basename(path)}: {e}")
+                    mark_failed([path])
+                    return
+                progress.files_extracted += 1
+
+                chunks, metadatas = [], []
+                if sections:
+                    chunks, metadatas = self.indexer.chunk_document(
+                        course_id, os.path.basename(path), sections, extra_metadata=extra_metadata
+                    )
+                entry["chunk_count"] = len(chunks)
+                entries[path] = entry
+                buffered[path] = []
+                if not chunks:
+                    # Recorded with no chunks (replacing any previous ones)
+                    progress.files_skipped += 1
+                    ready.append(path)
+                    return
+
+                progress.chunks_total += len(chunks)
+                for chunk, meta in zip(chunks, metadatas):
+                    meta["source_path"] = path
+                    await chunk_queue.put((path, chunk, meta))
+
+        async def embed_and_forward(batch):
+            try:
+                results = await self.indexer.embedding_client.embed_batch([chunk for _, chunk, _ in batch])
+                progress.chunks_embedded += len(batch)
+                await write_queue.put((batch, [r.embedding for r in results]))
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} chunks failed: {e}")
+                mark_failed({path for path, _, _ in batch})
+            finally:
+                embed_slots.release()
+
+        async def embed_stage():
+            tasks = set()
+            batch = []
+            done = False
+            while not done:
+                try:
+                    timeout = self.EMBED_LINGER_SECONDS if batch else None
+                    item = await asyncio.wait_for(chunk_queue.get(), timeout=timeout)
+                    if item is None:
+                        done = True
+                    else:
+                        batch.append(item)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    if not done and len(batch) < self.embed_batch_size:
+                        continue
+                if batch:
+                    await embed_slots.acquire()
+                    task = asyncio.create_task(embed_and_forward(batch))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    batch = []
+            await asyncio.gather(*tasks)
+            await write_queue.put(None)
+
+        async def write_ready():
+            paths = [path for path in ready if path not in failed]
+            ready.clear()
+            if not paths:
+                return
+            rows = [row for path in paths for row in buffered.pop(path)]
+            try:
+                await vector_store.areplace_documents(
+                    course_id,
+                    paths,
+                    [chunk for chunk, _, _ in rows],
+                    [vector for _, vector, _ in rows],
+                    [meta for _, _, meta in rows],
+                    manifest=[entries[path] for path in paths]
+                )
+            except Exception as e:
+                logger.error(f"Writing {len(rows)} chunks of {len(paths)} files failed: {e}")
+                mark_failed(paths)
+                return
+            progress.chunks_written += len(rows)
+            progress.files_ingested += sum(1 for path in paths if entries[path]["chunk_count"])
+            logger.info(
+                f"Batch ingest course {course_id}: {progress.files_ingested + progress.files_unchanged}/{progress.files_total} files, "
+                f"{progress.chunks_written}/{progress.chunks_total} chunks stored"
+            )
+
+        async def write_stage():
+            ready_rows = 0
+            while True:
+                item = await write_queue.get()
+                if item is None:
+                    break
+                for (path, chunk, meta), vector in zip(*item):
+                    if path in failed:
+                        continue
+                    buffered[path].append((chunk, vector, meta))
+                    if len(buffered[path]) == entries[path]["chunk_count"]:
+                        ready.append(path)
+                        ready_rows += len(buffered[path])
+                if ready_rows >= self.write_batch_size:
+                    await write_ready()
+                    ready_rows = 0
+            await write_ready()
+
+        embedder = asyncio.create_task(embed_stage())
+        writer = asyncio.create_task(write_stage())
+        try:
+            await asyncio.gather(*(extract_one(path) for path in files))
+            await chunk_queue.put(None)
+            await embedder
+            await writer
+        except BaseException:
+            embedder.cancel()
+            writer.cancel()
+            progress.status = "FAILED"
+            progress.ended_at = time.time()
+            raise
+
+        if touched:
+            await vector_store.aupsert_manifest(touched)
+        removed = sorted(set(manifest) - set(files))
+        if removed:
+            await vector_store.apurge_sources(course_id, removed)
+            progress.files_removed = len(removed)
+
+        progress.status = "COMPLETED"
+        progress.ended_at = time.time()
+        logger.info(f"Batch ingest complete. {progress.to_dict()}")
+        return progress.files_ingested
@@ -0,0 +1,189 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Same heuristic as the LLM rate limiter; keeps this module free of shared imports
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*|[IVX]+)[.)]?\s+\S")
+_SEPARATOR = "\n\n"
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+@dataclass
+class Section:
+    """A structural unit of a document: a PDF page, a slide, or (part of) a text file"""
+    text: str
+    page_number: Optional[int] = None
+    kind: str = "page"  # page | slide | text | ocr
+    continued: bool = False  # Next piece of the previous section, not a structural break
+
+@dataclass
+class Chunk:
+    text: str
+    page_number: Optional[int] = None  # First page/slide the chunk draws from
+    locator: Optional[str] = None      # e.g. "p. 3", "pp. 3-4", "slides 2-5"
+    heading: Optional[str] = None      # Nearest heading at the start of the chunk
+
+def is_heading(line: str) -> bool:
+    """Markdown, numbered ("2.1 Binary Trees") or ALL-CAPS title lines"""
+    line = line.strip()
+    if not line or len(line) > 100:
+        return False
+    if line.startswith("#"):
+        return True
+    if line[-1] in ".,;:!?" or len(line.split()) > 10:
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+def _locator(kind: str, first: Optional[int], last: Optional[int]) -> Optional[str]:
+    if first is None:
+        return None
+    if kind == "slide":
+        return f"slide {first}" if first == last else f"slides {first}-{last}"
+    if kind == "page":
+        return f"p. {first}" if first == last else f"pp. {first}-{last}"
+    return None
+
+class Chunker:
+    """
+    Structure-aware chunker.
+
+    Sections are split into blocks at paragraph breaks, with heading lines as
+    blocks of their own. Consecutive blocks are packed into chunks of up to
+    max_tokens. A heading or a new page/slide starts a new chunk once the current
+    one holds min_tokens, so short slides and pages are merged rather than
+    embedded alone. When a chunk is cut mid-flow because of the budget, its last
+    overlap_tokens carry over into the next chunk, shortened or dropped so the
+    next chunk stays within max_tokens. Blocks over budget are split at sentence,
+    then word, boundaries. Tokens are estimated at ~4 characters each.
+    """
+
+    def __init__(self, max_tokens: int = 512, overlap_tokens: int = 64, min_tokens: int = 128):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min(min_tokens, max_tokens)
+
+    @property
+    def config(self) -> Dict[str, int]:
+        return {"max_tokens": self.max_tokens, "overlap_tokens": self.overlap_tokens, "min_tokens": self.min_tokens}
+
+    def _split_oversized(self, text: str) -> List[str]:
+        """Pieces of at most max_tokens, cut at sentence ends, else at spaces"""
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        pieces, current = [], ""
+        for sentence in _SENTENCE_END.split(text):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                pieces.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def _blocks(self, section: Section) -> Iterator[Tuple[str, bool]]:
+        """(text, is_heading) blocks of a section"""
+        for paragraph in _PARAGRAPH_BREAK.split(section.text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            first_line, _, rest = paragraph.partition("\n")
+            if is_heading(first_line):
+                yield first_line.strip().lstrip("#").strip(), True
+                paragraph = rest.strip()
+                if not paragraph:
+                    continue
+            if estimate_tokens(paragraph) > self.max_tokens:
+                for piece in self._split_oversized(paragraph):
+                    yield piece, False
+            else:
+                yield paragraph, False
+
+    def _overlap_tail(self, text: str, max_chars: int) -> str:
+        """Last overlap_tokens of text, at most max_chars long"""
+        max_chars = min(self.overlap_tokens * CHARS_PER_TOKEN, max_chars)
+        if max_chars <= 0:
+            return ""
+        tail = text[-max_chars:]
+        if len(tail) < len(text):
+            # Start on a word boundary
+            tail = tail.partition(" ")[2]
+        return tail.strip()
+
+    def iter_chunks(self, sections: Iterable[Section]) -> Iterator[Chunk]:
+        """Chunks of a stream of sections, yielded as soon as each is complete"""
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        parts: List[Tuple[str, bool, Optional[int]]] = []  # (text, is_heading, page_number)
+        kind = "text"
+        heading: Optional[str] = None
+        chunk_heading: Optional[str] = None
+        size = 0  # Characters of the chunk text so far, separators included
+
+        def build() -> Optional[Chunk]:
+            text = _SEPARATOR.join(part for part, _, _ in parts).strip()
+            if not text:
+                return None
+            pages = [page for _, _, page in parts if page is not None]
+            first = pages[0] if pages else None
+            last = pages[-1] if pages else None
+            return Chunk(text=text, page_number=first, locator=_locator(kind, first, last), heading=chunk_heading)
+
+        for section in sections:
+            starts_section = not section.continued
+            for block, block_is_heading in self._blocks(section):
+                boundary = starts_section or block_is_heading
+                if parts and (size + len(_SEPARATOR) + len(block) > max_chars or (boundary and size // CHARS_PER_TOKEN >= self.min_tokens)):
+                    # Room left beside this block in the next chunk
+                    room = max_chars - len(_SEPARATOR) - len(block)
+                    carry = []
+                    if parts[-1][1]:
+                        # A trailing heading moves on with the text it introduces;
+                        # if it doesn't fit there, it ends this chunk (or, alone,
+                        # survives only as the next chunk's heading)
+                        if len(parts[-1][0]) <= room:
+                            carry = [parts.pop()]
+                        elif len(parts) == 1:
+                            parts.pop()
+                    elif not boundary:
+                        tail = self._overlap_tail(parts[-1][0], room)
+                        if tail:
+                            carry = [(tail, False, parts[-1][2])]
+                    chunk = build()
+                    if chunk:
+                        yield chunk
+                    parts = carry
+                    size = len(carry[0][0]) if carry else 0
+                if block_is_heading:
+                    heading = block
+                if not parts or (len(parts) == 1 and parts[0][1]):
+                    chunk_heading = heading
+                    kind = section.kind
+                size += (len(_SEPARATOR) if parts else 0) + len(block)
+                parts.append((block, block_is_heading, section.page_number))
+                starts_section = False
+        chunk = build()
+        if chunk:
+            yield chunk
+
+    def chunk_sections(self, sections: Iterable[Section]) -> List[Chunk]:
+        return list(self.iter_chunks(sections))
+
+    def chunk_text(self, text: str) -> List[str]:
+        return [chunk.text for chunk in self.iter_chunks([Section(text=text, kind="text")])]
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+
+from pypdf import PdfReader
+from pptx import Presentation
+
+from .chunking import Section
+
+# Kept free of service state and heavy imports: extract_sections runs in the
+# batch ingester's worker processes.
+
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx", ".txt")
+
+# PDFs at least this large are parsed from a read-only memory map: pypdf reads
+# objects on demand, which then come from the OS page cache instead of a copy of
+# the file in process memory. (python-pptx reads every part of the zip up front,
+# so PPTX files are opened by path.)
+MMAP_MIN_BYTES = 8 * 1024 * 1024
+
+# Text files are streamed in sections of roughly this many characters, cut at blank lines
+TEXT_SECTION_CHARS = 64 * 1024
+
+@contextmanager
+def _open_pdf(file_path: str):
+    """The path itself, or a read-only mmap of the file when it is large"""
+    if not (os.path.isfile(file_path) and os.path.getsize(file_path) >= MMAP_MIN_BYTES):
+        yield file_path
+        return
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+def _pdf_sections(file_path: str, stream: Optional[BinaryIO] = None) -> Iterator[Section]:
+    with _open_pdf(file_path) if stream is None else _rewound(stream) as source:
+        reader = PdfReader(source)
+        for i, page in enumerate(reader.pages, start=1):
+            yield Section(text=page.extract_text() or "", page_number=i, kind="page")
+
+def _pptx_sections(file_path: str, stream: Optional[BinaryIO] = None) -> Iterator[Section]:
+    if stream is not None:
+        stream.seek(0)
+    prs = Presentation(file_path if stream is None else stream)
+    # Shapes as paragraphs, so the title is a block of its own
+    for i, slide in enumerate(prs.slides, start=1):
+        yield Section(
+            text="\n\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text")),
+            page_number=i,
+            kind="slide"
+        )
+
+@contextmanager
+def _rewound(stream: BinaryIO):
+    stream.seek(0)
+    yield stream
+
+def _split_text(f: TextIO) -> Iterator[Section]:
+    lines: List[str] = []
+    size = 0
+    continued = False
+    for line in f:
+        lines.append(line)
+        size += len(line)
+        if size >= TEXT_SECTION_CHARS and not line.strip():
+            yield Section(text="".join(lines), kind="text", continued=continued)
+            lines, size, continued = [], 0, True
+    if lines:
+        yield Section(text="".join(lines), kind="text", continued=continued)
+
+def _text_sections(file_path: str, stream: Optional[BinaryIO] = None) -> Iterator[Section]:
+    if stream is None:
+        with open(file_path, "r", encoding="utf-8") as f:
+            yield from _split_text(f)
+        return
+    stream.seek(0)
+    f = io.TextIOWrapper(stream, encoding="utf-8")
+    try:
+        yield from _split_text(f)
+    finally:
+        # Leave the caller's stream open
+        f.detach()
+
+def open_sections(file_path: str, stream: Optional[BinaryIO] = None) -> Optional[Iterator[Section]]:
+    """
+    Lazy iterator over the pages/slides of a PDF or PPTX file, or the pieces of a
+    TXT file; None for unsupported types. The file is opened on first iteration.
+    With `stream` (e.g. an upload's spooled file) the content is read from it
+    directly and file_path only names the file.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".pdf":
+        return _pdf_sections(file_path, stream)
+    if ext == ".pptx":
+        return _pptx_sections(file_path, stream)
+    if ext == ".txt":
+        return _text_sections(file_path, stream)
+    return None
+
+def extract_sections(file_path: str) -> Optional[List[Section]]:
+    """All sections of a file (see open_sections); None for unsupported types"""
+    sections = open_sections(file_path)
+    return None if sections is None else list(sections)
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,23 +1,58 @@
 import logging
 import asyncio
+import itertools
 import os
-from typing import List, Dict, Any
-from pypdf import PdfReader
-from pptx import Presentation
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, BinaryIO, Iterator, Optional, Tuple
 
 from shared.clients.embedding_client import GeminiEmbeddingClient
+from shared.clients.embedding_cache import CachedEmbeddingClient, QueryEmbeddingCache, create_embedding_cache
 from shared.clients.vector_store_client import PGVectorClient
+from .chunking import Chunk, Chunker, Section
+from .extraction import extract_sections, open_sections
 from .ocr_service import OCRService
+from .reranking import create_reranker
 
 logger = logging.getLogger(__name__)
 
 class Indexer:
-    def __init__(self, api_key: str, database_url: str, ocr_enabled: bool = False, deepseek_api_key: str = None):
+    # Chunks embedded per step while streaming a file in index_file
+    STREAM_BATCH_CHUNKS = 200
+
+    def __init__(
+        self,
+        api_key: str,
+        database_url: str,
+        ocr_enabled: bool = False,
+        deepseek_api_key: str = None,
+        embedding_batch_size: int = 100,
+        embedding_max_concurrency: int = 4,
+        embedding_max_retries: int = 3,
+        embedding_cache_enabled: bool = True,
+        embedding_cache_memory_max_entries: int = 10000,
+        embedding_cache_url: str = None,
+        query_cache_max_entries: int = 2048,
+        query_cache_ttl_seconds: int = 3600,
+        chunk_max_tokens: int = 512,
+        chunk_overlap_tokens: int = 64,
+        chunk_min_tokens: int = 128,
+        reranker: str = None,
+        rerank_candidates_factor: int = 4,
+        rerank_mmr_lambda: float = 0.7,
+        rerank_cross_encoder_model: str = None,
+        vector_store_options: Dict[str, Any] = None
+    ):
         if not api_key:
             logger.warning("GEMINI_API_KEY is not set. Indexing will fail.")
         
         if api_key:
-            self.embedding_client = GeminiEmbeddingClient(api_key=api_key)
+            self.embedding_client = GeminiEmbeddingClient(
+                api_key=api_key,
+                batch_size=embedding_batch_size,
+                max_concurrency=embedding_max_concurrency,
+                max_retries=embedding_max_retries
+            )
         else:
             self.embedding_client = None
             logger.warning("GEMINI_API_KEY not set. Embedding client disabled.")
@@ -30,93 +65,237 @@ class Indexer:
                 def search_keyword(self, *args, **kwargs): 
                      # Mock keyword search
                      return [{"content": "Mock keyword result", "score": 1.0, "metadata": {}}]
+                def hybrid_search(self, *args, **kwargs):
+                     # Mock keyword-only hit, fused as rank 0
+                     return [{"content": "Mock keyword result", "score": 1.0, "rrf_score": 1.0 / 60, "metadata": {}}]
+                async def aadd_documents(self, *args, **kwargs): return self.add_documents(*args, **kwargs)
+                async def asearch(self, *args, **kwargs): return self.search(*args, **kwargs)
+                async def asearch_keyword(self, *args, **kwargs): return self.search_keyword(*args, **kwargs)
+                async def ahybrid_search(self, *args, **kwargs): return self.hybrid_search(*args, **kwargs)
+                async def amulti_hybrid_search(self, queries, *args, **kwargs): return [self.hybrid_search() for _ in queries]
+                async def aget_manifest(self, *args, **kwargs): return {}
+                async def aupsert_manifest(self, *args, **kwargs): pass
+                async def areplace_documents(self, course_id, source_paths, texts, embeddings, metadatas, **kwargs):
+                    return self.add_documents(texts, embeddings, metadatas)
+                @asynccontextmanager
+                async def astream_replace_documents(self, *args, **kwargs):
+                    async def write(texts, embeddings, metadatas): self.add_documents(texts, embeddings, metadatas)
+                    yield write
+                async def apurge_sources(self, *args, **kwargs): pass
+                async def aclose(self): pass
             self.vector_store = MockVectorStore()
         else:
-            self.vector_store = PGVectorClient(database_url=database_url)
+            # ANN index type/parameters (see PGVectorClient)
+            self.vector_store = PGVectorClient(database_url=database_url, **(vector_store_options or {}))
+
+        # Serve previously embedded text from the embedding_cache table (+ memory LRU)
+        if self.embedding_client and embedding_cache_enabled:
+            try:
+                cache_url = embedding_cache_url or database_url
+                cache = create_embedding_cache(
+                    memory_max_entries=embedding_cache_memory_max_entries,
+                    engine=getattr(self.vector_store, "engine", None) if not embedding_cache_url else None,
+                    database_url=cache_url
+                )
+            except Exception as e:
+                logger.warning(f"Persistent embedding cache unavailable, using memory only: {e}")
+                cache = create_embedding_cache(memory_max_entries=embedding_cache_memory_max_entries)
+            self.embedding_client = CachedEmbeddingClient(self.embedding_client, cache)
+
+        # Shared by hybrid_retrieve and retrieve
+        self.query_cache = QueryEmbeddingCache(max_entries=query_cache_max_entries, ttl_seconds=query_cache_ttl_seconds)
+
+        # Optional post-retrieval stage for hybrid_retrieve(_many), which then fetch
+        # k * rerank_candidates_factor results and keep the re-ranker's best k
+        self.reranker = create_reranker(
+            reranker, mmr_lambda=rerank_mmr_lambda, cross_encoder_model=rerank_cross_encoder_model
+        )
+        self.rerank_candidates_factor = max(1, rerank_candidates_factor)
+
+        self.chunker = Chunker(max_tokens=chunk_max_tokens, overlap_tokens=chunk_overlap_tokens, min_tokens=chunk_min_tokens)
 
         self.ocr_service = OCRService(api_key=deepseek_api_key, enabled=ocr_enabled)
 
-    async def index_file(self, course_id: int, file_path: str, module_id: str = None, topic_id: str = None, extra_metadata: Dict[str, Any] = None):
+    def _ocr_fallback(self, file_path: str, text_length: int, stream: Optional[BinaryIO] = None) -> Optional[Section]:
+        """
+        OCR text of a file whose extracted text is minimal (scanned PDF), as an extra
+        section. With `stream`, the OCR backend reads the content from it.
+        """
+        if text_length >= 100:
+            return None
+        logger.info(f"Low text content detected ({text_length} chars). Attempting OCR fallback...")
+        if stream is not None:
+            stream.seek(0)
+        ocr_text = self.ocr_service.extract_text(file_path, stream=stream)
+        if not ocr_text:
+            logger.warning("OCR returned no text.")
+            return None
+        logger.info("OCR successfully added text content.")
+        return Section(text=ocr_text, kind="ocr")
+
+    async def extract_file_sections(self, file_path: str, executor: Optional[Executor] = None) -> Optional[List[Section]]:
+        """
+        Pages/slides of a PDF/PPTX/TXT file, with OCR fallback for scanned documents
+        (appended as an extra section). Parsing runs on `executor` (default: a
+        worker thread), off the event loop. Returns None for unsupported file types.
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+        loop = asyncio.get_running_loop()
+        sections = await loop.run_in_executor(executor, extract_sections, file_path)
+        if sections is None:
+            logger.warning(f"Unsupported file type: {ext}")
+            return None
+
+        text_length = sum(len(section.text.strip()) for section in sections)
+        ocr_section = await asyncio.to_thread(self._ocr_fallback, file_path, text_length)
+        if ocr_section:
+            sections.append(ocr_section)
+        return sections
+
+    def iter_file_sections(self, file_path: str, stream: Optional[BinaryIO] = None) -> Optional[Iterator[Section]]:
+        """
+        Lazy variant of extract_file_sections: pages/slides are parsed one at a
+        time as the iterator is consumed (blocking; run it off the event loop).
+        With `stream`, content is read from it and file_path only names the file.
+        """
+        sections = open_sections(file_path, stream)
+        if sections is None:
+            logger.warning(f"Unsupported file type: {os.path.splitext(file_path)[1].lower()}")
+            return None
+
+        def with_ocr_fallback():
+            text_length = 0
+            for section in sections:
+                text_length += len(section.text.strip())
+                yield section
+            ocr_section = self._ocr_fallback(file_path, text_length, stream)
+            if ocr_section:
+                yield ocr_section
+
+        return with_ocr_fallback()
+
+    @staticmethod
+    def _base_metadata(
+        course_id: int,
+        filename: str,
+        module_id: str = None,
+        topic_id: str = None,
+        extra_metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        base_metadata = {
+            "course_id": course_id,
+            "source": filename,
+            "type": "custom_upload"
+        }
+        if module_id:
+            base_metadata["module_id"] = module_id
+        if topic_id:
+            base_metadata["topic_id"] = topic_id
+        if extra_metadata:
+            base_metadata.update(extra_metadata)
+        return base_metadata
+
+    @staticmethod
+    def _source_path(file_path: str, stream: Optional[BinaryIO], module_id: str = None, topic_id: str = None) -> str:
+        """
+        Key of a file's chunks (the embeddings source_path). Uploads have no path on
+        disk, so they are keyed by scope and name: re-uploading a file replaces it.
+        """
+        if stream is None:
+            return os.path.abspath(file_path)
+        return f"upload:{module_id or ''}/{topic_id or ''}/{os.path.basename(file_path)}"
+
+    @staticmethod
+    def _chunk_metadata(base_metadata: Dict[str, Any], index: int, chunk: Chunk) -> Dict[str, Any]:
+        m = base_metadata.copy()
+        m["chunk_index"] = index
+        if chunk.page_number is not None:
+            m["page_number"] = chunk.page_number
+        if chunk.locator:
+            m["locator"] = chunk.locator
+        if chunk.heading:
+            m["heading"] = chunk.heading
+        return m
+
+    def chunk_document(
+        self,
+        course_id: int,
+        filename: str,
+        sections: List[Section],
+        module_id: str = None,
+        topic_id: str = None,
+        extra_metadata: Dict[str, Any] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Split extracted sections into token-budgeted chunks with their metadata.
+        Chunks carry the page/slide they start on (page_number), a citation
+        locator ("p. 3", "slides 4-6") and the heading they fall under.
+        """
+        chunks = self.chunker.chunk_sections(sections)
+        base_metadata = self._base_metadata(course_id, filename, module_id, topic_id, extra_metadata)
+        metadatas = [self._chunk_metadata(base_metadata, i, chunk) for i, chunk in enumerate(chunks)]
+        return [chunk.text for chunk in chunks], metadatas
+
+    async def index_file(
+        self,
+        course_id: int,
+        file_path: str,
+        module_id: str = None,
+        topic_id: str = None,
+        extra_metadata: Dict[str, Any] = None,
+        stream: Optional[BinaryIO] = None
+    ) -> int:
         """
         Index a custom file (PDF, PPTX, TXT) for a course.
         Optional: Scope to specific module/topic.
+        With `stream` (e.g. an upload's spooled file), content is parsed straight
+        from it and file_path is only the file's name. Returns the chunks stored.
+
+        Pages/slides are parsed lazily and chunked as they arrive, and every
+        STREAM_BATCH_CHUNKS chunks are embedded and written before more of the
+        file is read, so only one batch is held in memory at a time. The batches
+        go into one transaction that replaces any earlier version of the file
+        (keyed by source_path), so a failure part-way leaves no partial file behind.
         """
         try:
-            text_content = ""
             filename = os.path.basename(file_path)
             ext = os.path.splitext(filename)[1].lower()
 
             logger.info(f"Processing file {filename} ({ext}) for course {course_id}")
 
-            if ext == ".pdf":
-                reader = PdfReader(file_path)
-                for page in reader.pages:
-                    text_content += page.extract_text() + "\n"
-            
-            elif ext == ".pptx":
-                prs = Presentation(file_path)
-                for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text_content += shape.text + "\n"
-            
-            elif ext == ".txt":
-                with open(file_path, "r", encoding="utf-8") as f:
-                    text_content = f.read()
-            
-            else:
-                logger.warning(f"Unsupported file type: {ext}")
-                return
+            sections = self.iter_file_sections(file_path, stream)
+            if sections is None:
+                return 0
+            if not self.embedding_client:
+                 raise ValueError("Embedding client not initialized (Missing API Key)")
 
-            # Fallback to OCR if text is minimal (scanned PDF)
-            if len(text_content.strip()) < 100:
-                logger.info(f"Low text content detected ({len(text_content.strip())} chars). Attempting OCR fallback...")
-                ocr_text = self.ocr_service.extract_text(file_path)
-                if ocr_text:
-                    text_content += "\n\n" + ocr_text
-                    logger.info("OCR successfully added text content.")
-                else:
-                    logger.warning("OCR returned no text.")
-
-            if not text_content.strip():
-                logger.warning(f"No text extracted from {filename} after OCR attempt.")
-                return
+            chunk_stream = self.chunker.iter_chunks(sections)
+            base_metadata = self._base_metadata(course_id, filename, module_id, topic_id, extra_metadata)
+            source_path = self._source_path(file_path, stream, module_id, topic_id)
+            base_metadata["source_path"] = source_path
 
-            # Simple chunking (e.g., 1000 chars)
-            # In production, use a smarter chunker
-            chunk_size = 1000
-            chunks = [text_content[i:i+chunk_size] for i in range(0, len(text_content), chunk_size)]
-            
-            logger.info(f"Generated {len(chunks)} chunks from {filename}")
-
-            # Create metadatas
-            base_metadata = {
-                "course_id": course_id,
-                "source": filename,
-                "type": "custom_upload"
-            }
-            if module_id:
-                base_metadata["module_id"] = module_id
-            if topic_id:
-                base_metadata["topic_id"] = topic_id
-            if extra_metadata:
-                base_metadata.update(extra_metadata)
-            
-            metadatas = []
-            for i in range(len(chunks)):
-                m = base_metadata.copy()
-                m["chunk_index"] = i
-                metadatas.append(m)
+            async def next_batch() -> List[Chunk]:
+                # Parsing and chunking block, so each batch is pulled in a worker thread
+                return await asyncio.to_thread(lambda: list(itertools.islice(chunk_stream, self.STREAM_BATCH_CHUNKS)))
 
-            # Embed
-            if not self.embedding_client:
-                 raise ValueError("Embedding client not initialized (Missing API Key)")
-            results = await self.embedding_client.embed_batch(chunks)
-            embeddings = [r.embedding for r in results]
+            # An empty file keeps whatever was indexed for it before
+            batch = await next_batch()
+            if not batch:
+                logger.warning(f"No text extracted from {filename} after OCR attempt.")
+                return 0
+
+            indexed = 0
+            async with self.vector_store.astream_replace_documents(course_id, [source_path]) as write:
+                while batch:
+                    texts = [chunk.text for chunk in batch]
+                    results = await self.embedding_client.embed_batch(texts)
+                    metadatas = [self._chunk_metadata(base_metadata, indexed + i, chunk) for i, chunk in enumerate(batch)]
+                    await write(texts, [r.embedding for r in results], metadatas)
+                    indexed += len(batch)
+                    batch = await next_batch()
 
-            # Store
-            self.vector_store.add_documents(chunks, embeddings, metadatas)
-            logger.info(f"✅ Successfully indexed custom file {filename} for course {course_id}")
+            logger.info(f"✅ Successfully indexed custom file {filename} for course {course_id} ({indexed} chunks)")
+            return indexed
 
         except Exception as e:
             logger.error(f"Failed to index file {file_path}: {e}")
@@ -133,7 +312,7 @@ class Indexer:
                  raise ValueError("Embedding client not initialized (Missing API Key)")
             embedding = await self.embedding_client.embed(text, task_type="retrieval_document")
             
-            self.vector_store.add_documents(
+            await self.vector_store.aadd_documents(
                 texts=[text],
                 embeddings=[embedding],
                 metadatas=[{
@@ -185,18 +364,19 @@ class Indexer:
                             lesson_title = lesson.get("title", "")
                             lesson_body = lesson.get("body", "")
                             
-                            # Chunk lesson body if too large (simple approach for now)
-                            # Ideally split by paragraphs
-                            lesson_text = f"Lesson {lesson_code}: {lesson_title}\n\n{lesson_body}"
-                            
-                            chunks.append(lesson_text)
-                            metadatas.append({
-                                "course_id": course_id,
-                                "module_id": str(module_id),
-                                "lesson_code": lesson_code,
-                                "type": "lesson_content",
-                                "title": lesson_title
-                            })
+                            # Long lessons are split at headings/paragraphs; every
+                            # part keeps the lesson header for context
+                            lesson_header = f"Lesson {lesson_code}: {lesson_title}"
+                            for i, part in enumerate(self.chunker.chunk_text(lesson_body) or [""]):
+                                chunks.append(f"{lesson_header}\n\n{part}")
+                                metadatas.append({
+                                    "course_id": course_id,
+                                    "module_id": str(module_id),
+                                    "lesson_code": lesson_code,
+                                    "type": "lesson_content",
+                                    "title": lesson_title,
+                                    "chunk_index": i
+                                })
             
             if not chunks:
                 logger.warning(f"No content chunks found for course {course_id}")
@@ -209,83 +389,115 @@ class Indexer:
             embeddings = [r.embedding for r in results]
             
             logger.info(f"Storing {len(chunks)} vectors...")
-            self.vector_store.add_documents(chunks, embeddings, metadatas)
+            await self.vector_store.aadd_documents(chunks, embeddings, metadatas)
             logger.info(f"✅ Successfully indexed content for course {course_id}")
             
         except Exception as e:
             logger.error(f"Failed to index content for course {course_id}: {e}")
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a retrieval query, served from the in-process query cache when possible"""
+        if not self.embedding_client:
+             raise ValueError("Embedding client not initialized (Missing API Key)")
+        model = self.embedding_client.get_model_name()
+        query_vector = self.query_cache.get(model, query)
+        if query_vector is None:
+            query_vector = await self.embedding_client.embed(query, task_type="retrieval_query")
+            self.query_cache.set(model, query, query_vector)
+        return query_vector
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several retrieval queries; the ones not in the query cache go out in one batch call"""
+        if not self.embedding_client:
+             raise ValueError("Embedding client not initialized (Missing API Key)")
+        model = self.embedding_client.get_model_name()
+        vectors = {query: self.query_cache.get(model, query) for query in dict.fromkeys(queries)}
+        missing = [query for query, vector in vectors.items() if vector is None]
+        if missing:
+            results = await self.embedding_client.embed_batch(missing, task_type="retrieval_query")
+            for query, result in zip(missing, results):
+                vectors[query] = result.embedding
+                self.query_cache.set(model, query, result.embedding)
+        return [vectors[query] for query in queries]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = {"query_embeddings": self.query_cache.stats()}
+        if hasattr(self.embedding_client, "stats"):
+            stats["embeddings"] = self.embedding_client.stats()
+        return stats
+
+    def _fetch_k(self, k: int) -> int:
+        return k * self.rerank_candidates_factor if self.reranker else k
+
+    async def _rerank(self, query: str, query_vector: List[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Apply the re-ranker (if any) to at most k results; falls back to the fused order on failure"""
+        if self.reranker and results:
+            try:
+                results = await asyncio.to_thread(self.reranker.rerank, query, query_vector, results, k)
+            except Exception as e:
+                logger.warning(f"Re-ranking failed, using fused order: {e}")
+        results = results[:k]
+        for result in results:
+            result.pop("embedding", None)
+        return results
+
     async def hybrid_retrieve(self, course_id: int, query: str, k: int = 3) -> List[Dict[str, Any]]:
         """
-        Retrieve using Reciprocal Rank Fusion (RRF) of Vector + Keyword search.
+        Retrieve using Reciprocal Rank Fusion (RRF) of Vector + Keyword search,
+        then the optional re-ranking stage (MMR diversity / local cross-encoder).
         """
         try:
-            # 1. Get Top-K Vector Results
-            if not self.embedding_client:
-                 raise ValueError("Embedding client not initialized (Missing API Key)")
+            query_vector = await self.embed_query(query)
 
-            query_vector = await self.embedding_client.embed(query, task_type="retrieval_query")
-            vector_results = self.vector_store.search(
+            # Vector + keyword rankings and RRF fusion in a single DB round-trip
+            results = await self.vector_store.ahybrid_search(
                 query_vector=query_vector,
-                top_k=k,
-                filter={"course_id": str(course_id)}
-            )
-
-            # 2. Get Top-K Keyword Results
-            keyword_results = self.vector_store.search_keyword(
                 query_text=query,
-                top_k=k,
-                filter={"course_id": str(course_id)}
+                top_k=self._fetch_k(k),
+                filter={"course_id": str(course_id)},
+                include_vectors=bool(self.reranker and self.reranker.needs_vectors)
             )
-
-            # 3. Apply RRF (Reciprocal Rank Fusion)
-            # RRF score = 1 / (rank + k_rrf)
-            k_rrf = 60
-            fused_scores = {}
-            doc_map = {}
-
-            # Process Vector Results
-            for rank, doc in enumerate(vector_results):
-                doc_content = doc.get("content")
-                doc_map[doc_content] = doc # Store full doc
-                if doc_content not in fused_scores:
-                    fused_scores[doc_content] = 0.0
-                fused_scores[doc_content] += 1.0 / (rank + k_rrf)
-
-            # Process Keyword Results
-            for rank, doc in enumerate(keyword_results):
-                doc_content = doc.get("content")
-                if doc_content not in doc_map:
-                    doc_map[doc_content] = doc
-                if doc_content not in fused_scores:
-                    fused_scores[doc_content] = 0.0
-                fused_scores[doc_content] += 1.0 / (rank + k_rrf)
-
-            # Sort by RRF Score
-            sorted_docs = sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)
-            
-            # Return Top-K
-            final_results = []
-            for content, score in sorted_docs[:k]:
-                doc = doc_map[content]
-                doc["rrf_score"] = score
-                final_results.append(doc)
-            
-            return final_results
+            return await self._rerank(query, query_vector, results, k)
 
         except Exception as e:
             logger.error(f"Hybrid retrieval failed for course {course_id}: {e}")
             return []
 
+    async def hybrid_retrieve_many(self, course_id: int, queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        hybrid_retrieve for several queries (e.g. every topic of a blueprint): one
+        batch embedding call and one vector-store statement returning the top k of
+        each query. Results are in query order.
+        """
+        if not queries:
+            return []
+        try:
+            query_vectors = await self.embed_queries(queries)
+            all_results = await self.vector_store.amulti_hybrid_search(
+                queries=list(zip(query_vectors, queries)),
+                top_k=self._fetch_k(k),
+                filter={"course_id": str(course_id)},
+                include_vectors=bool(self.reranker and self.reranker.needs_vectors)
+            )
+            return list(await asyncio.gather(*(
+                self._rerank(query, query_vector, results, k)
+                for query, query_vector, results in zip(queries, query_vectors, all_results)
+            )))
+
+        except Exception as e:
+            logger.error(f"Batched hybrid retrieval failed for course {course_id}: {e}")
+            return [[] for _ in queries]
+
     async def retrieve(self, course_id: int, query: str, k: int = 3) -> List[Dict[str, Any]]:
         """
         Retrieve relevant snippets for a given query within a course scope.
         """
         try:
             # 1. Embed Query
-            query_vector = await self.embedding_client.embed(query, task_type="retrieval_query")
+            query_vector = await self.embed_query(query)
             
             # 2. Search Vector Store
-            results = self.vector_store.search(
+            results = await self.vector_store.asearch(
                 query_vector=query_vector,
                 top_k=k,
                 filter={"course_id": str(course_id)}
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from .batch_ingest import BatchIngester
+from .indexer import Indexer
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Upload:
+    filename: str
+    stream: BinaryIO
+
+def take_upload(upload: UploadFile) -> Upload:
+    """
+    Detach an UploadFile's spooled file so it outlives the request: the form's
+    cleanup closes a placeholder, and the job closes the file when done. No copy
+    of the content is made.
+    """
+    stream = upload.file
+    upload.file = io.BytesIO()
+    return Upload(filename=upload.filename, stream=stream)
+
+@dataclass
+class IngestJob:
+    job_id: str
+    course_id: int
+    status: str = "QUEUED"  # QUEUED | RUNNING | COMPLETED | FAILED
+    files_total: int = 0    # Uploads (packaged files are counted as they are ingested)
+    files_ingested: int = 0
+    files_failed: int = 0
+    chunks_written: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)  # filename/path -> error
+    created_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["elapsed_seconds"] = round((self.ended_at or time.time()) - self.created_at, 2)
+        return data
+
+class IngestJobManager:
+    """
+    Background ingestion of uploaded (and packaged) files behind a job handle.
+
+    Uploads are parsed straight from their spooled request files. Files of all
+    jobs are indexed concurrently, at most max_concurrency at a time; the latest
+    MAX_JOBS jobs are kept for polling.
+    """
+    MAX_JOBS = 500
+
+    def __init__(self, indexer: Indexer, batch_ingester: BatchIngester, max_concurrency: int = 4):
+        self.indexer = indexer
+        self.batch_ingester = batch_ingester
+        self.max_concurrency = max(1, max_concurrency)
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    def submit(
+        self,
+        course_id: int,
+        uploads: List[Upload],
+        module_id: str = None,
+        topic_id: str = None,
+        extra_metadata: Dict[str, Any] = None,
+        package_path: str = None
+    ) -> IngestJob:
+        """Start ingesting uploads (and the package_path directory) in the background"""
+        job = IngestJob(job_id=uuid.uuid4().hex, course_id=course_id, files_total=len(uploads))
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.MAX_JOBS:
+            self.jobs.popitem(last=False)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        task = asyncio.create_task(self._run(job, uploads, module_id, topic_id, extra_metadata, package_path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _ingest_upload(self, job: IngestJob, upload: Upload, module_id, topic_id, extra_metadata):
+        try:
+            async with self._slots:
+                logger.info(f"Ingesting upload {upload.filename} for course {job.course_id} (job {job.job_id})")
+                chunks = await self.indexer.index_file(
+                    job.course_id, upload.filename, module_id, topic_id, extra_metadata, stream=upload.stream
+                )
+            job.chunks_written += chunks
+            job.files_ingested += 1
+        except Exception as e:
+            job.files_failed += 1
+            job.errors[upload.filename] = str(e)
+        finally:
+            upload.stream.close()
+
+    async def _ingest_package(self, job: IngestJob, package_path: str, extra_metadata):
+        try:
+            job.files_ingested += await self.batch_ingester.ingest_directory(
+                job.course_id, package_path, extra_metadata=extra_metadata
+            )
+        except Exception as e:
+            logger.error(f"Packaged ingest for job {job.job_id} failed: {e}")
+            job.errors[package_path] = str(e)
+
+    async def _run(self, job: IngestJob, uploads: List[Upload], module_id, topic_id, extra_metadata, package_path):
+        job.status = "RUNNING"
+        work = [self._ingest_upload(job, upload, module_id, topic_id, extra_metadata) for upload in uploads]
+        if package_path:
+            work.append(self._ingest_package(job, package_path, extra_metadata))
+        try:
+            await asyncio.gather(*work)
+        except BaseException:
+            job.status = "FAILED"
+            job.ended_at = time.time()
+            for upload in uploads:
+                upload.stream.close()
+            raise
+        job.status = "FAILED" if job.errors and not job.files_ingested else "COMPLETED"
+        job.ended_at = time.time()
+        logger.info(f"Ingest job {job.job_id} finished: {job.to_dict()}")
+
+    def close(self):
+        for task in list(self._tasks):
+            task.cancel()
@@ -1,6 +1,5 @@
 import asyncio
 import logging
-import shutil
 import os
 from typing import List, Dict, Any, Optional # Added imports
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
@@ -8,6 +7,7 @@ from pydantic import BaseModel
 from shared.core.settings import BaseAppSettings
 from shared.core.logging import setup_logging
 from shared.clients.kafka_client import KafkaClient
+from shared.db.base import engine_options, pool_metrics
 from .indexer import Indexer
 
 class Settings(BaseAppSettings):
@@ -15,6 +15,34 @@ class Settings(BaseAppSettings):
     DATA_PACK_ROOT: str = "/app/data"
     ENABLE_OCR: bool = False
     DEEPSEEK_API_KEY: Optional[str] = None
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_URL: Optional[str] = None
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = 2048
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+    VECTOR_INDEX_TYPE: str = "hnsw"  # hnsw | ivfflat | none
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_HNSW_EF_SEARCH: int = 40
+    VECTOR_IVFFLAT_LISTS: int = 100
+    VECTOR_IVFFLAT_PROBES: int = 10
+    VECTOR_STORE_ASYNC_ENABLED: bool = True
+    INGEST_EXTRACT_WORKERS: int = 0  # 0 = one per CPU
+    INGEST_QUEUE_MAX_CHUNKS: int = 2000
+    INGEST_EMBED_BATCH_SIZE: int = 500
+    INGEST_EMBED_CONCURRENCY: int = 2
+    INGEST_WRITE_BATCH_SIZE: int = 1000
+    INGEST_UPLOAD_CONCURRENCY: int = 4
+    CHUNK_MAX_TOKENS: int = 512
+    CHUNK_OVERLAP_TOKENS: int = 64
+    CHUNK_MIN_TOKENS: int = 128
+    RERANKER: str = "none"  # none | mmr | cross_encoder | comma-separated chain, e.g. cross_encoder,mmr
+    RERANK_CANDIDATES_FACTOR: int = 4
+    RERANK_MMR_LAMBDA: float = 0.7
+    RERANK_CROSS_ENCODER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 settings = Settings()
 logger = setup_logging(settings.APP_NAME)
@@ -29,7 +57,33 @@ indexer = Indexer(
     api_key=settings.GEMINI_API_KEY, 
     database_url=settings.DATABASE_URL,
     ocr_enabled=settings.ENABLE_OCR,
-    deepseek_api_key=settings.DEEPSEEK_API_KEY
+    deepseek_api_key=settings.DEEPSEEK_API_KEY,
+    embedding_batch_size=settings.EMBEDDING_BATCH_SIZE,
+    embedding_max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+    embedding_max_retries=settings.EMBEDDING_MAX_RETRIES,
+    embedding_cache_enabled=settings.EMBEDDING_CACHE_ENABLED,
+    embedding_cache_memory_max_entries=settings.EMBEDDING_CACHE_MEMORY_MAX_ENTRIES,
+    embedding_cache_url=settings.EMBEDDING_CACHE_URL,
+    query_cache_max_entries=settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    query_cache_ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    chunk_max_tokens=settings.CHUNK_MAX_TOKENS,
+    chunk_overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+    chunk_min_tokens=settings.CHUNK_MIN_TOKENS,
+    reranker=settings.RERANKER,
+    rerank_candidates_factor=settings.RERANK_CANDIDATES_FACTOR,
+    rerank_mmr_lambda=settings.RERANK_MMR_LAMBDA,
+    rerank_cross_encoder_model=settings.RERANK_CROSS_ENCODER_MODEL,
+    vector_store_options={
+        "index_type": settings.VECTOR_INDEX_TYPE,
+        "hnsw_m": settings.VECTOR_HNSW_M,
+        "hnsw_ef_construction": settings.VECTOR_HNSW_EF_CONSTRUCTION,
+        "ef_search": settings.VECTOR_HNSW_EF_SEARCH,
+        "ivfflat_lists": settings.VECTOR_IVFFLAT_LISTS,
+        "probes": settings.VECTOR_IVFFLAT_PROBES,
+        "async_enabled": settings.VECTOR_STORE_ASYNC_ENABLED,
+        "engine_options": engine_options(settings),
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+    }
 )
 
 @app.on_event("startup")
@@ -45,6 +99,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     await kafka_client.stop()
+    ingest_jobs.close()
+    await indexer.vector_store.aclose()
+    batch_ingester.close()
 
 async def process_event(topic: str, message: dict):
     """
@@ -89,37 +146,35 @@ async def ingest_file(
 ):
     """
     Ingest a custom file for RAG indexing.
+    Returns a job handle; poll GET /ingest/jobs/{job_id} for the outcome.
     """
     if not settings.GEMINI_API_KEY:
          raise HTTPException(status_code=400, detail="GEMINI_API_KEY not configured. Cannot ingest.")
-         
-    try:
-        temp_dir = "/tmp/ingest"
-        os.makedirs(temp_dir, exist_ok=True)
-        file_path = os.path.join(temp_dir, file.filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        logger.info(f"Received file upload: {file.filename} for course {course_id}")
-        
-        await indexer.index_file(course_id, file_path, module_id, topic_id)
-        
-        os.remove(file_path)
-        return {"status": "indexed", "filename": file.filename, "course_id": course_id}
-        
-    except Exception as e:
-        logger.error(f"Ingestion failed: {e}")
-        return {"status": "error", "message": str(e)}
+
+    logger.info(f"Received file upload: {file.filename} for course {course_id}")
+    job = ingest_jobs.submit(course_id, [take_upload(file)], module_id=module_id, topic_id=topic_id)
+    return {"status": "queued", "job_id": job.job_id, "filename": file.filename, "course_id": course_id}
 
 from .batch_ingest import BatchIngester
 
 # ...
-batch_ingester = BatchIngester(indexer)
+batch_ingester = BatchIngester(
+    indexer,
+    extract_workers=settings.INGEST_EXTRACT_WORKERS,
+    queue_max_chunks=settings.INGEST_QUEUE_MAX_CHUNKS,
+    embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+    embed_concurrency=settings.INGEST_EMBED_CONCURRENCY,
+    write_batch_size=settings.INGEST_WRITE_BATCH_SIZE
+)
+
+from .ingest_jobs import IngestJobManager, take_upload
+
+ingest_jobs = IngestJobManager(indexer, batch_ingester, max_concurrency=settings.INGEST_UPLOAD_CONCURRENCY)
 
 class BatchIngestRequest(BaseModel):
     course_id: int
     data1_path: str # e.g. "catalog/courses/XCT3002/materials"
+    force: bool = False # Re-ingest unchanged files too
 
 @app.post("/ingest/batch")
 async def ingest_batch(req: BatchIngestRequest):
@@ -135,16 +190,82 @@ async def ingest_batch(req: BatchIngestRequest):
          raise HTTPException(status_code=400, detail="GEMINI_API_KEY not configured. Cannot batch ingest.")
 
     try:
-        count = await batch_ingester.ingest_directory(req.course_id, target_path)
-        return {"status": "success", "files_ingested": count}
+        count = await batch_ingester.ingest_directory(req.course_id, target_path, force=req.force)
+        progress = batch_ingester.progress[req.course_id]
+        return {
+            "status": "success",
+            "files_ingested": count,
+            "files_unchanged": progress.files_unchanged,
+            "files_removed": progress.files_removed
+        }
     except Exception as e:
         logger.error(f"Batch ingest error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/ingest/batch/{course_id}/progress")
+async def ingest_batch_progress(course_id: int):
+    """Progress of the latest batch ingestion for a course (poll while /ingest/batch runs)"""
+    progress = batch_ingester.progress.get(course_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="No batch ingestion for this course")
+    return progress.to_dict()
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingest_job_status(job_id: str):
+    """Status of an /ingest or /reference/ingest job"""
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job.to_dict()
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": settings.APP_NAME}
 
+@app.get("/retrieve/stats")
+async def retrieve_stats():
+    """Hit/miss counters of the query and document embedding caches"""
+    return indexer.cache_stats()
+
+class RebuildIndexRequest(BaseModel):
+    index_type: Optional[str] = None  # hnsw | ivfflat | none (default: current)
+    m: Optional[int] = None
+    ef_construction: Optional[int] = None
+    lists: Optional[int] = None
+    concurrently: bool = True
+
+@app.get("/admin/vector-index")
+async def get_vector_index():
+    if not hasattr(indexer.vector_store, "ann_index_info"):
+        raise HTTPException(status_code=400, detail="Vector store has no ANN index (Mock Mode)")
+    return indexer.vector_store.ann_index_info()
+
+@app.get("/admin/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool stats (checked out, overflow, checkout wait) per engine"""
+    return pool_metrics()
+
+@app.post("/admin/vector-index/rebuild")
+async def rebuild_vector_index(req: RebuildIndexRequest):
+    """Drop and rebuild the ANN index on embeddings (e.g. after a bulk load or to change m/lists)"""
+    if not hasattr(indexer.vector_store, "rebuild_ann_index"):
+        raise HTTPException(status_code=400, detail="Vector store has no ANN index (Mock Mode)")
+    try:
+        info = await asyncio.to_thread(
+            indexer.vector_store.rebuild_ann_index,
+            index_type=req.index_type,
+            m=req.m,
+            ef_construction=req.ef_construction,
+            lists=req.lists,
+            concurrently=req.concurrently
+        )
+        return {"status": "rebuilt", **info}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Vector index rebuild failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/reference/ingest")
 async def ingest_reference(
     course_id: int = Form(...),
@@ -158,67 +279,48 @@ async def ingest_reference(
 ):
     """
     Ingest reference materials (packaged or uploaded) with strict scoping.
+    Uploads are indexed concurrently in the background; returns a job handle to
+    poll at GET /ingest/jobs/{job_id}.
     """
     if not settings.GEMINI_API_KEY:
          raise HTTPException(status_code=400, detail="GEMINI_API_KEY not configured. Cannot ingest references.")
 
-    try:
-        # Validate Scope
-        if scope_level == "module" and not module_id:
-             raise HTTPException(status_code=400, detail="module_id required for module scope")
-        if scope_level == "topic" and (not module_id or not topic_id):
-             raise HTTPException(status_code=400, detail="module_id and topic_id required for topic scope")
-
-        extra_metadata = {
-            "scope_level": scope_level,
-            "module_id": module_id,
-            "topic_id": topic_id
-        }
-        if blueprint_id:
-            extra_metadata["blueprint_id"] = blueprint_id
-            
-        ingested_count = 0
-        
-        # 1. Handle Packaged References
-        if use_packaged:
-            if not course_code:
-                raise HTTPException(status_code=400, detail="course_code required for packaged references")
-                
-            package_path = os.path.join(settings.DATA_PACK_ROOT, "catalog", "courses", course_code, "materials")
-            
-            logger.info(f"Ingesting packaged references from {package_path} with scope {scope_level}")
-            if os.path.exists(package_path):
-                # We assume packaged refs are generally Course Level unless organized by folder, 
-                # but for now we apply the user-selected scope to all of them if they asked.
-                count = await batch_ingester.ingest_directory(course_id, package_path, extra_metadata=extra_metadata)
-                ingested_count += count
-            else:
-                 # It's not an error if missing, just zero found. But warn.
-                logger.warning(f"Packaged path not found: {package_path}")
-                # We return 0 instead of error to avoid blocking UI
-        
-        # 2. Handle Uploaded Files
-        if files:
-            temp_dir = "/tmp/ingest_refs"
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            for file in files:
-                file_path = os.path.join(temp_dir, file.filename)
-                with open(file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                    
-                logger.info(f"Ingesting uploaded reference: {file.filename}")
-                await indexer.index_file(course_id, file_path, extra_metadata=extra_metadata)
-                os.remove(file_path)
-                ingested_count += 1
-                
-        return {"status": "success", "ingested_count": ingested_count, "course_id": course_id}
-        
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        logger.error(f"Reference ingest failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Validate Scope
+    if scope_level == "module" and not module_id:
+         raise HTTPException(status_code=400, detail="module_id required for module scope")
+    if scope_level == "topic" and (not module_id or not topic_id):
+         raise HTTPException(status_code=400, detail="module_id and topic_id required for topic scope")
+
+    extra_metadata = {
+        "scope_level": scope_level,
+        "module_id": module_id,
+        "topic_id": topic_id
+    }
+    if blueprint_id:
+        extra_metadata["blueprint_id"] = blueprint_id
+
+    # 1. Packaged References
+    package_path = None
+    if use_packaged:
+        if not course_code:
+            raise HTTPException(status_code=400, detail="course_code required for packaged references")
+
+        package_path = os.path.join(settings.DATA_PACK_ROOT, "catalog", "courses", course_code, "materials")
+
+        logger.info(f"Ingesting packaged references from {package_path} with scope {scope_level}")
+        if not os.path.exists(package_path):
+            # It's not an error if missing, just zero found. But warn.
+            logger.warning(f"Packaged path not found: {package_path}")
+            package_path = None
+
+    # 2. Uploaded Files
+    uploads = [take_upload(file) for file in files or []]
+    for upload in uploads:
+        logger.info(f"Ingesting uploaded reference: {upload.filename}")
+
+    job = ingest_jobs.submit(course_id, uploads, extra_metadata=extra_metadata, package_path=package_path)
+    return {"status": "queued", "job_id": job.job_id, "files_total": job.files_total, "course_id": course_id}
+
 class TopicRequest(BaseModel):
     topic_id: str
     topic_name: str
@@ -236,13 +338,14 @@ async def retrieve_evidence(req: RetrieveRequest):
     if not settings.GEMINI_API_KEY:
          raise HTTPException(status_code=400, detail="GEMINI_API_KEY not configured. Cannot retrieve.")
 
+    # Search using topic names as queries: one embedding call, one DB round-trip
+    all_results = await indexer.hybrid_retrieve_many(
+        req.course_id, [topic.topic_name for topic in req.topic_ids], k=req.k
+    )
+
     results_map = {}
-    for topic in req.topic_ids:
+    for topic, raw_results in zip(req.topic_ids, all_results):
         tid = topic.topic_id
-        tname = topic.topic_name
-        
-        # Search using topic name as query
-        raw_results = await indexer.hybrid_retrieve(req.course_id, tname, k=req.k)
         
         # Transform to EvidenceItem structure (simplified for transport)
         evidence_items = []
@@ -1,6 +1,7 @@
 
 import logging
 import os
+from typing import BinaryIO, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -13,9 +14,12 @@ class OCRService:
         else:
              logger.info("OCR Service initialized (DISABLED).")
 
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, stream: Optional[BinaryIO] = None) -> str:
         """
         Extracts text from a scanned PDF/Image.
+        With `stream` (an upload's spooled file, rewound by the caller) the content
+        is read from it and file_path only names the file; a real OCR backend must
+        send the stream's bytes, as there is no file on disk.
         
         NOTE: This is currently a STUB / MOCK implementation.
         It does NOT connect to a real OCR backend (like DeepSeek).
@@ -0,0 +1,120 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+def mmr(query_vector: Sequence[float], doc_vectors: Sequence[Sequence[float]], k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Maximal Marginal Relevance: indices of k docs, each maximising
+    lambda * sim(query, doc) - (1 - lambda) * max sim(doc, already selected),
+    by cosine similarity. lambda_mult=1 is pure relevance order.
+    """
+    # Imported here: numpy is only needed when MMR re-ranking is enabled
+    import numpy as np
+
+    docs = np.asarray(doc_vectors, dtype=np.float32)
+    if docs.size == 0 or k <= 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    docs = docs / np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = docs @ query
+    similarity = docs @ docs.T
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()  # To the selected set, per doc
+    for _ in range(1, min(k, len(docs))):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
+
+class Reranker(ABC):
+    """
+    Post-retrieval stage over hybrid search results. rerank() is blocking and is
+    run off the event loop.
+    """
+    # Whether results must carry their 'embedding'
+    needs_vectors = False
+
+    @abstractmethod
+    def rerank(self, query: str, query_vector: List[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Return at most k of results, best first"""
+        pass
+
+class MMRReranker(Reranker):
+    """Diversify results with MMR over their embeddings, so near-duplicate chunks don't fill every slot"""
+    needs_vectors = True
+
+    def __init__(self, lambda_mult: float = 0.7):
+        self.lambda_mult = lambda_mult
+
+    def rerank(self, query: str, query_vector: List[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        if len(results) <= 1 or any(r.get("embedding") is None for r in results):
+            return results[:k]
+        order = mmr(query_vector, [r["embedding"] for r in results], k, self.lambda_mult)
+        return [results[i] for i in order]
+
+class CrossEncoderReranker(Reranker):
+    """
+    Re-score (query, chunk) pairs with a local cross-encoder (sentence-transformers,
+    loaded on first use) and keep the top k, with the score as rerank_score.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            # Optional dependency; only installed where this re-ranker is used
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name)
+            logger.info(f"Loaded cross-encoder {self.model_name}")
+        return self._model
+
+    def rerank(self, query: str, query_vector: List[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        if not results:
+            return []
+        scores = self._get_model().predict([(query, r["content"]) for r in results])
+        for result, score in zip(results, scores):
+            result["rerank_score"] = float(score)
+        return sorted(results, key=lambda r: r["rerank_score"], reverse=True)[:k]
+
+class RerankPipeline(Reranker):
+    """Stages in order; all but the last only re-order, the last one cuts to k"""
+
+    def __init__(self, stages: List[Reranker]):
+        self.stages = stages
+        self.needs_vectors = any(stage.needs_vectors for stage in stages)
+
+    def rerank(self, query: str, query_vector: List[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        for i, stage in enumerate(self.stages):
+            last = i == len(self.stages) - 1
+            results = stage.rerank(query, query_vector, results, k if last else len(results))
+        return results
+
+# name -> factory(settings-derived options); add local re-rankers here
+RERANKERS: Dict[str, Callable[..., Reranker]] = {
+    "mmr": lambda mmr_lambda=0.7, **_: MMRReranker(lambda_mult=mmr_lambda),
+    "cross_encoder": lambda cross_encoder_model=None, **_: (
+        CrossEncoderReranker(cross_encoder_model) if cross_encoder_model else CrossEncoderReranker()
+    ),
+}
+
+def create_reranker(spec: Optional[str], **options) -> Optional[Reranker]:
+    """
+    Reranker from a comma-separated list of RERANKERS names (e.g. "mmr" or
+    "cross_encoder,mmr"); None for "" / "none".
+    """
+    names = [name.strip() for name in (spec or "").split(",") if name.strip() and name.strip() != "none"]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in RERANKERS]
+    if unknown:
+        raise ValueError(f"Unknown reranker(s): {', '.join(unknown)} (available: {', '.join(RERANKERS)})")
+    stages = [RERANKERS[name](**options) for name in names]
+    return stages[0] if len(stages) == 1 else RerankPipeline(stages)
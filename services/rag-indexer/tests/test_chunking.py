@@ -0,0 +1,117 @@
+import pytest
+from app.chunking import Chunker, Section, estimate_tokens
+
+def _paragraph(words: int, word: str = "word") -> str:
+    return " ".join([word] * words) + "."
+
+def test_chunks_stay_within_budget_with_overlap():
+    chunker = Chunker(max_tokens=50, overlap_tokens=10, min_tokens=10)
+    text = "\n\n".join(_paragraph(n) for n in (30, 38, 12, 39, 25, 5, 39))
+    chunks = chunker.chunk_text(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 50
+
+def test_oversized_paragraph_is_split_within_budget():
+    chunker = Chunker(max_tokens=20, overlap_tokens=4, min_tokens=5)
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    chunks = chunker.chunk_text(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert estimate_tokens(chunk) <= 20
+
+def test_overlap_carries_tail_into_next_chunk():
+    chunker = Chunker(max_tokens=50, overlap_tokens=5, min_tokens=10)
+    first = _paragraph(40, "aa")   # 120 chars, ~30 tokens
+    second = _paragraph(40, "bb")
+    chunks = chunker.chunk_text(f"{first}\n\n{second}")
+
+    # Last ~5 tokens of the first chunk, starting on a word boundary
+    assert chunks == [first, f"aa aa aa aa aa aa.\n\n{second}"]
+
+def test_overlap_dropped_when_next_block_fills_budget():
+    chunker = Chunker(max_tokens=50, overlap_tokens=10, min_tokens=10)
+    first = _paragraph(40, "aa")
+    second = _paragraph(66, "bb")  # 198 chars: no room left for a carried tail
+    chunks = chunker.chunk_text(f"{first}\n\n{second}")
+
+    assert chunks == [first, second]
+
+def test_overlap_shortened_to_fit_budget():
+    chunker = Chunker(max_tokens=50, overlap_tokens=10, min_tokens=10)
+    first = _paragraph(40, "aa")
+    second = _paragraph(60, "bb")  # 180 chars: room for ~4 tokens of the 10-token tail
+    chunks = chunker.chunk_text(f"{first}\n\n{second}")
+
+    assert len(chunks) == 2
+    assert estimate_tokens(chunks[1]) <= 50
+    assert chunks[1].startswith("aa") and chunks[1].endswith(second)
+
+def test_no_overlap_across_page_boundaries():
+    chunker = Chunker(max_tokens=50, overlap_tokens=10, min_tokens=5)
+    sections = [
+        Section(text=_paragraph(30, "alpha"), page_number=1),
+        Section(text=_paragraph(30, "beta"), page_number=2),
+    ]
+    chunks = chunker.chunk_sections(sections)
+
+    assert [chunk.text for chunk in chunks] == [_paragraph(30, "alpha"), _paragraph(30, "beta")]
+
+def test_heading_moves_to_chunk_it_introduces():
+    chunker = Chunker(max_tokens=50, overlap_tokens=5, min_tokens=5)
+    text = "\n\n".join([
+        "# Introduction",
+        _paragraph(30, "alpha"),
+        "2.1 Binary Trees",
+        _paragraph(30, "beta"),
+    ])
+    chunks = chunker.chunk_sections([Section(text=text, kind="text")])
+
+    assert len(chunks) == 2
+    assert chunks[0].heading == "Introduction"
+    assert chunks[0].text.startswith("Introduction")
+    assert chunks[1].heading == "2.1 Binary Trees"
+    assert chunks[1].text.startswith("2.1 Binary Trees")
+
+def test_heading_carry_respects_budget():
+    chunker = Chunker(max_tokens=50, overlap_tokens=5, min_tokens=45)
+    text = "\n\n".join([
+        _paragraph(20, "alpha"),
+        "SECTION TWO",
+        _paragraph(39, "beta"),  # Fills a chunk on its own
+    ])
+    chunks = chunker.chunk_sections([Section(text=text, kind="text")])
+
+    for chunk in chunks:
+        assert estimate_tokens(chunk.text) <= 50
+    # The heading stays as the chunk's heading even when its text can't move along
+    assert chunks[-1].heading == "SECTION TWO"
+
+def test_short_slides_merge_with_slide_range_locator():
+    chunker = Chunker(max_tokens=100, overlap_tokens=10, min_tokens=50)
+    sections = [Section(text=_paragraph(8, f"s{i}"), page_number=i, kind="slide") for i in range(1, 4)]
+    chunks = chunker.chunk_sections(sections)
+
+    assert len(chunks) == 1
+    assert chunks[0].page_number == 1
+    assert chunks[0].locator == "slides 1-3"
+
+@pytest.mark.parametrize("kind, pages, locator", [
+    ("page", [4], "p. 4"),
+    ("page", [4, 5], "pp. 4-5"),
+    ("slide", [2], "slide 2"),
+    ("text", [None], None),
+])
+def test_locators(kind, pages, locator):
+    chunker = Chunker(max_tokens=100, overlap_tokens=10, min_tokens=90)
+    sections = [Section(text=_paragraph(10), page_number=page, kind=kind) for page in pages]
+    chunks = chunker.chunk_sections(sections)
+
+    assert len(chunks) == 1
+    assert chunks[0].locator == locator
+
+def test_overlap_must_be_below_budget():
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=50, overlap_tokens=50)
@@ -0,0 +1,66 @@
+import asyncio
+import io
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from app.indexer import Indexer
+
+class FakeEmbeddingClient:
+    def __init__(self, events):
+        self.events = events
+
+    async def embed_batch(self, texts):
+        self.events.append(("embed", len(texts)))
+        return [SimpleNamespace(embedding=[0.0] * 768) for _ in texts]
+
+class RecordingVectorStore:
+    def __init__(self, events):
+        self.events = events
+        self.rows = []
+
+    @asynccontextmanager
+    async def astream_replace_documents(self, course_id, source_paths, **kwargs):
+        self.events.append(("begin", tuple(source_paths)))
+
+        async def write(texts, embeddings, metadatas):
+            self.events.append(("write", len(texts)))
+            self.rows.extend(metadatas)
+
+        yield write
+        self.events.append(("commit", tuple(source_paths)))
+
+def _indexer(events, batch_chunks):
+    indexer = Indexer(api_key=None, database_url="sqlite://", embedding_cache_enabled=False,
+                      chunk_max_tokens=50, chunk_overlap_tokens=0, chunk_min_tokens=10)
+    indexer.STREAM_BATCH_CHUNKS = batch_chunks
+    indexer.embedding_client = FakeEmbeddingClient(events)
+    indexer.vector_store = RecordingVectorStore(events)
+    return indexer
+
+def test_batches_are_written_as_they_are_embedded():
+    events = []
+    indexer = _indexer(events, batch_chunks=3)
+    text = "\n\n".join(" ".join([f"w{i}"] * 40) + "." for i in range(7))
+
+    indexed = asyncio.run(indexer.index_file(1, "notes.txt", stream=io.BytesIO(text.encode())))
+
+    assert indexed == 7
+    assert events == [
+        ("begin", ("upload://notes.txt",)),
+        ("embed", 3), ("write", 3),
+        ("embed", 3), ("write", 3),
+        ("embed", 1), ("write", 1),
+        ("commit", ("upload://notes.txt",)),
+    ]
+    rows = indexer.vector_store.rows
+    assert [m["chunk_index"] for m in rows] == list(range(7))
+    assert {m["source_path"] for m in rows} == {"upload://notes.txt"}
+
+def test_empty_file_leaves_previous_version():
+    events = []
+    indexer = _indexer(events, batch_chunks=3)
+
+    indexed = asyncio.run(indexer.index_file(1, "empty.txt", stream=io.BytesIO(b"")))
+
+    assert indexed == 0
+    assert events == []
@@ -0,0 +1,311 @@
+"""
+Embedding Cache
+
+Content-addressed cache for embeddings keyed by (model name, task type, sha256(text)).
+Provides an in-memory LRU tier and a SQL-backed persistent tier (PostgreSQL, or a
+local SQLite file), plus CachedEmbeddingClient, which wraps any EmbeddingClient so
+that only texts never embedded before reach the provider, and QueryEmbeddingCache,
+a TTL'd in-process LRU for retrieval queries.
+
+Vectors are stored as packed little-endian float32 blobs (4 bytes per dimension).
+"""
+
+import asyncio
+import hashlib
+import logging
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, create_engine, func, select
+
+from .embedding_client import EmbeddingClient, EmbeddingMetadata, EmbeddingResult
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 of the exact text sent to the embedding model"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(blob) // 4}f", blob))
+
+
+class EmbeddingCache(ABC):
+    """Abstract base class for embedding caches. Lookups are per (model, task_type)."""
+
+    @abstractmethod
+    def get_many(self, model: str, task_type: str, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return {text_hash: vector} for the hashes that are cached"""
+        pass
+
+    @abstractmethod
+    def set_many(self, model: str, task_type: str, vectors: Dict[str, List[float]]) -> None:
+        """Store {text_hash: vector}"""
+        pass
+
+
+class MemoryEmbeddingCache(EmbeddingCache):
+    """
+    In-process LRU of packed vectors.
+    Oldest entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, task_type: str, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for h in text_hashes:
+                key = (model, task_type, h)
+                blob = self._entries.get(key)
+                if blob is not None:
+                    self._entries.move_to_end(key)
+                    found[h] = unpack_vector(blob)
+        return found
+
+    def set_many(self, model: str, task_type: str, vectors: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for h, vector in vectors.items():
+                key = (model, task_type, h)
+                self._entries[key] = pack_vector(vector)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_metadata = MetaData()
+
+embedding_cache_table = Table(
+    "embedding_cache",
+    _metadata,
+    Column("model", String, primary_key=True),
+    Column("task_type", String, primary_key=True),
+    Column("text_sha256", String(64), primary_key=True),
+    Column("dim", Integer, nullable=False),
+    Column("vector", LargeBinary, nullable=False),  # float32 little-endian
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class SQLEmbeddingCache(EmbeddingCache):
+    """
+    Persistent cache in the `embedding_cache` table.
+    Works against PostgreSQL (BYTEA) or a local SQLite file.
+    """
+
+    # Bound on hashes per IN (...) lookup
+    LOOKUP_CHUNK_SIZE = 500
+
+    def __init__(self, database_url: Optional[str] = None, engine=None):
+        self.engine = engine if engine is not None else create_engine(database_url)
+        _metadata.create_all(self.engine, tables=[embedding_cache_table])
+        logger.info(f"Initialized SQLEmbeddingCache ({self.engine.dialect.name})")
+
+    def get_many(self, model: str, task_type: str, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        hashes = list(text_hashes)
+        found = {}
+        t = embedding_cache_table
+        with self.engine.connect() as conn:
+            for i in range(0, len(hashes), self.LOOKUP_CHUNK_SIZE):
+                chunk = hashes[i:i + self.LOOKUP_CHUNK_SIZE]
+                rows = conn.execute(
+                    select(t.c.text_sha256, t.c.vector).where(
+                        t.c.model == model,
+                        t.c.task_type == task_type,
+                        t.c.text_sha256.in_(chunk)
+                    )
+                )
+                for text_sha256, blob in rows:
+                    found[text_sha256] = unpack_vector(bytes(blob))
+        return found
+
+    def set_many(self, model: str, task_type: str, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        rows = [
+            {"model": model, "task_type": task_type, "text_sha256": h, "dim": len(v), "vector": pack_vector(v)}
+            for h, v in vectors.items()
+        ]
+        stmt = insert(embedding_cache_table).on_conflict_do_nothing()
+        with self.engine.begin() as conn:
+            conn.execute(stmt, rows)
+
+
+class TieredEmbeddingCache(EmbeddingCache):
+    """
+    Memory LRU in front of a persistent cache.
+    Persistent hits are promoted into the memory tier.
+    """
+
+    def __init__(self, memory: EmbeddingCache, persistent: EmbeddingCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get_many(self, model: str, task_type: str, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        hashes = list(text_hashes)
+        found = self.memory.get_many(model, task_type, hashes)
+        missing = [h for h in hashes if h not in found]
+        if missing:
+            promoted = self.persistent.get_many(model, task_type, missing)
+            if promoted:
+                self.memory.set_many(model, task_type, promoted)
+                found.update(promoted)
+        return found
+
+    def set_many(self, model: str, task_type: str, vectors: Dict[str, List[float]]) -> None:
+        self.memory.set_many(model, task_type, vectors)
+        self.persistent.set_many(model, task_type, vectors)
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-process LRU of query embeddings with per-entry TTL.
+    Keyed by (model, query text); keeps retrieval of recurring queries (e.g. topic
+    names) free of any network round-trip. Exposes hit/miss counters.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        key = (model, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, model: str, query: str, vector: List[float]) -> None:
+        key = (model, query)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class CachedEmbeddingClient(EmbeddingClient):
+    """
+    EmbeddingClient wrapper that serves repeated texts from an EmbeddingCache.
+    Identical texts within one call are embedded once. Cache failures are logged
+    and never fail the embedding itself.
+    """
+
+    def __init__(self, client: EmbeddingClient, cache: EmbeddingCache):
+        self.client = client
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get_model_name(self) -> str:
+        return self.client.get_model_name()
+
+    async def _lookup(self, task_type: str, hashes: List[str]) -> Dict[str, List[float]]:
+        try:
+            return await asyncio.to_thread(self.cache.get_many, self.get_model_name(), task_type, hashes)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+
+    async def _store(self, task_type: str, vectors: Dict[str, List[float]]) -> None:
+        try:
+            await asyncio.to_thread(self.cache.set_many, self.get_model_name(), task_type, vectors)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    async def embed(self, text: str, task_type: str = "retrieval_document") -> List[float]:
+        h = hash_text(text)
+        cached = await self._lookup(task_type, [h])
+        if h in cached:
+            self.hits += 1
+            return cached[h]
+
+        self.misses += 1
+        vector = await self.client.embed(text, task_type=task_type)
+        await self._store(task_type, {h: vector})
+        return vector
+
+    async def embed_batch(
+        self,
+        texts: List[str],
+        metadata: Optional[List[EmbeddingMetadata]] = None,
+        task_type: str = "retrieval_document"
+    ) -> List[EmbeddingResult]:
+        if metadata and len(metadata) != len(texts):
+            raise ValueError("Metadata list must match length of texts list")
+
+        hashes = [hash_text(t) for t in texts]
+        unique = list(dict.fromkeys(hashes))
+        vectors = await self._lookup(task_type, unique)
+
+        # Embed each distinct uncached text once
+        missing = [h for h in unique if h not in vectors]
+        if missing:
+            first_text = {}
+            for text, h in zip(texts, hashes):
+                first_text.setdefault(h, text)
+            fresh = await self.client.embed_batch([first_text[h] for h in missing], task_type=task_type)
+            new_vectors = {h: r.embedding for h, r in zip(missing, fresh)}
+            await self._store(task_type, new_vectors)
+            vectors.update(new_vectors)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} embedded")
+
+        return [
+            EmbeddingResult(text=text, embedding=vectors[h], metadata=metadata[i] if metadata else None)
+            for i, (text, h) in enumerate(zip(texts, hashes))
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def create_embedding_cache(memory_max_entries: int = 10000, database_url: Optional[str] = None, engine=None) -> EmbeddingCache:
+    """
+    Build an embedding cache: memory-only, or memory + SQL table when a
+    database_url/engine is given.
+    """
+    memory = MemoryEmbeddingCache(max_entries=memory_max_entries)
+    if not database_url and engine is None:
+        return memory
+    return TieredEmbeddingCache(memory, SQLEmbeddingCache(database_url=database_url, engine=engine))
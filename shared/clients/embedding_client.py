@@ -13,10 +13,23 @@ from dataclasses import dataclass
 
 import google.generativeai as genai
 
+from .rate_limiter import backoff_delay, is_quota_error, parse_retry_after
+
 
 logger = logging.getLogger(__name__)
 
 
+def is_payload_error(message: str) -> bool:
+    """True if the provider rejected the request's content (400 / invalid argument), so resending it won't help"""
+    message = message.lower()
+    return (
+        "400" in message
+        or "invalid argument" in message
+        or "invalidargument" in message
+        or "invalid_argument" in message
+    )
+
+
 @dataclass
 class EmbeddingMetadata:
     """Metadata associated with an embedding"""
@@ -70,7 +83,8 @@ class EmbeddingClient(ABC):
     async def embed_batch(
         self,
         texts: List[str],
-        metadata: Optional[List[EmbeddingMetadata]] = None
+        metadata: Optional[List[EmbeddingMetadata]] = None,
+        task_type: str = "retrieval_document"
     ) -> List[EmbeddingResult]:
         """
         Generate embeddings for multiple texts.
@@ -78,6 +92,7 @@ class EmbeddingClient(ABC):
         Args:
             texts: List of input texts
             metadata: Optional metadata for each text
+            task_type: Type of task (retrieval_document or retrieval_query)
             
         Returns:
             List of embedding results with metadata
@@ -101,13 +116,27 @@ class GeminiEmbeddingClient(EmbeddingClient):
     - Summaries and canonical content
     """
     
-    def __init__(self, api_key: str, model_name: str = "models/text-embedding-004"):
+    # Provider limit on contents per batchEmbedContents request
+    MAX_BATCH_SIZE = 100
+    
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "models/text-embedding-004",
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        max_retries: int = 3
+    ):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is required")
         
         genai.configure(api_key=api_key)
         self.model_name = model_name
-        logger.info(f"Initialized GeminiEmbeddingClient with model: {model_name}")
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.max_retries = max_retries
+        # Caps in-flight batch requests across concurrent embed_batch calls
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        logger.info(f"Initialized GeminiEmbeddingClient with model: {model_name} (batch size {self.batch_size})")
     
     async def embed(self, text: str, task_type: str = "retrieval_document") -> List[float]:
         """
@@ -136,54 +165,99 @@ class GeminiEmbeddingClient(EmbeddingClient):
             logger.error(f"Failed to generate embedding: {e}")
             raise Exception(f"Embedding generation failed: {e}")
     
+    async def _embed_one_with_retry(self, text: str, task_type: str) -> List[float]:
+        """Single-item embedding with backoff, used to isolate failures of a batch"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.embed(text, task_type=task_type)
+            except Exception as e:
+                if attempt >= self.max_retries or is_payload_error(str(e)):
+                    raise
+                delay = parse_retry_after(str(e)) or backoff_delay(attempt)
+                logger.warning(f"Embedding retry {attempt + 1}/{self.max_retries} in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+    
+    async def _embed_batch_request(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """
+        Embed up to MAX_BATCH_SIZE texts in one batchEmbedContents request.
+        Quota and transient errors (5xx, timeouts) retry the whole batch with
+        backoff. Only a batch the provider rejects for its content (400 /
+        invalid argument, or a short response) falls back to per-item calls,
+        so one bad element does not sink the batch.
+        """
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await genai.embed_content_async(
+                        model=self.model_name,
+                        content=texts,
+                        task_type=task_type
+                    )
+                except Exception as e:
+                    if is_payload_error(str(e)):
+                        logger.warning(f"Batch embedding of {len(texts)} items rejected, retrying items individually: {e}")
+                        break
+                    if attempt >= self.max_retries:
+                        logger.error(f"Batch embedding retries exhausted: {e}")
+                        raise Exception(f"Embedding generation failed: {e}")
+                    delay = parse_retry_after(str(e)) or backoff_delay(attempt)
+                    kind = "quota hit" if is_quota_error(str(e)) else "request failed"
+                    logger.warning(f"Embedding {kind}, retrying batch in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                embeddings = response['embedding']
+                if len(embeddings) == len(texts):
+                    return embeddings
+                logger.warning(f"Expected {len(texts)} embeddings, got {len(embeddings)}; retrying items individually")
+                break
+            
+            return list(await asyncio.gather(
+                *[self._embed_one_with_retry(text, task_type) for text in texts]
+            ))
+    
     async def embed_batch(
         self,
         texts: List[str],
-        metadata: Optional[List[EmbeddingMetadata]] = None
+        metadata: Optional[List[EmbeddingMetadata]] = None,
+        task_type: str = "retrieval_document"
     ) -> List[EmbeddingResult]:
         """
         Generate embeddings for multiple texts with metadata.
         
+        Texts are sent batch_size at a time, one request per batch, with up to
+        max_concurrency batches in flight.
+        
         Args:
             texts: List of input texts
             metadata: Optional metadata for each text (must match length of texts)
+            task_type: Task type for Gemini (retrieval_document or retrieval_query)
             
         Returns:
-            List of embedding results with metadata
+            List of embedding results with metadata, in input order
         """
         if metadata and len(metadata) != len(texts):
             raise ValueError("Metadata list must match length of texts list")
         
-        results = []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
         
-        # Process in batches to avoid overwhelming the API
-        batch_size = 100
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadata = metadata[i:i + batch_size] if metadata else None
-            
-            try:
-                # Generate embeddings for batch
-                embeddings = await asyncio.gather(
-                    *[self.embed(text) for text in batch_texts]
-                )
-                
-                # Combine with metadata
-                for j, (text, embedding) in enumerate(zip(batch_texts, embeddings)):
-                    meta = batch_metadata[j] if batch_metadata else None
-                    results.append(EmbeddingResult(
-                        text=text,
-                        embedding=embedding,
-                        metadata=meta
-                    ))
-                
-                logger.info(f"Generated embeddings for batch {i // batch_size + 1} ({len(batch_texts)} items)")
-                
-            except Exception as e:
-                logger.error(f"Failed to generate embeddings for batch: {e}")
-                raise
+        try:
+            batch_embeddings = await asyncio.gather(
+                *[self._embed_batch_request(batch, task_type) for batch in batches]
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings for batch: {e}")
+            raise
+        
+        results = []
+        for i, embedding in enumerate(e for batch in batch_embeddings for e in batch):
+            results.append(EmbeddingResult(
+                text=texts[i],
+                embedding=embedding,
+                metadata=metadata[i] if metadata else None
+            ))
         
-        logger.info(f"✅ Successfully generated {len(results)} embeddings")
+        logger.info(f"✅ Successfully generated {len(results)} embeddings in {len(batches)} requests")
         return results
     
     def get_model_name(self) -> str:
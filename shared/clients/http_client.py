@@ -0,0 +1,117 @@
+"""
+Inter-service HTTP Client
+
+Pooled async HTTP client for calls between services (ai-authoring, ppt-renderer,
+rag-indexer). One keep-alive httpx.AsyncClient is kept per target host, so each
+host gets its own connection limits, and transient failures are retried with
+exponential backoff.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from .rate_limiter import backoff_delay
+
+
+logger = logging.getLogger(__name__)
+
+# Gateway/proxy statuses that mean "try again", not "the request was wrong"
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# Methods safe to send twice. A gateway status does not prove the target never
+# ran the request (a 504 may arrive while it is still working), so only these
+# are retried on one.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class ServiceHTTPClient:
+    """
+    Shared async HTTP client pool.
+
+    Failures where the request never reached the target (connect errors and
+    connect/pool timeouts) are retried for every method. Gateway statuses
+    (502/503/504) are retried for idempotent methods only, so non-idempotent
+    POSTs such as generation requests are not executed twice.
+    Call aclose() on application shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        default_timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.5
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.connect_timeout = connect_timeout
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout or self.default_timeout, connect=self.connect_timeout)
+
+    def _client_for(self, url: str) -> httpx.AsyncClient:
+        parsed = httpx.URL(url)
+        host_key = f"{parsed.scheme}://{parsed.host}:{parsed.port or ''}"
+        client = self._clients.get(host_key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self._timeout(None))
+            self._clients[host_key] = client
+        return client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request through the pool for url's host.
+        Returns the final response (non-2xx statuses are not raised); raises the
+        last httpx.TransportError if every attempt failed to connect.
+        """
+        retries = self.max_retries if retries is None else retries
+        client = self._client_for(url)
+        retry_statuses = RETRYABLE_STATUS_CODES if method.upper() in IDEMPOTENT_METHODS else set()
+
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, timeout=self._timeout(timeout), **kwargs)
+                if response.status_code not in retry_statuses or attempt >= retries:
+                    return response
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying ({attempt + 1}/{retries})")
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e!r}), retrying ({attempt + 1}/{retries})")
+
+            await asyncio.sleep(backoff_delay(attempt, base_delay=self.retry_base_delay))
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
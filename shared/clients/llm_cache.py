@@ -0,0 +1,223 @@
+"""
+LLM Response Cache
+
+Content-addressed cache for LLM responses keyed by (model name, temperature, prompt hash).
+Provides an in-memory LRU tier and a SQLite-backed on-disk tier, both with TTL and
+size-based eviction, plus a tiered combination of the two.
+"""
+
+import logging
+import json
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+def compute_prompt_hash(prompt: str) -> str:
+    """
+    SHA-256 of the canonical JSON encoding of a prompt.
+
+    Matches `compute_hash` in the ai-authoring PromptBuilder, so the `prompt_hash`
+    emitted by `PromptBuilder.build_bundle` can be passed straight through.
+    """
+    encoded = json.dumps(prompt, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def make_cache_key(model_name: str, temperature: Optional[float], prompt_hash: str) -> str:
+    """
+    Build the cache key for a (model, temperature, prompt) triple.
+    A temperature of None means the model's default sampling config.
+    """
+    temp = "default" if temperature is None else f"{float(temperature):.3f}"
+    return f"{model_name}|{temp}|{prompt_hash}"
+
+
+class ResponseCache(ABC):
+    """Abstract base class for LLM response caches"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on miss/expiry"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store a response under key"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    In-process LRU cache with per-entry TTL.
+    Oldest entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    On-disk cache backed by a single SQLite file.
+    Survives restarts; expired rows are purged lazily and the least recently
+    used rows are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: int = 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_responses_last_access ON llm_responses (last_access)"
+        )
+        self._conn.commit()
+        logger.info(f"Initialized SQLiteResponseCache at {path}")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now)
+            )
+            self._conn.execute("DELETE FROM llm_responses WHERE expires_at < ?", (now,))
+
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE key IN ("
+                    "SELECT key FROM llm_responses ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+
+class TieredResponseCache(ResponseCache):
+    """
+    Memory LRU in front of a persistent cache.
+    Disk hits are promoted into the memory tier.
+    """
+
+    def __init__(self, memory: ResponseCache, disk: ResponseCache):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+
+def create_response_cache(
+    memory_max_entries: int = 256,
+    disk_path: Optional[str] = None,
+    disk_max_entries: int = 10000,
+    ttl_seconds: int = 86400
+) -> ResponseCache:
+    """
+    Build a response cache: memory-only, or memory + SQLite when disk_path is set.
+    """
+    memory = MemoryResponseCache(max_entries=memory_max_entries, ttl_seconds=ttl_seconds)
+    if not disk_path:
+        return memory
+
+    disk = SQLiteResponseCache(disk_path, max_entries=disk_max_entries, ttl_seconds=ttl_seconds)
+    return TieredResponseCache(memory, disk)
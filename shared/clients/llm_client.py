@@ -7,13 +7,20 @@ Supports multiple Gemini models with configurable retry behavior.
 
 import logging
 import json
-import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 from enum import Enum
 
 import google.generativeai as genai
 
+from shared.clients.rate_limiter import (
+    PrioritySemaphore,
+    backoff_delay,
+    estimate_tokens,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +32,10 @@ class LLMError(Exception):
 
 class LLMQuotaError(LLMError):
     """Raised when quota/rate limit is exceeded"""
-    pass
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after  # Provider hint in seconds, if any
 
 
 class LLMTimeoutError(LLMError):
@@ -33,6 +43,23 @@ class LLMTimeoutError(LLMError):
     pass
 
 
+# Per-model concurrency limits, shared by every client instance using the same model
+_model_semaphores: Dict[str, PrioritySemaphore] = {}
+
+
+def get_model_semaphore(model_name: str, max_concurrency: int) -> PrioritySemaphore:
+    """
+    Return the process-wide semaphore bounding in-flight requests to a model.
+    Freed slots go to waiters in priority order (see llm_priority).
+    The first caller for a model fixes its limit.
+    """
+    semaphore = _model_semaphores.get(model_name)
+    if semaphore is None:
+        semaphore = PrioritySemaphore(max_concurrency)
+        _model_semaphores[model_name] = semaphore
+    return semaphore
+
+
 class LLMClient(ABC):
     """Abstract base class for LLM clients"""
     
@@ -65,32 +92,36 @@ class GeminiFlashLiteClient(LLMClient):
     Fast and cost-effective for most course generation tasks.
     """
     
-    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-flash-lite"):
+    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-flash-lite", max_concurrency: int = 64):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is required")
         
         genai.configure(api_key=api_key)
         self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self._semaphore = get_model_semaphore(model_name, max_concurrency)
         logger.info(f"Initialized GeminiFlashLiteClient with model: {model_name}")
     
     async def generate(self, prompt: str, temperature: float = 0.7) -> str:
         """Generate text using Gemini Flash Lite"""
         try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature
+                    )
                 )
-            )
             return response.text
         except Exception as e:
             error_msg = str(e).lower()
             
             # Check for quota/rate limit errors
             if "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg:
-                raise LLMQuotaError(f"Quota exceeded for {self.model_name}: {e}")
+                raise LLMQuotaError(
+                    f"Quota exceeded for {self.model_name}: {e}",
+                    retry_after=parse_retry_after(str(e))
+                )
             
             # Check for timeout errors
             if "timeout" in error_msg:
@@ -109,31 +140,35 @@ class GeminiFlashClient(LLMClient):
     More capable than Flash Lite, used when primary model fails.
     """
     
-    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-flash-exp"):
+    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-flash-exp", max_concurrency: int = 64):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is required")
         
         genai.configure(api_key=api_key)
         self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self._semaphore = get_model_semaphore(model_name, max_concurrency)
         logger.info(f"Initialized GeminiFlashClient with model: {model_name}")
     
     async def generate(self, prompt: str, temperature: float = 0.7) -> str:
         """Generate text using Gemini Flash"""
         try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature
+                    )
                 )
-            )
             return response.text
         except Exception as e:
             error_msg = str(e).lower()
             
             if "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg:
-                raise LLMQuotaError(f"Quota exceeded for {self.model_name}: {e}")
+                raise LLMQuotaError(
+                    f"Quota exceeded for {self.model_name}: {e}",
+                    retry_after=parse_retry_after(str(e))
+                )
             
             if "timeout" in error_msg:
                 raise LLMTimeoutError(f"Request timeout for {self.model_name}: {e}")
@@ -151,31 +186,35 @@ class GeminiProClient(LLMClient):
     Requires paid tier.
     """
     
-    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-pro-exp"):
+    def __init__(self, api_key: str, model_name: str = "models/gemini-2.0-pro-exp", max_concurrency: int = 64):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is required")
         
         genai.configure(api_key=api_key)
         self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        self._semaphore = get_model_semaphore(model_name, max_concurrency)
         logger.info(f"Initialized GeminiProClient with model: {model_name}")
     
     async def generate(self, prompt: str, temperature: float = 0.7) -> str:
         """Generate text using Gemini Pro"""
         try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature
+                    )
                 )
-            )
             return response.text
         except Exception as e:
             error_msg = str(e).lower()
             
             if "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg:
-                raise LLMQuotaError(f"Quota exceeded for {self.model_name}: {e}")
+                raise LLMQuotaError(
+                    f"Quota exceeded for {self.model_name}: {e}",
+                    retry_after=parse_retry_after(str(e))
+                )
             
             if "timeout" in error_msg:
                 raise LLMTimeoutError(f"Request timeout for {self.model_name}: {e}")
@@ -192,19 +231,33 @@ class LLMClientWithFallback:
     
     Fallback flow:
     1. Try primary client (Flash Lite)
-    2. On error (429, timeout, etc.) → Try fallback client (Flash)
+    2. On error (429 after quota retries, timeout, etc.) → Try fallback client (Flash)
     3. If both fail → Raise error with detailed logs
+    
+    Every call waits for its model's rate limiter (RPM/TPM budgets, priority
+    order). On LLMQuotaError the limiter is paused for the provider's
+    retry-after hint, or an exponential backoff with jitter, and the same
+    model is retried up to max_quota_retries times before falling back.
+
+    Responses are not cached here; ai-authoring's GeminiClient owns the LLM
+    response cache (see shared.clients.llm_cache).
     """
     
     def __init__(
         self,
         primary_client: LLMClient,
         fallback_client: Optional[LLMClient] = None,
-        enable_fallback: bool = True
+        enable_fallback: bool = True,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_quota_retries: int = 3
     ):
         self.primary_client = primary_client
         self.fallback_client = fallback_client
         self.enable_fallback = enable_fallback and fallback_client is not None
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_quota_retries = max_quota_retries
         
         logger.info(
             f"LLMClientWithFallback initialized - "
@@ -213,6 +266,28 @@ class LLMClientWithFallback:
             f"Enabled: {self.enable_fallback}"
         )
     
+    async def _generate_with_quota_retries(self, client: LLMClient, prompt: str, temperature: float) -> str:
+        """client.generate() once admitted by the model's rate limiter, retrying quota errors"""
+        model_name = client.get_model_name()
+        limiter = get_rate_limiter(model_name, self.requests_per_minute, self.tokens_per_minute)
+        attempt = 0
+        while True:
+            await limiter.acquire(estimate_tokens(prompt))
+            try:
+                return await client.generate(prompt, temperature)
+            except LLMQuotaError as e:
+                if attempt >= self.max_quota_retries:
+                    raise
+                delay = e.retry_after
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                logger.warning(
+                    f"⏳ Quota hit on {model_name} "
+                    f"(attempt {attempt + 1}/{self.max_quota_retries}), retrying in {delay:.1f}s"
+                )
+                limiter.pause(delay)
+                attempt += 1
+    
     async def generate(self, prompt: str, temperature: float = 0.7) -> str:
         """
         Generate text with automatic fallback.
@@ -230,7 +305,7 @@ class LLMClientWithFallback:
         # Try primary model first
         try:
             logger.debug(f"Attempting generation with primary model: {self.primary_client.get_model_name()}")
-            result = await self.primary_client.generate(prompt, temperature)
+            result = await self._generate_with_quota_retries(self.primary_client, prompt, temperature)
             logger.info(f"✅ Successfully generated content with primary model: {self.primary_client.get_model_name()}")
             return result
             
@@ -243,7 +318,7 @@ class LLMClientWithFallback:
             if self.enable_fallback and self.fallback_client:
                 try:
                     logger.info(f"🔄 Retrying with fallback model: {self.fallback_client.get_model_name()}")
-                    result = await self.fallback_client.generate(prompt, temperature)
+                    result = await self._generate_with_quota_retries(self.fallback_client, prompt, temperature)
                     logger.info(
                         f"✅ Successfully generated content with fallback model: {self.fallback_client.get_model_name()}"
                     )
@@ -0,0 +1,252 @@
+"""
+LLM Rate Limiting
+
+Quota-aware scheduling for LLM calls:
+- Token buckets per model for requests-per-minute and tokens-per-minute
+- A priority queue so interactive calls are admitted before bulk work
+- A priority-ordered semaphore for per-model concurrency caps
+- Exponential backoff with full jitter, honoring provider retry-after hints
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling priority for LLM calls (lower is admitted first)"""
+    INTERACTIVE = 0   # User-facing requests, e.g. /topics/slides/generate
+    NORMAL = 5
+    BULK = 10         # Background / Kafka-driven batch work
+
+
+_current_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.NORMAL)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """
+    Set the priority of every LLM call made within this block (and tasks it spawns).
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 chars per token) used for TPM accounting"""
+    return max(1, len(text) // 4)
+
+
+def is_quota_error(message: str) -> bool:
+    message = message.lower()
+    return (
+        "429" in message
+        or "quota" in message
+        or "rate limit" in message
+        or "resource exhausted" in message
+        or "resourceexhausted" in message
+    )
+
+
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r"retry[_ ]delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry[- ]after[:=\s]+(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry in\s+(\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+
+def parse_retry_after(message: str) -> Optional[float]:
+    """
+    Extract a retry-after hint (seconds) from a provider error message, if present.
+    """
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) attempt"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most capacity.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until_available(self, amount: float) -> float:
+        """Seconds until amount can be consumed (0 if available now)"""
+        self._refill()
+        # Requests larger than the bucket only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class ModelRateLimiter:
+    """
+    Admission control for a single model.
+
+    Callers queue by (priority, arrival order); only the head of the queue may
+    consume from the buckets, so a waiting interactive call is never starved by
+    bulk calls arriving after it.
+    """
+
+    def __init__(self, model_name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.model_name = model_name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+
+    def _wait_time(self, estimated_tokens: int) -> float:
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.time_until_available(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.time_until_available(estimated_tokens))
+        return wait
+
+    async def acquire(self, estimated_tokens: int = 0, priority: Optional[Priority] = None) -> None:
+        """Wait until a call with the given token estimate may be sent"""
+        if priority is None:
+            priority = current_priority()
+        ticket = (int(priority), next(self._seq))
+
+        async with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] == ticket:
+                        timeout = self._wait_time(estimated_tokens)
+                        if timeout <= 0:
+                            heapq.heappop(self._queue)
+                            if self.requests:
+                                self.requests.consume(1)
+                            if self.tokens:
+                                self.tokens.consume(estimated_tokens)
+                            self._cond.notify_all()
+                            return
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                # Cancelled while queued: drop our ticket and let the next caller proceed
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def pause(self, seconds: float) -> None:
+        """Hold all admissions for this model, e.g. after a 429 with a retry-after hint"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limiter for {self.model_name} paused for {seconds:.1f}s")
+
+
+class PrioritySemaphore:
+    """
+    Semaphore that hands freed slots to waiters in (priority, arrival) order.
+
+    A FIFO asyncio.Semaphore behind ModelRateLimiter would re-queue admitted
+    calls by arrival, so bulk calls already waiting for a slot would still go
+    before a later interactive call.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+    def locked(self) -> bool:
+        return self._value == 0
+
+    async def acquire(self, priority: Optional[Priority] = None) -> bool:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return True
+        if priority is None:
+            priority = current_priority()
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._seq), waiter)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot and cancelled in the same tick: pass the slot on
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self._value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+_rate_limiters: Dict[str, ModelRateLimiter] = {}
+
+
+def get_rate_limiter(model_name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> ModelRateLimiter:
+    """
+    Return the process-wide rate limiter for a model.
+    The first caller for a model fixes its limits.
+    """
+    limiter = _rate_limiters.get(model_name)
+    if limiter is None:
+        limiter = ModelRateLimiter(model_name, requests_per_minute, tokens_per_minute)
+        _rate_limiters[model_name] = limiter
+    return limiter
@@ -1,12 +1,17 @@
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, text, Column, Integer, String, JSON, func
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Tuple
+from sqlalchemy import text, Column, Integer, BigInteger, Float, String, JSON, DateTime, func
+from sqlalchemy import cast, column, insert, select, true, values
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
 from sqlalchemy import Index
 from pgvector.sqlalchemy import Vector
 
+from shared.db.base import get_async_db_engine, get_db_engine
+
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
@@ -21,128 +26,916 @@ class Embedding(Base):
     metadata_json = Column("metadata", JSON, nullable=True)
     search_text = Column(TSVECTOR) # For keyword search
 
+    # Scope fields promoted from metadata at insert time, so scoped searches use indexes
+    course_id = Column(Integer, nullable=True)
+    module_id = Column(String, nullable=True)
+    topic_id = Column(String, nullable=True)
+    scope_level = Column(String, nullable=True) # course, module, topic
+    blueprint_id = Column(String, nullable=True)
+    source_path = Column(String, nullable=True) # Ingested file; see IngestManifest
+
     __table_args__ = (
         Index('ix_embeddings_search_text', 'search_text', postgresql_using='gin'),
+        Index('ix_embeddings_course_module_topic', 'course_id', 'module_id', 'topic_id'),
+        Index('ix_embeddings_course_scope_level', 'course_id', 'scope_level'),
+        Index('ix_embeddings_course_source', 'course_id', 'source'),
+        Index('ix_embeddings_blueprint_id', 'blueprint_id', postgresql_where=text('blueprint_id IS NOT NULL')),
+        Index('ix_embeddings_course_source_path', 'course_id', 'source_path'),
+    )
+
+class IngestManifest(Base):
+    """
+    One row per ingested source file. Re-ingestion skips files whose fingerprint
+    (size, mtime, sha256, and the hash of the metadata they were ingested with)
+    is unchanged; the file's chunks are the embeddings rows with its source_path.
+    """
+    __tablename__ = 'ingest_manifest'
+
+    course_id = Column(Integer, primary_key=True)
+    path = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    mtime = Column(Float, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    metadata_sha256 = Column(String(64), nullable=True)
+    chunk_count = Column(Integer, nullable=False, default=0)
+    ingested_at = Column(DateTime(timezone=True), server_default=func.now())
+
+MANIFEST_FIELDS = ("course_id", "path", "size", "mtime", "sha256", "metadata_sha256", "chunk_count")
+
+# Metadata keys stored as real columns (filters on these hit the indexes above)
+SCOPE_COLUMNS = ("course_id", "module_id", "topic_id", "scope_level", "blueprint_id", "source_path")
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _scope_values(meta: Dict[str, Any]) -> tuple:
+    """(course_id, module_id, topic_id, scope_level, blueprint_id) for a metadata dict"""
+    return (
+        _to_int(meta.get("course_id")),
+        *[str(meta[k]) if meta.get(k) is not None else None for k in SCOPE_COLUMNS[1:]]
     )
 
+def _filter_clause(key: str, value):
+    """Equality filter on a promoted column when possible, else on the metadata JSON"""
+    if key == "course_id":
+        return Embedding.course_id == _to_int(value)
+    if key in SCOPE_COLUMNS or key == "source":
+        return getattr(Embedding, key) == str(value)
+    return func.json_extract_path_text(Embedding.metadata_json, key) == str(value)
+
 class PGVectorClient:
     """
     Vector Store Client using PostgreSQL + pgvector.
+    
+    Maintains an approximate nearest-neighbour index on `embeddings.embedding`
+    (cosine ops): HNSW (default) or IVFFlat, or none for exact scans. Build
+    parameters apply when the index is created; use rebuild_ann_index() to change
+    them, or after bulk loads for IVFFlat (its lists are trained on existing rows).
+
+    Filtered searches (e.g. by course) prune the ANN candidates after the index
+    scan, so they could return fewer than the requested rows. On pgvector >= 0.8
+    they use iterative index scans, which keep scanning until enough rows pass the
+    filter; on older versions ef_search is raised to over-fetch instead.
     """
-    def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
+    ANN_INDEX_TYPES = ("hnsw", "ivfflat", "none")
+    # Without iterative scans: ef_search for filtered queries, as a multiple of the rows wanted
+    FILTERED_EF_SEARCH_FACTOR = 4
+    MAX_EF_SEARCH = 1000  # pgvector's upper bound
+    
+    def __init__(
+        self,
+        database_url: str,
+        index_type: str = "hnsw",
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 64,
+        ivfflat_lists: int = 100,
+        ef_search: int = 40,
+        probes: int = 10,
+        async_enabled: bool = False,
+        engine_options: Optional[Dict[str, Any]] = None,
+        prepared_statement_cache_size: int = 500
+    ):
+        if index_type not in self.ANN_INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {self.ANN_INDEX_TYPES}")
+        # engine_options: pool sizing for both engines (see shared.db.base)
+        self.engine = get_db_engine(database_url, name="vector-store", **(engine_options or {}))
         self.Session = sessionmaker(bind=self.engine)
+        # asyncpg engine for the a* methods (schema setup below stays on the sync engine).
+        # Its per-connection statement cache keeps the search queries server-side prepared.
+        self.async_engine = get_async_db_engine(
+            database_url,
+            name="vector-store-async",
+            prepared_statement_cache_size=prepared_statement_cache_size,
+            **(engine_options or {})
+        ) if async_enabled else None
+        self.index_type = index_type
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.ivfflat_lists = ivfflat_lists
+        self.ef_search = ef_search
+        self.probes = probes
         
         # Ensure extension exists
         with self.engine.connect() as conn:
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             conn.commit()
+        # Iterative index scans for filtered searches (pgvector >= 0.8)
+        self.iterative_scan = self._pgvector_version() >= (0, 8)
             
         # Create tables
         Base.metadata.create_all(self.engine)
+        self._migrate_scope_columns()
+        self.ensure_ann_index()
         logger.info("PGVectorClient initialized")
 
-    def add_documents(self, texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[Dict[str, Any]]] = None):
+    def _pgvector_version(self) -> Tuple[int, ...]:
+        try:
+            with self.engine.connect() as conn:
+                version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+            return tuple(int(part) for part in version.split(".")[:2])
+        except Exception as e:
+            logger.warning(f"Could not read the pgvector version, assuming no iterative index scans: {e}")
+            return (0, 0)
+
+    def _migrate_scope_columns(self):
+        """Add/backfill the promoted scope columns on tables created before they existed"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("""
+                    ALTER TABLE embeddings
+                        ADD COLUMN IF NOT EXISTS course_id INTEGER,
+                        ADD COLUMN IF NOT EXISTS module_id VARCHAR,
+                        ADD COLUMN IF NOT EXISTS topic_id VARCHAR,
+                        ADD COLUMN IF NOT EXISTS scope_level VARCHAR,
+                        ADD COLUMN IF NOT EXISTS blueprint_id VARCHAR,
+                        ADD COLUMN IF NOT EXISTS source_path VARCHAR
+                """))
+                result = conn.execute(text("""
+                    UPDATE embeddings SET
+                        course_id = CASE WHEN metadata->>'course_id' ~ '^-?[0-9]+$'
+                                         THEN (metadata->>'course_id')::int END,
+                        module_id = metadata->>'module_id',
+                        topic_id = metadata->>'topic_id',
+                        scope_level = metadata->>'scope_level',
+                        blueprint_id = metadata->>'blueprint_id',
+                        source_path = metadata->>'source_path'
+                    WHERE course_id IS NULL AND metadata->>'course_id' IS NOT NULL
+                """))
+                if result.rowcount:
+                    logger.info(f"Backfilled scope columns for {result.rowcount} embeddings")
+                for index in Embedding.__table__.indexes:
+                    index.create(conn, checkfirst=True)
+        except Exception as e:
+            logger.error(f"Scope column migration failed: {e}")
+
+    @staticmethod
+    def _ann_index_name(index_type: str) -> str:
+        return f"ix_embeddings_embedding_{index_type}"
+
+    def _ann_index_ddl(self, index_type: str, concurrently: bool = False) -> str:
+        name = self._ann_index_name(index_type)
+        using = "CONCURRENTLY " if concurrently else ""
+        if index_type == "hnsw":
+            with_clause = f"m = {int(self.hnsw_m)}, ef_construction = {int(self.hnsw_ef_construction)}"
+        else:
+            with_clause = f"lists = {int(self.ivfflat_lists)}"
+        return (
+            f"CREATE INDEX {using}IF NOT EXISTS {name} ON embeddings "
+            f"USING {index_type} (embedding vector_cosine_ops) WITH ({with_clause})"
+        )
+
+    def ensure_ann_index(self):
+        """Create the configured ANN index if it does not exist yet"""
+        if self.index_type == "none":
+            return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(self._ann_index_ddl(self.index_type)))
+        except Exception as e:
+            logger.error(f"Failed to create {self.index_type} index: {e}")
+
+    def rebuild_ann_index(
+        self,
+        index_type: Optional[str] = None,
+        m: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        lists: Optional[int] = None,
+        concurrently: bool = True
+    ) -> Dict[str, Any]:
         """
-        Add documents and their embeddings to the store.
+        Drop and recreate the ANN index, optionally with new parameters.
+        With concurrently=True the table stays readable and writable during the build.
         """
-        session = self.Session()
-        try:
-            for i, text_content in enumerate(texts):
+        index_type = index_type or self.index_type
+        if index_type not in self.ANN_INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {self.ANN_INDEX_TYPES}")
+        if m is not None:
+            self.hnsw_m = m
+        if ef_construction is not None:
+            self.hnsw_ef_construction = ef_construction
+        if lists is not None:
+            self.ivfflat_lists = lists
+        
+        using = "CONCURRENTLY " if concurrently else ""
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for t in ("hnsw", "ivfflat"):
+                conn.execute(text(f"DROP INDEX {using}IF EXISTS {self._ann_index_name(t)}"))
+            if index_type != "none":
+                conn.execute(text(self._ann_index_ddl(index_type, concurrently=concurrently)))
+        
+        self.index_type = index_type
+        logger.info(f"Rebuilt ANN index: {self.ann_index_info()}")
+        return self.ann_index_info()
+
+    def ann_index_info(self) -> Dict[str, Any]:
+        return {
+            "index_type": self.index_type,
+            "iterative_scan": self.iterative_scan,
+            "hnsw": {"m": self.hnsw_m, "ef_construction": self.hnsw_ef_construction, "ef_search": self.ef_search},
+            "ivfflat": {"lists": self.ivfflat_lists, "probes": self.probes}
+        }
+
+    def _search_params_sql(
+        self,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        limit: int = 0,
+        filtered: bool = False
+    ) -> List[Any]:
+        """
+        SET LOCAL statements for the per-query ANN recall/speed knobs. limit is the
+        number of rows the ANN scan must yield (top_k or candidates): HNSW returns
+        at most ef_search rows, so ef_search is raised to at least limit.
+        """
+        statements = []
+        if self.index_type == "hnsw":
+            ef_search = max(int(ef_search or self.ef_search), limit)
+            if filtered and not self.iterative_scan:
+                ef_search = max(ef_search, limit * self.FILTERED_EF_SEARCH_FACTOR)
+            statements.append(text(f"SET LOCAL hnsw.ef_search = {min(ef_search, self.MAX_EF_SEARCH)}"))
+        elif self.index_type == "ivfflat":
+            statements.append(text(f"SET LOCAL ivfflat.probes = {int(probes or self.probes)}"))
+        if filtered and self.iterative_scan and self.index_type in ("hnsw", "ivfflat"):
+            # Hits are re-ranked after the scan (row_number(), score sort), so relaxed order is enough
+            statements.append(text(f"SET LOCAL {self.index_type}.iterative_scan = relaxed_order"))
+        return statements
+
+    def _apply_search_params(
+        self,
+        session,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        limit: int = 0,
+        filtered: bool = False
+    ):
+        """Set per-query ANN recall/speed knobs for the current transaction"""
+        for stmt in self._search_params_sql(ef_search, probes, limit, filtered):
+            session.execute(stmt)
+
+    def _insert_statements(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]],
+        batch_size: int
+    ):
+        """One INSERT ... SELECT over a VALUES list per batch of batch_size rows"""
+        table = Embedding.__table__
+        for start in range(0, len(texts), batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, len(texts))):
                 meta = metadatas[i] if metadatas else {}
-                embedding_vector = embeddings[i]
-                
-                doc = Embedding(
-                    content=text_content,
-                    embedding=embedding_vector,
-                    source=meta.get('source', 'unknown'),
-                    metadata_json=meta,
-                    search_text=func.to_tsvector('english', text_content)
+                rows.append((texts[i], embeddings[i], meta.get('source', 'unknown'), meta, *_scope_values(meta)))
+            
+            v = values(
+                column('content', String),
+                column('embedding', Vector(768)),
+                column('source', String),
+                column('metadata', JSON),
+                column('course_id', Integer),
+                *[column(k, String) for k in SCOPE_COLUMNS[1:]],
+                name='v'
+            ).data(rows)
+            yield insert(table).from_select(
+                ['content', 'embedding', 'source', 'metadata', 'search_text', *SCOPE_COLUMNS],
+                select(
+                    v.c.content,
+                    cast(v.c.embedding, Vector(768)),
+                    v.c.source,
+                    cast(v.c.metadata, JSON),
+                    func.to_tsvector('english', v.c.content),
+                    cast(v.c.course_id, Integer),
+                    *[v.c[k] for k in SCOPE_COLUMNS[1:]]
                 )
-                session.add(doc)
-            session.commit()
+            )
+
+    def add_documents(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500
+    ):
+        """
+        Add documents and their embeddings to the store.
+        
+        Rows are written batch_size at a time as one INSERT ... SELECT over a VALUES
+        list, so the tsvector is computed server-side and there is no per-row ORM
+        overhead. All batches commit in a single transaction.
+        """
+        if not texts:
+            return
+        
+        try:
+            with self.engine.begin() as conn:
+                for stmt in self._insert_statements(texts, embeddings, metadatas, batch_size):
+                    conn.execute(stmt)
             logger.info(f"Added {len(texts)} documents to vector store")
         except Exception as e:
-            session.rollback()
             logger.error(f"Failed to add documents: {e}")
             raise
-        finally:
-            session.close()
 
-    def search(self, query_vector: List[float], top_k: int = 5, threshold: float = 0.5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _search_statement(query_vector: List[float], top_k: int, filter: Optional[Dict[str, Any]]):
+        distance = Embedding.embedding.cosine_distance(query_vector)
+        stmt = select(Embedding.content, Embedding.metadata_json, distance.label('distance'))
+        
+        # Apply metadata filters
+        if filter:
+            logger.info(f"🔎 Applying Vector Filter: {filter}")
+            stmt = stmt.where(*[_filter_clause(key, value) for key, value in filter.items()])
+        else:
+            logger.info("🔎 No Vector Filter applied")
+        
+        return stmt.order_by(distance).limit(top_k)
+
+    @staticmethod
+    def _format_search(rows, threshold: float) -> List[Dict[str, Any]]:
+        logger.info(f"🔎 Found {len(rows)} raw results (before threshold)")
+        
+        formatted_results = []
+        for row in rows:
+            similarity = 1 - row.distance
+            if similarity >= threshold:
+                formatted_results.append({
+                    'content': row.content,
+                    'metadata': row.metadata_json,
+                    'score': similarity
+                })
+        # Iterative scans (filtered searches) may return rows slightly out of order
+        formatted_results.sort(key=lambda r: r['score'], reverse=True)
+        return formatted_results
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for similar documents using cosine similarity.
         Supports filtering by metadata fields (exact match).
+        ef_search (HNSW) / probes (IVFFlat) override the configured defaults for this query.
         """
         session = self.Session()
         try:
-            query = session.query(
-                Embedding,
-                Embedding.embedding.cosine_distance(query_vector).label('distance')
-            )
-            
-            # Apply metadata filters
-            if filter:
-                logger.info(f"🔎 Applying Vector Filter: {filter}")
-                for key, value in filter.items():
-                    query = query.filter(func.json_extract_path_text(Embedding.metadata_json, key) == str(value))
-            else:
-                 logger.info("🔎 No Vector Filter applied")
-
-            results = query.order_by(
-                Embedding.embedding.cosine_distance(query_vector)
-            ).limit(top_k).all()
-            
-            logger.info(f"🔎 Found {len(results)} raw results (before threshold)")
-            
-            formatted_results = []
-            for doc, distance in results:
-                similarity = 1 - distance
-                if similarity >= threshold:
-                    formatted_results.append({
-                        'content': doc.content,
-                        'metadata': doc.metadata_json,
-                        'score': similarity
-                    })
-            
-            return formatted_results
+            self._apply_search_params(session, ef_search, probes, limit=top_k, filtered=bool(filter))
+            rows = session.execute(self._search_statement(query_vector, top_k, filter)).all()
+            return self._format_search(rows, threshold)
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
         finally:
             session.close()
 
+    @staticmethod
+    def _hybrid_statement(
+        query_vector,
+        query_text,
+        top_k: int,
+        candidates: int,
+        threshold: float,
+        filter: Optional[Dict[str, Any]],
+        k_rrf: int,
+        correlate=None,
+        include_vectors: bool = False
+    ):
+        """
+        query_vector/query_text are values, or columns of `correlate` (the VALUES
+        list of _multi_hybrid_statement) when the statement runs per query row.
+        include_vectors also selects each hit's embedding (for re-ranking).
+        """
+        filters = [_filter_clause(key, value) for key, value in (filter or {}).items()]
+        correlated = (correlate,) if correlate is not None else ()
+        
+        # Vector ranking (inner ORDER BY ... LIMIT so the ANN index is used)
+        distance = Embedding.embedding.cosine_distance(query_vector)
+        vec_top = select(Embedding.id, distance.label('distance')) \
+            .where(*filters).order_by(distance).limit(candidates).correlate(*correlated).subquery('vec_top')
+        vec = select(
+            vec_top.c.id,
+            vec_top.c.distance,
+            func.row_number().over(order_by=vec_top.c.distance).label('rank')
+        ).where(vec_top.c.distance <= 1 - threshold).subquery('vec')
+        
+        # Keyword ranking
+        ts_query = func.plainto_tsquery('english', query_text)
+        ts_rank = func.ts_rank(Embedding.search_text, ts_query)
+        kw_top = select(Embedding.id, ts_rank.label('ts_rank')) \
+            .where(Embedding.search_text.op('@@')(ts_query), *filters) \
+            .order_by(ts_rank.desc()).limit(candidates).correlate(*correlated).subquery('kw_top')
+        kw = select(
+            kw_top.c.id,
+            kw_top.c.ts_rank,
+            func.row_number().over(order_by=kw_top.c.ts_rank.desc()).label('rank')
+        ).subquery('kw')
+        
+        # RRF fusion
+        rrf_score = (
+            func.coalesce(1.0 / (k_rrf + vec.c.rank - 1), 0.0)
+            + func.coalesce(1.0 / (k_rrf + kw.c.rank - 1), 0.0)
+        )
+        fused = select(
+            func.coalesce(vec.c.id, kw.c.id).label('id'),
+            rrf_score.label('rrf_score'),
+            (1 - vec.c.distance).label('vector_score'),
+            kw.c.ts_rank.label('keyword_score')
+        ).select_from(vec.join(kw, vec.c.id == kw.c.id, full=True)).subquery('fused')
+        
+        columns = [
+            Embedding.id,
+            Embedding.content,
+            Embedding.metadata_json,
+            fused.c.rrf_score,
+            fused.c.vector_score,
+            fused.c.keyword_score
+        ]
+        if include_vectors:
+            columns.append(Embedding.embedding)
+        return select(*columns).join(fused, fused.c.id == Embedding.id) \
+            .order_by(fused.c.rrf_score.desc(), Embedding.id).limit(top_k)
+
+    @classmethod
+    def _multi_hybrid_statement(
+        cls,
+        queries: List[Tuple[List[float], str]],
+        top_k: int,
+        candidates: int,
+        threshold: float,
+        filter: Optional[Dict[str, Any]],
+        k_rrf: int,
+        include_vectors: bool = False
+    ):
+        """
+        Hybrid search for several (vector, text) queries in one statement: the
+        queries are a VALUES list, joined LATERAL to the per-query RRF ranking,
+        so each query row gets its own top_k. Rows come back tagged with qid.
+        """
+        vector_type = Embedding.embedding.type
+        q = values(
+            column('qid', Integer), column('qvec', vector_type), column('qtext', String), name='q'
+        ).data([(i, cast(vector, vector_type), text_) for i, (vector, text_) in enumerate(queries)])
+        hits = cls._hybrid_statement(
+            q.c.qvec, q.c.qtext, top_k, candidates, threshold, filter, k_rrf, correlate=q, include_vectors=include_vectors
+        ).lateral('hits')
+        return select(q.c.qid, hits).select_from(q.join(hits, true())) \
+            .order_by(q.c.qid, hits.c.rrf_score.desc(), hits.c.id)
+
+    @staticmethod
+    def _format_hybrid(rows) -> List[Dict[str, Any]]:
+        results = []
+        for row in rows:
+            vector_score = float(row.vector_score) if row.vector_score is not None else None
+            keyword_score = float(row.keyword_score) if row.keyword_score is not None else None
+            result = {
+                'id': row.id,
+                'content': row.content,
+                'metadata': row.metadata_json,
+                'score': vector_score if vector_score is not None else keyword_score,
+                'rrf_score': float(row.rrf_score),
+                'vector_score': vector_score,
+                'keyword_score': keyword_score
+            }
+            embedding = getattr(row, 'embedding', None)
+            if embedding is not None:
+                result['embedding'] = embedding
+            results.append(result)
+        return results
+
+    def hybrid_search(
+        self,
+        query_vector: List[float],
+        query_text: str,
+        top_k: int = 5,
+        candidates: Optional[int] = None,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        k_rrf: int = 60,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Vector + keyword search fused with Reciprocal Rank Fusion in one statement.
+        
+        Subqueries take the top `candidates` (default top_k) by cosine similarity (those
+        below threshold dropped) and by ts_rank, full-outer-join them on id and
+        score each row as sum(1 / (k_rrf + rank)) with 0-based ranks.
+        Returns id, content, metadata, rrf_score, vector_score, keyword_score and
+        score (vector similarity, else keyword rank), plus embedding with
+        include_vectors.
+        """
+        candidates = candidates or top_k
+        stmt = self._hybrid_statement(
+            query_vector, query_text, top_k, candidates, threshold, filter, k_rrf, include_vectors=include_vectors
+        )
+        session = self.Session()
+        try:
+            self._apply_search_params(session, ef_search, probes, limit=candidates, filtered=bool(filter))
+            return self._format_hybrid(session.execute(stmt))
+        except Exception as e:
+            logger.error(f"Hybrid search failed: {e}")
+            return []
+        finally:
+            session.close()
+
+    def _format_multi_hybrid(self, rows, n_queries: int) -> List[List[Dict[str, Any]]]:
+        grouped = [[] for _ in range(n_queries)]
+        for row in rows:
+            grouped[row.qid].append(row)
+        return [self._format_hybrid(group) for group in grouped]
+
+    def multi_hybrid_search(
+        self,
+        queries: List[Tuple[List[float], str]],
+        top_k: int = 5,
+        candidates: Optional[int] = None,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        k_rrf: int = 60,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        include_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        hybrid_search for a list of (query_vector, query_text) pairs in a single
+        statement and round-trip. Returns one result list per query, in order.
+        """
+        if not queries:
+            return []
+        candidates = candidates or top_k
+        stmt = self._multi_hybrid_statement(queries, top_k, candidates, threshold, filter, k_rrf, include_vectors)
+        session = self.Session()
+        try:
+            self._apply_search_params(session, ef_search, probes, limit=candidates, filtered=bool(filter))
+            return self._format_multi_hybrid(session.execute(stmt), len(queries))
+        except Exception as e:
+            logger.error(f"Multi-query hybrid search failed: {e}")
+            return [[] for _ in queries]
+        finally:
+            session.close()
+
+    @staticmethod
+    def _keyword_statement(query_text: str, top_k: int, filter: Optional[Dict[str, Any]]):
+        ts_query = func.plainto_tsquery('english', query_text)
+        rank = func.ts_rank(Embedding.search_text, ts_query).label('rank')
+        stmt = select(Embedding.id, Embedding.content, Embedding.metadata_json, rank) \
+            .where(Embedding.search_text.op('@@')(ts_query))
+        if filter:
+            stmt = stmt.where(*[_filter_clause(key, value) for key, value in filter.items()])
+        return stmt.order_by(rank.desc()).limit(top_k)
+
+    @staticmethod
+    def _format_keyword(rows) -> List[Dict[str, Any]]:
+        return [
+            {
+                'content': row.content,
+                'metadata': row.metadata_json,
+                'score': float(row.rank),
+                'id': row.id
+            }
+            for row in rows
+        ]
+
     def search_keyword(self, query_text: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Full-text search using Postgres TSVECTOR.
         """
         session = self.Session()
         try:
-            # Prepare TSQUERY
-            ts_query = func.plainto_tsquery('english', query_text)
-            
-            query = session.query(
-                Embedding, 
-                func.ts_rank(Embedding.search_text, ts_query).label('rank')
-            ).filter(Embedding.search_text.op('@@')(ts_query))
-
-            if filter:
-                 for key, value in filter.items():
-                    query = query.filter(func.json_extract_path_text(Embedding.metadata_json, key) == str(value))
-            
-            results = query.order_by(text('rank DESC')).limit(top_k).all()
-            
-            formatted_results = []
-            for doc, rank in results:
-                formatted_results.append({
-                    'content': doc.content,
-                    'metadata': doc.metadata_json,
-                    'score': float(rank),
-                     'id': doc.id
-                })
-            return formatted_results
+            return self._format_keyword(session.execute(self._keyword_statement(query_text, top_k, filter)))
         except Exception as e:
             logger.error(f"Keyword search failed: {e}")
             return []
         finally:
             session.close()
+
+    # --- Incremental ingestion ---
+    # Source files are tracked in ingest_manifest; their chunks are the rows with
+    # a matching (course_id, source_path).
+
+    @staticmethod
+    def _manifest_query(course_id: int, path_prefix: Optional[str]):
+        stmt = select(*[getattr(IngestManifest, f) for f in MANIFEST_FIELDS]).where(IngestManifest.course_id == course_id)
+        if path_prefix:
+            stmt = stmt.where(IngestManifest.path.startswith(path_prefix, autoescape=True))
+        return stmt
+
+    @staticmethod
+    def _manifest_upsert(entries: List[Dict[str, Any]]):
+        stmt = pg_insert(IngestManifest.__table__).values([{f: e.get(f) for f in MANIFEST_FIELDS} for e in entries])
+        return stmt.on_conflict_do_update(
+            index_elements=['course_id', 'path'],
+            set_={**{f: stmt.excluded[f] for f in MANIFEST_FIELDS[2:]}, 'ingested_at': func.now()}
+        )
+
+    def _replace_statements(
+        self,
+        course_id: int,
+        source_paths: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        manifest: List[Dict[str, Any]],
+        batch_size: int
+    ):
+        yield Embedding.__table__.delete().where(
+            Embedding.course_id == course_id,
+            Embedding.source_path.in_(source_paths)
+        )
+        if texts:
+            yield from self._insert_statements(texts, embeddings, metadatas, batch_size)
+        if manifest:
+            yield self._manifest_upsert(manifest)
+
+    @staticmethod
+    def _purge_statements(course_id: int, source_paths: List[str]):
+        yield Embedding.__table__.delete().where(
+            Embedding.course_id == course_id,
+            Embedding.source_path.in_(source_paths)
+        )
+        yield IngestManifest.__table__.delete().where(
+            IngestManifest.course_id == course_id,
+            IngestManifest.path.in_(source_paths)
+        )
+
+    def _execute_all(self, statements):
+        with self.engine.begin() as conn:
+            for stmt in statements:
+                conn.execute(stmt)
+
+    def get_manifest(self, course_id: int, path_prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """{path: manifest entry} for a course's ingested files, optionally under path_prefix"""
+        with self.engine.connect() as conn:
+            return {row.path: dict(row._mapping) for row in conn.execute(self._manifest_query(course_id, path_prefix))}
+
+    def upsert_manifest(self, entries: List[Dict[str, Any]]):
+        if entries:
+            self._execute_all([self._manifest_upsert(entries)])
+
+    def replace_documents(
+        self,
+        course_id: int,
+        source_paths: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        manifest: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500
+    ):
+        """
+        Atomically replace the chunks of the given source files: their existing rows
+        are deleted, the new rows inserted and their manifest entries upserted in
+        one transaction. metadatas must carry each chunk's source_path.
+        """
+        self._execute_all(self._replace_statements(course_id, source_paths, texts, embeddings, metadatas, manifest, batch_size))
+        logger.info(f"Replaced {len(source_paths)} source files with {len(texts)} chunks for course {course_id}")
+
+    def purge_sources(self, course_id: int, source_paths: List[str]):
+        """Delete the chunks and manifest entries of source files that no longer exist"""
+        if source_paths:
+            self._execute_all(self._purge_statements(course_id, source_paths))
+            logger.info(f"Purged {len(source_paths)} removed source files for course {course_id}")
+
+    # --- Async API ---
+    # Same statements as the sync methods, run on the asyncpg engine when
+    # async_enabled; otherwise the sync method runs in a worker thread. Either
+    # way, callers on an event loop are never blocked by a query.
+
+    async def aadd_documents(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500
+    ):
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.add_documents, texts, embeddings, metadatas, batch_size)
+        if not texts:
+            return
+        
+        try:
+            async with self.async_engine.begin() as conn:
+                for stmt in self._insert_statements(texts, embeddings, metadatas, batch_size):
+                    await conn.execute(stmt)
+            logger.info(f"Added {len(texts)} documents to vector store")
+        except Exception as e:
+            logger.error(f"Failed to add documents: {e}")
+            raise
+
+    async def _aexecute(
+        self,
+        stmt,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        limit: int = 0,
+        filtered: bool = False
+    ):
+        """Run a search statement in its own transaction, with the ANN knobs set locally"""
+        async with self.async_engine.begin() as conn:
+            for params in self._search_params_sql(ef_search, probes, limit, filtered):
+                await conn.execute(params)
+            return (await conn.execute(stmt)).all()
+
+    async def asearch(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.search, query_vector, top_k, threshold, filter, ef_search, probes)
+        try:
+            rows = await self._aexecute(
+                self._search_statement(query_vector, top_k, filter), ef_search, probes, limit=top_k, filtered=bool(filter)
+            )
+            return self._format_search(rows, threshold)
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return []
+
+    async def ahybrid_search(
+        self,
+        query_vector: List[float],
+        query_text: str,
+        top_k: int = 5,
+        candidates: Optional[int] = None,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        k_rrf: int = 60,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        include_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        if self.async_engine is None:
+            return await asyncio.to_thread(
+                self.hybrid_search, query_vector, query_text, top_k, candidates, threshold, filter, k_rrf, ef_search, probes,
+                include_vectors
+            )
+        candidates = candidates or top_k
+        stmt = self._hybrid_statement(
+            query_vector, query_text, top_k, candidates, threshold, filter, k_rrf, include_vectors=include_vectors
+        )
+        try:
+            return self._format_hybrid(await self._aexecute(stmt, ef_search, probes, limit=candidates, filtered=bool(filter)))
+        except Exception as e:
+            logger.error(f"Hybrid search failed: {e}")
+            return []
+
+    async def amulti_hybrid_search(
+        self,
+        queries: List[Tuple[List[float], str]],
+        top_k: int = 5,
+        candidates: Optional[int] = None,
+        threshold: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        k_rrf: int = 60,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        include_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        if self.async_engine is None:
+            return await asyncio.to_thread(
+                self.multi_hybrid_search, queries, top_k, candidates, threshold, filter, k_rrf, ef_search, probes,
+                include_vectors
+            )
+        if not queries:
+            return []
+        candidates = candidates or top_k
+        stmt = self._multi_hybrid_statement(queries, top_k, candidates, threshold, filter, k_rrf, include_vectors)
+        try:
+            return self._format_multi_hybrid(
+                await self._aexecute(stmt, ef_search, probes, limit=candidates, filtered=bool(filter)), len(queries)
+            )
+        except Exception as e:
+            logger.error(f"Multi-query hybrid search failed: {e}")
+            return [[] for _ in queries]
+
+    async def asearch_keyword(self, query_text: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.search_keyword, query_text, top_k, filter)
+        try:
+            async with self.async_engine.connect() as conn:
+                rows = (await conn.execute(self._keyword_statement(query_text, top_k, filter))).all()
+            return self._format_keyword(rows)
+        except Exception as e:
+            logger.error(f"Keyword search failed: {e}")
+            return []
+
+    async def _aexecute_all(self, statements):
+        async with self.async_engine.begin() as conn:
+            for stmt in statements:
+                await conn.execute(stmt)
+
+    async def aget_manifest(self, course_id: int, path_prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.get_manifest, course_id, path_prefix)
+        async with self.async_engine.connect() as conn:
+            rows = await conn.execute(self._manifest_query(course_id, path_prefix))
+            return {row.path: dict(row._mapping) for row in rows}
+
+    async def aupsert_manifest(self, entries: List[Dict[str, Any]]):
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.upsert_manifest, entries)
+        if entries:
+            await self._aexecute_all([self._manifest_upsert(entries)])
+
+    async def areplace_documents(
+        self,
+        course_id: int,
+        source_paths: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        manifest: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500
+    ):
+        if self.async_engine is None:
+            return await asyncio.to_thread(
+                self.replace_documents, course_id, source_paths, texts, embeddings, metadatas, manifest, batch_size
+            )
+        await self._aexecute_all(self._replace_statements(course_id, source_paths, texts, embeddings, metadatas, manifest, batch_size))
+        logger.info(f"Replaced {len(source_paths)} source files with {len(texts)} chunks for course {course_id}")
+
+    @asynccontextmanager
+    async def astream_replace_documents(
+        self,
+        course_id: int,
+        source_paths: List[str],
+        batch_size: int = 500
+    ) -> AsyncIterator[Callable[[List[str], List[List[float]], List[Dict[str, Any]]], Awaitable[None]]]:
+        """
+        Replace the chunks of the given source files batch by batch, for files too
+        large to hold in memory: yields write(texts, embeddings, metadatas), which
+        inserts one batch right away. The old rows are deleted first, all in one
+        transaction that commits when the block exits, so an error part-way
+        leaves the previous rows in place.
+        """
+        if self.async_engine is None:
+            # One sync connection, used from one worker thread at a time
+            conn = await asyncio.to_thread(self.engine.connect)
+            call = asyncio.to_thread
+        else:
+            conn = await self.async_engine.connect()
+            call = lambda fn, *args: fn(*args)
+
+        written = 0
+
+        async def execute_all(statements):
+            for stmt in statements:
+                await call(conn.execute, stmt)
+
+        async def write(texts: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]]):
+            nonlocal written
+            await execute_all(self._insert_statements(texts, embeddings, metadatas, batch_size))
+            written += len(texts)
+
+        try:
+            await execute_all(self._replace_statements(course_id, source_paths, [], [], [], None, batch_size))
+            yield write
+            await call(conn.commit)
+        finally:
+            # Closing without a commit rolls the transaction back
+            await call(conn.close)
+        logger.info(f"Replaced {len(source_paths)} source files with {written} chunks for course {course_id}")
+
+    async def apurge_sources(self, course_id: int, source_paths: List[str]):
+        if self.async_engine is None:
+            return await asyncio.to_thread(self.purge_sources, course_id, source_paths)
+        if source_paths:
+            await self._aexecute_all(self._purge_statements(course_id, source_paths))
+            logger.info(f"Purged {len(source_paths)} removed source files for course {course_id}")
+
+    async def aclose(self):
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
@@ -9,6 +9,14 @@ class BaseAppSettings(BaseSettings):
     # Database
     DATABASE_URL: Optional[str] = None
     
+    # Database connection pool (per engine, per process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    
     # Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
     
@@ -18,6 +26,26 @@ class BaseAppSettings(BaseSettings):
     FALLBACK_LLM_MODEL: str = "models/gemini-2.0-flash-exp"
     ADVANCED_LLM_MODEL: str = "models/gemini-2.0-pro-exp"
     ENABLE_LLM_FALLBACK: bool = True
+    LLM_MAX_CONCURRENCY_PER_MODEL: int = 64
+    LLM_HEALTH_CHECK_INTERVAL_SECONDS: float = 300.0
+    
+    # LLM Rate Limiting (per model, per process; opt-in, 0 disables the bucket)
+    LLM_REQUESTS_PER_MINUTE: int = 0
+    LLM_TOKENS_PER_MINUTE: int = 0
+    LLM_MAX_QUOTA_RETRIES: int = 3
+    
+    # MCP Router hedging (design mode: Pro primary, Flash hedge/fallback)
+    MCP_HEDGE_ENABLED: bool = True
+    MCP_HEDGE_DEFAULT_DELAY_SECONDS: float = 15.0
+    MCP_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    MCP_ERROR_RATE_THRESHOLD: float = 0.5
+    
+    # LLM Response Cache (LLM_CACHE_PATH enables the on-disk SQLite tier)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: Optional[str] = None
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 256
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 10000
     
     # Embedding Configuration
     EMBEDDING_MODEL: str = "models/text-embedding-004"
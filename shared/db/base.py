@@ -1,11 +1,227 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
-def get_db_engine(database_url: str):
-    return create_engine(database_url)
+# Sync URL backend -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolMetrics:
+    """
+    Checkout counters for one engine's pool.
+    Wait time is the time taken to hand out a usable connection: queueing for a
+    free slot, opening an overflow connection and the pre-ping.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent.append(seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_ms_avg": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "wait_ms_p99": round(p99 * 1000, 2),
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+
+class _TimedCheckoutMixin:
+    """Times Pool.connect() into self.metrics; metrics survive engine.dispose()"""
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# name -> engine, for pool_metrics()
+_engines: Dict[str, Any] = {}
+
+
+def _pool_kwargs(backend: str, pool_size: int, max_overflow: int, pool_timeout: float, pool_recycle: int, pool_pre_ping: bool) -> Dict[str, Any]:
+    # SQLite (scripts, tests) keeps SQLAlchemy's default pool
+    if backend == "sqlite":
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def _instrument(engine, name: str):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = PoolMetrics()
+    sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    _engines[name] = engine
+    return engine
+
+
+def get_db_engine(
+    database_url: str,
+    name: str = "default",
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 10.0,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    **engine_kwargs
+):
+    """
+    Pooled, instrumented Engine. Its pool stats are reported by pool_metrics()
+    under `name`.
+    """
+    backend = make_url(database_url).get_backend_name()
+    kwargs = _pool_kwargs(backend, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping)
+    if kwargs:
+        kwargs["poolclass"] = InstrumentedQueuePool
+    engine = create_engine(database_url, **kwargs, **engine_kwargs)
+    return _instrument(engine, name) if kwargs else engine
+
 
 def get_session_local(engine):
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def to_async_database_url(database_url: str) -> str:
+    """Rewrite a sync URL (postgresql://, postgresql+psycopg2://, sqlite://) to its asyncio driver"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_db_engine(
+    database_url: str,
+    name: str = "default-async",
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 10.0,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    prepared_statement_cache_size: int = 500,
+    **engine_kwargs
+):
+    """
+    Pooled, instrumented AsyncEngine (asyncpg for PostgreSQL) for the same database
+    as get_db_engine. asyncpg runs every statement as a server-side prepared
+    statement, cached per connection (prepared_statement_cache_size).
+    """
+    # Imported here: sqlalchemy.ext.asyncio needs greenlet, which sync-only users don't install
+    from sqlalchemy.ext.asyncio import create_async_engine
+    url = make_url(to_async_database_url(database_url))
+    backend = url.get_backend_name()
+    kwargs = _pool_kwargs(backend, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping)
+    if kwargs:
+        kwargs["poolclass"] = InstrumentedAsyncQueuePool
+        url = url.update_query_dict({"prepared_statement_cache_size": str(prepared_statement_cache_size)})
+    engine = create_async_engine(url, **kwargs, **engine_kwargs)
+    return _instrument(engine, name) if kwargs else engine
+
+
+def get_async_session_local(engine):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    # expire_on_commit=False: attributes stay loaded after commit, since async
+    # sessions cannot lazy-load them again implicitly
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def engine_options(settings) -> Dict[str, Any]:
+    """get_db_engine/get_async_db_engine pool options from the DB_POOL_* settings"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Pool stats of every engine created in this process, by name"""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = getattr(engine, "sync_engine", engine).pool
+        if getattr(pool, "metrics", None) is not None:
+            stats[name] = pool.metrics.snapshot(pool)
+    return stats
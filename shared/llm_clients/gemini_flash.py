@@ -9,12 +9,12 @@ class GeminiFlashClient:
     """
     Client for Gemini 2.5 Flash (Tutoring/High-volume tasks).
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model_name: Optional[str] = None):
         if not api_key:
             raise ValueError("API key is required for GeminiFlashClient")
         genai.configure(api_key=api_key)
         # Using gemini-2.0-flash-exp or updated by env
-        self.model_name = os.getenv("FALLBACK_LLM_MODEL", "models/gemini-1.5-flash")
+        self.model_name = model_name or os.getenv("FALLBACK_LLM_MODEL", "models/gemini-1.5-flash")
         self.model = genai.GenerativeModel(self.model_name)
         logger.info(f"Initialized GeminiFlashClient with model: {self.model_name}")
 
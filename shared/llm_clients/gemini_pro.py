@@ -9,12 +9,12 @@ class GeminiProClient:
     """
     Client for Gemini 2.5 Pro (Design/Planning tasks).
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model_name: Optional[str] = None):
         if not api_key:
             raise ValueError("API key is required for GeminiProClient")
         genai.configure(api_key=api_key)
         # Using gemini-2.0-pro-exp or updated by env
-        self.model_name = os.getenv("ADVANCED_LLM_MODEL", "models/gemini-1.5-pro")
+        self.model_name = model_name or os.getenv("ADVANCED_LLM_MODEL", "models/gemini-1.5-pro")
         self.model = genai.GenerativeModel(self.model_name)
         logger.info(f"Initialized GeminiProClient with model: {self.model_name}")
 
@@ -1,6 +1,9 @@
+import asyncio
 import logging
+import time
+from collections import deque
 from enum import Enum
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from shared.llm_clients.gemini_pro import GeminiProClient
 from shared.llm_clients.gemini_flash import GeminiFlashClient
 
@@ -10,16 +13,163 @@ class ModelType(Enum):
     DESIGN = "design"       # Maps to Pro
     TUTORING = "tutoring"   # Maps to Flash
 
+class LatencyTracker:
+    """
+    Rolling latency / error statistics for a single model.
+    Samples older than window_seconds are ignored, so a model that was
+    failing is retried once its bad samples age out.
+    """
+    def __init__(self, window_seconds: float = 300.0, max_samples: int = 200):
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max_samples)  # (timestamp, latency_s, ok)
+
+    def record(self, latency: float, ok: bool = True):
+        self._samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self):
+        cutoff = time.monotonic() - self.window_seconds
+        return [s for s in self._samples if s[0] >= cutoff]
+
+    def sample_count(self) -> int:
+        return len(self._recent())
+
+    def percentile(self, q: float) -> Optional[float]:
+        latencies = sorted(lat for _, lat, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        idx = min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))
+        return latencies[idx]
+
+    def error_rate(self) -> float:
+        recent = self._recent()
+        if not recent:
+            return 0.0
+        return sum(1 for _, _, ok in recent if not ok) / len(recent)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": self.sample_count(),
+            "p50_s": self.percentile(0.50),
+            "p95_s": self.percentile(0.95),
+            "error_rate": round(self.error_rate(), 3)
+        }
+
+# Process-wide stats, keyed by model name, so they survive router re-creation
+_model_stats: Dict[str, LatencyTracker] = {}
+
+def get_model_stats(model_name: str) -> LatencyTracker:
+    tracker = _model_stats.get(model_name)
+    if tracker is None:
+        tracker = LatencyTracker()
+        _model_stats[model_name] = tracker
+    return tracker
+
 class MCPRouter:
     """
     Model Control Protocol (MCP) Router.
     Routes requests to the appropriate model based on task type.
+
+    Design requests go to Pro with Flash as fallback. Per-model p50/p95 latency
+    and error rate are tracked; if Pro has not answered within its p95 (the
+    hedge deadline), a hedged request is sent to Flash and whichever succeeds
+    first wins, the other being cancelled. A primary whose recent error rate
+    exceeds error_rate_threshold is skipped until its samples age out.
     """
-    def __init__(self, api_key: str):
-        self.pro_client = GeminiProClient(api_key)
-        self.flash_client = GeminiFlashClient(api_key)
+    def __init__(
+        self,
+        api_key: str,
+        hedge_enabled: bool = True,
+        hedge_default_delay: float = 15.0,
+        hedge_min_delay: float = 2.0,
+        error_rate_threshold: float = 0.5,
+        min_samples: int = 10,
+        pro_model: Optional[str] = None,
+        flash_model: Optional[str] = None
+    ):
+        self.pro_client = GeminiProClient(api_key, model_name=pro_model)
+        self.flash_client = GeminiFlashClient(api_key, model_name=flash_model)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
         logger.info("MCP Router initialized")
 
+    async def _timed_generate(self, client, prompt: str, context: Optional[str]) -> str:
+        stats = get_model_stats(client.model_name)
+        start = time.monotonic()
+        try:
+            response = await client.generate(prompt, context)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not recorded, since its short elapsed time
+            # would drag p95 (and so the hedge deadline) down
+            raise
+        except Exception:
+            stats.record(time.monotonic() - start, ok=False)
+            raise
+        stats.record(time.monotonic() - start, ok=True)
+        return response
+
+    def _hedge_delay(self, client) -> float:
+        stats = get_model_stats(client.model_name)
+        p95 = stats.percentile(0.95) if stats.sample_count() >= self.min_samples else None
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    def _is_unhealthy(self, client) -> bool:
+        stats = get_model_stats(client.model_name)
+        return stats.sample_count() >= self.min_samples and stats.error_rate() > self.error_rate_threshold
+
+    async def _generate_with_fallback(self, primary, fallback, prompt: str, context: Optional[str]) -> Tuple[str, str]:
+        """
+        Primary with hedging/fallback to the secondary model.
+        Returns (response, model_used).
+        """
+        if self._is_unhealthy(primary):
+            logger.warning(f"⚠️ {primary.model_name} error rate too high. Routing directly to {fallback.model_name}.")
+            response = await self._timed_generate(fallback, prompt, context)
+            return response, f"{fallback.model_name} (Fallback)"
+
+        primary_task = asyncio.create_task(self._timed_generate(primary, prompt, context))
+        fallback_task = None
+        try:
+            delay = self._hedge_delay(primary) if self.hedge_enabled else None
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+
+            if primary_task in done:
+                if primary_task.exception() is None:
+                    return primary_task.result(), primary.model_name
+                logger.warning(f"⚠️ Primary Model ({primary.model_name}) failed: {primary_task.exception()}. Attempting Fallback.")
+                response = await self._timed_generate(fallback, prompt, context)
+                return response, f"{fallback.model_name} (Fallback)"
+
+            logger.info(f"⏱️ {primary.model_name} exceeded hedge deadline ({delay:.1f}s). Hedging to {fallback.model_name}.")
+            fallback_task = asyncio.create_task(self._timed_generate(fallback, prompt, context))
+            pending = {primary_task, fallback_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer primary if both finished in the same tick
+                for task in sorted(done, key=lambda t: t is not primary_task):
+                    if task.exception() is None:
+                        if task is primary_task:
+                            return task.result(), primary.model_name
+                        return task.result(), f"{fallback.model_name} (Hedged)"
+
+            # Both failed: surface the fallback error, chained to the primary one
+            raise fallback_task.exception() from primary_task.exception()
+        finally:
+            for task in (primary_task, fallback_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Rolling latency / error statistics for the routed models"""
+        return {
+            client.model_name: get_model_stats(client.model_name).snapshot()
+            for client in (self.pro_client, self.flash_client)
+        }
+
     async def route_request(self, task_type: ModelType, prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
         """
         Route the request to the appropriate model.
@@ -27,16 +177,12 @@ class MCPRouter:
         try:
             if task_type == ModelType.DESIGN:
                 logger.info("Routing to Gemini Pro (Design Mode)")
-                try:
-                    response = await self.pro_client.generate(prompt, context)
-                    model_used = self.pro_client.model_name
-                except Exception as e:
-                    logger.warning(f"⚠️ Primary Model (Pro) failed: {e}. Attempting Fallback to Flash.")
-                    response = await self.flash_client.generate(prompt, context)
-                    model_used = f"{self.flash_client.model_name} (Fallback)"
+                response, model_used = await self._generate_with_fallback(
+                    self.pro_client, self.flash_client, prompt, context
+                )
             elif task_type == ModelType.TUTORING:
                 logger.info("Routing to Gemini Flash (Tutoring Mode)")
-                response = await self.flash_client.generate(prompt, context)
+                response = await self._timed_generate(self.flash_client, prompt, context)
                 model_used = self.flash_client.model_name
             else:
                 raise ValueError(f"Unknown task type: {task_type}")